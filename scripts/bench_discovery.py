@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+伺服器資料夾自動偵測效能測試：第一次完整掃描 vs 依 mtime 的增量掃描 vs 每次 os.walk
+
+產生一棵含大量資料夾的合成目錄樹，比較三種做法的耗時。
+
+用法：poetry run python scripts/bench_discovery.py [資料夾數量]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# 添加專案根目錄到 Python 路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.discovery import ScanStats, ServerDiscovery
+from src.services.server_path import default_parser
+
+
+def make_tree(root, count):
+    """在 PARA 目錄下建立 count 個資料夾，約每 50 個有一個伺服器資料夾"""
+    port = 25560
+    for i in range(count):
+        category = ('1_project', '2_repo', '4_achieve')[i % 3]
+        group = os.path.join(root, category, f"group{i // 500}")
+        if i % 50 == 0:
+            folder = os.path.join(group, f"server{i}_1.21.4_{port}_fabric")
+            os.makedirs(folder)
+            open(os.path.join(folder, 'start.sh'), 'w').close()
+            port += 1
+        else:
+            os.makedirs(os.path.join(group, f"misc{i}", "data"))
+    # 讓所有資料夾都不在 racy 範圍內
+    past = time.time() - 60
+    for path, dirs, _ in os.walk(root):
+        os.utime(path, (past, past))
+
+
+def walk(root):
+    """對照組：每次以 os.walk 重新走訪整棵樹"""
+    found = []
+    for path, dirs, files in os.walk(root):
+        if default_parser().match_folder(os.path.basename(path)):
+            found.extend(os.path.join(path, name) for name in files if name == 'start.sh')
+            dirs.clear()
+    return found
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label}{elapsed * 1000:8.1f} ms")
+    return result, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, count)
+        discovery = ServerDiscovery([root], platform='linux')
+        print(f"資料夾：約 {count * 2} 個")
+        walked, walk_time = timed("os.walk：        ", lambda: walk(root))
+        found, _ = timed("第一次掃描：     ", discovery.scan)
+        assert sorted(walked) == found
+        stats = ScanStats()
+        _, rescan_time = timed("增量掃描 (無變動)：", lambda: discovery.scan(stats))
+        print(f"重新列出 {stats.listed} / {stats.visited} 個資料夾，找到 {len(found)} 個伺服器")
+        print(f"加速倍數 (相對 os.walk)：{walk_time / rescan_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+!start 伺服器查詢效能測試：索引查詢 vs 原本的逐筆掃描
+
+用法：poetry run python scripts/bench_lookup.py [筆數]
+"""
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# 添加專案根目錄到 Python 路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.registry import parse_server_info
+from src.services.server_index import ServerIndex
+
+WORDS = ["sky", "empire", "creative", "survival", "island", "nether", "ocean",
+         "forest", "desert", "castle", "redstone", "pixel", "dragon", "craft"]
+VERSIONS = ["1.16.5", "1.18.2", "1.19.4", "1.20", "1.20.1", "1.20.4", "1.21", "1.21.4"]
+CORES = ["fabric", "forge", "paper", "vanilla"]
+
+
+def make_paths(count, seed=5487):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        name = "_".join(rng.sample(WORDS, 2)) + str(i)
+        folder = f"{name}_{rng.choice(VERSIONS)}_{25000 + i}_{rng.choice(CORES)}"
+        paths.append(f"/mc/1_project/{folder}/StartServer.bat")
+    return paths
+
+
+def legacy_lookup(paths, input_name, input_version):
+    """原本 StartServer.start 的做法：每次都重新解析每一筆並做子字串比對"""
+    pattern = r"^(?P<name>.+?)_(?P<version>\d+\.\d+\.?\d*)_(?P<port>\d+)_(?P<core>.+)$"
+    matched = []
+    for path in paths:
+        match = re.match(pattern, Path(path).parent.name)
+        if match and input_name in match.group("name") and input_version == match.group("version"):
+            matched.append(path)
+    return matched
+
+
+def timeit(func, queries, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name, version in queries:
+            func(name, version)
+    return (time.perf_counter() - start) / (rounds * len(queries))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    paths = make_paths(count)
+    servers = [parse_server_info(p) for p in paths]
+
+    start = time.perf_counter()
+    index = ServerIndex(servers)
+    build = time.perf_counter() - start
+
+    rng = random.Random(1)
+    picks = rng.sample(servers, 50)
+    queries = (
+        [(s.name, s.version) for s in picks]                 # 精確
+        + [(s.name[:8], s.version) for s in picks]           # 前綴
+        + [(s.name[4:12], s.version) for s in picks]         # 子字串
+        + [("nonexistent", "1.21.4")] * 10                   # 找不到
+    )
+
+    legacy = timeit(lambda n, v: legacy_lookup(paths, n, v), queries, 1)
+    indexed = timeit(index.lookup, queries, 5)
+
+    print(f"伺服器數量：{count}")
+    print(f"索引建立：{build * 1000:.1f} ms")
+    print(f"原本逐筆掃描：{legacy * 1e6:10.1f} µs / 次")
+    print(f"索引查詢：    {indexed * 1e6:10.1f} µs / 次")
+    print(f"加速倍數：    {legacy / indexed:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+伺服器路徑解析效能測試：原本每次 re.match 字串格式 vs 預先編譯的解析器 (無快取 / LRU 快取)
+
+模擬伺服器清單重新載入多次，每次都解析所有路徑。
+
+用法：poetry run python scripts/bench_parse.py [筆數] [重新載入次數]
+"""
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# 添加專案根目錄到 Python 路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.bench_lookup import make_paths
+from src.services.server_path import ServerPathParser
+
+
+def legacy_parse(full_path):
+    """原本 start.py / list.py 各自的做法：每次以字串格式呼叫 re.match"""
+    path_obj = Path(full_path)
+    match = re.match(r"^(?P<name>.+?)_(?P<version>\d+\.\d+\.\d+)_(?P<port>\d+)_(?P<core>.+)$", path_obj.parent.name)
+    if not match:
+        raise ValueError(full_path)
+    return match.group("name"), match.group("version"), int(match.group("port")), match.group("core")
+
+
+def timed(label, parse, paths, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for path in paths:
+            parse(path)
+    elapsed = (time.perf_counter() - start) / (rounds * len(paths))
+    print(f"{label}{elapsed * 1e6:8.2f} µs / 筆")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    # 原本的格式要求 x.y.z，只取符合的路徑以便公平比較
+    paths = [path for path in make_paths(count) if Path(path).parent.name.count('.') == 2]
+
+    print(f"路徑：{len(paths)} 筆，重新載入 {rounds} 次")
+    legacy = timed("原本 re.match：   ", legacy_parse, paths, rounds)
+    timed("預先編譯 (無快取)：", ServerPathParser(cache_size=0).parse, paths, rounds)
+    cached = timed("預先編譯 + LRU：   ", ServerPathParser().parse, paths, rounds)
+    print(f"加速倍數：          {legacy / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+區域檔增量備份效能測試：依 chunk 時間戳只讀取改寫過的 chunk vs 整個檔案重新雜湊
+
+產生一組合成的區域檔，改寫其中一部分 chunk 後，比較兩種做法讀取的位元組數與耗時。
+
+用法：poetry run python scripts/bench_region.py [區域檔數量] [改寫比例]
+"""
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+# 添加專案根目錄到 Python 路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.backup import BLOCK_SIZE, DIGEST_SIZE, put_object, store_file
+from src.services.region import CHUNK_COUNT, HEADER_SIZE, SECTOR_SIZE
+
+
+def make_region(rng, timestamp):
+    """產生每個 chunk 1-3 個 sector 的區域檔，回傳 (標頭, 各 chunk 的 (起點, sector 數))"""
+    header = bytearray(HEADER_SIZE)
+    layout = []
+    sector = HEADER_SIZE // SECTOR_SIZE
+    for index in range(CHUNK_COUNT):
+        count = rng.randint(1, 3)
+        struct.pack_into('>I', header, index * 4, (sector << 8) | count)
+        struct.pack_into('>I', header, SECTOR_SIZE + index * 4, timestamp)
+        layout.append((sector, count))
+        sector += count
+    return header, layout
+
+
+def write_regions(folder, count, rng):
+    paths = []
+    for i in range(count):
+        header, layout = make_region(rng, 1_700_000_000)
+        path = os.path.join(folder, f"r.{i}.0.mca")
+        with open(path, 'wb') as f:
+            f.write(header)
+            for _, sectors in layout:
+                f.write(rng.randbytes(sectors * SECTOR_SIZE))
+        paths.append((path, header, layout))
+    return paths
+
+
+def touch_chunks(regions, ratio, rng):
+    """模擬伺服器存檔：改寫部分 chunk 的內容並更新時間戳"""
+    for path, header, layout in regions:
+        with open(path, 'r+b') as f:
+            for index in rng.sample(range(CHUNK_COUNT), max(1, int(CHUNK_COUNT * ratio))):
+                sector, sectors = layout[index]
+                f.seek(sector * SECTOR_SIZE)
+                f.write(rng.randbytes(sectors * SECTOR_SIZE))
+                struct.pack_into('>I', header, SECTOR_SIZE + index * 4, 1_700_000_600)
+            f.seek(0)
+            f.write(header)
+
+
+def full_file(path, objects):
+    """對照組：整個檔案以固定大小切塊重新雜湊"""
+    read = 0
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(BLOCK_SIZE)
+            if not data:
+                return read
+            read += len(data)
+            put_object(objects, data)
+
+
+def run(label, func, regions):
+    start = time.perf_counter()
+    read = sum(func(path) for path, _, _ in regions)
+    elapsed = time.perf_counter() - start
+    print(f"{label}讀取 {read / 1024 ** 2:8.1f} MB，耗時 {elapsed * 1000:8.1f} ms")
+    return read, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    rng = random.Random(5487)
+
+    with tempfile.TemporaryDirectory() as folder:
+        regions = write_regions(folder, count, rng)
+        objects = os.path.join(folder, 'objects')
+        total = sum(os.path.getsize(path) for path, _, _ in regions)
+        previous = {path: store_file(path, objects)[0] for path, _, _ in regions}
+        touch_chunks(regions, ratio, rng)
+
+        print(f"區域檔：{count} 個，共 {total / 1024 ** 2:.1f} MB；改寫 {ratio:.0%} 的 chunk")
+        print(f"雜湊：BLAKE2b-{DIGEST_SIZE * 8}")
+        full_read, full_time = run("整個檔案：    ", lambda path: full_file(path, objects), regions)
+        chunk_read, chunk_time = run(
+            "依 chunk 時間戳：", lambda path: store_file(path, objects, previous[path])[1], regions
+        )
+        print(f"讀取量減少：{full_read / chunk_read:8.1f}x | 加速倍數：{full_time / chunk_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ setup(
         "discord.py",
         "python-dotenv",
         "plyer",
-        "psutil"
+        "psutil",
+        "aiohttp"
     ],
 ) 
\ No newline at end of file
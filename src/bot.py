@@ -13,6 +13,10 @@ import sys
 import io
 from pathlib import Path
 from src.utils import load_config, get_nested_value
+from src.services.registry import ServerRegistry
+from src.services.server_path import configure_parser
+from src.services.supervisor import STATE_FILE, ProcessSupervisor
+from src.services.notifier import build_notifier
 
 # 在文件開頭添加
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -44,6 +48,15 @@ bot = commands.Bot(
 # 添加設定到 bot 實例
 bot.config = config
 
+# 共用的伺服器清單快取，由各指令模組查詢；資料夾名稱的版本格式可由 server.versions 設定
+bot.server_registry = ServerRegistry(parser=configure_parser(config['server'].get('versions')))
+
+# 伺服器程序管理器，負責啟動、監看與關閉伺服器；運行中的程序記錄在狀態檔，重啟後可接回
+bot.supervisor = ProcessSupervisor(state_path=STATE_FILE)
+
+# 非阻塞通知分派器 (桌面通知 / 記錄檔 / Webhook)
+bot.notifier = build_notifier(config)
+
 async def load_extensions():
     """自動載入 commands 目錄下所有合法模組"""
     # 設定指令目錄路徑
@@ -134,6 +147,10 @@ async def main():
         
         # 啟動機器人
         async with bot:
+            # 先接回重啟前仍在運行的伺服器，各模組載入時就能看到正確的運行狀態
+            adopted = await bot.supervisor.adopt()
+            if adopted:
+                logger.info(f"已接回 {len(adopted)} 個運行中的伺服器：{[m.name for m in adopted]}")
             await load_extensions()
             logger.info("開始連接 Discord 伺服器...")
             logger.info(f"使用的 Token 前 5 字元：{token[:5]}...")
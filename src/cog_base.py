@@ -0,0 +1,46 @@
+from discord.ext import commands
+from src.services.lifecycle import ManagedTasks, handover
+
+
+class ManagedCog(commands.Cog):
+    """
+    指令模組的共用生命週期
+
+    - manage(service)：cog_load 時啟動、cog_unload 時停止的背景服務 (BackgroundService)
+    - listen(add, remove, callback)：cog_load 時註冊、cog_unload 時移除的回呼
+    - self.tasks：卸載時一併取消的任務
+    - self.state：跨 reload_extension 保留的資料 (見 lifecycle.handover)
+
+    服務與程序都掛在 bot 上，重新載入只會停止再啟動同一個實例，
+    不會留下舊的輪詢任務或各自一份的伺服器狀態。
+    子類別覆寫 cog_load / cog_unload 時需呼叫 super()。
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.tasks = ManagedTasks()
+        self.state = handover(bot, type(self).__name__)
+        self._services = []
+        self._listeners = []
+
+    def manage(self, service):
+        """登記由此模組啟動與停止的背景服務，回傳 service"""
+        self._services.append(service)
+        return service
+
+    def listen(self, add, remove, callback, *args):
+        """登記回呼，例如 listen(supervisor.add_exit_listener, supervisor.remove_exit_listener, self.on_exit)"""
+        self._listeners.append((add, remove, callback, args))
+
+    async def cog_load(self):
+        for add, _, callback, args in self._listeners:
+            add(callback, *args)
+        for service in self._services:
+            service.start()
+
+    async def cog_unload(self):
+        for _, remove, callback, _ in reversed(self._listeners):
+            remove(callback)
+        await self.tasks.cancel_all()
+        for service in reversed(self._services):
+            await service.stop()
@@ -1,39 +1,15 @@
 from discord.ext import commands
-import json
 import logging
 import os
-from pathlib import Path
-import re
+from src.services.discovery import get_discovery
+from src.services.registry import get_registry
+from src.services.server_store import ServerStoreError
+from src.services.supervisor import build_command
+from src.cog_base import ManagedCog
 
 logger = logging.getLogger('bot')
 
-def parse_server_info(full_path):
-    """
-    解析路徑格式：.../名稱_版本_port_核心類型/StartServer.bat
-    範例：生存伺服器_1.20_25561_fabric
-    """
-    path_obj = Path(full_path)
-    
-    # 獲取父資料夾名稱
-    folder_name = path_obj.parent.name
-    
-    # 使用正則表達式解析
-    pattern = r"^(?P<name>.+?)_(?P<version>\d+\.\d+\.?\d*)_(?P<port>\d+)_(?P<core>.+)$"
-    match = re.match(pattern, folder_name)
-    
-    if not match:
-        raise ValueError(f"路徑格式錯誤：{folder_name}，預期格式：名稱_版本_port_核心類型")
-    
-    return {
-        "name": match.group("name"),
-        "version": match.group("version"),
-        "port": int(match.group("port")),
-        "core": match.group("core"),
-        "folder": str(path_obj.parent),
-        "script": path_obj.name
-    }
-
-class AddServerCommands(commands.Cog):
+class AddServerCommands(ManagedCog):
     COMMAND_HELP = {
         "name": "addserver",
         "title": "新增伺服器",
@@ -43,19 +19,28 @@ class AddServerCommands(commands.Cog):
         "sections": [
             {
                 "title": "參數格式",
-                "content": ["path_to_bat"]
+                "content": ["啟動腳本路徑 [更多路徑...]", "remove 啟動腳本路徑", "scan"]
             },
             {
                 "title": "路徑要求",
                 "content": [
                     "必須是絕對路徑",
-                    "需符合格式：.../名稱_版本_端口_核心/StartServer.bat",
-                    "範例：D:\\MC\\生存伺服器_1.20_25561_fabric\\StartServer.bat"
+                    "需符合格式：.../名稱_版本_端口_核心/啟動腳本",
+                    "啟動腳本可為 .bat / .cmd (Windows)、.sh 或 .jar",
+                    "範例：D:\\MC\\生存伺服器_1.20_25561_fabric\\StartServer.bat、/srv/mc/生存伺服器_1.20_25561_fabric/start.sh"
+                ]
+            },
+            {
+                "title": "自動偵測",
+                "content": [
+                    "設定 `server.base_path` 後會定期掃描其下的伺服器資料夾，不需逐一新增",
+                    "只重新讀取有變動的資料夾，新資料夾幾分鐘內就會出現在清單中",
+                    "`!addserver scan` - 立即重新掃描"
                 ]
             }
         ],
         "tips": [
-            "用法: !addserver <bat檔案路徑>",
+            "用法: !addserver <啟動腳本路徑> [更多路徑...] / !addserver remove <啟動腳本路徑> / !addserver scan",
             "功能: 新增伺服器到管理清單",
             "權限需求: canOpenServer 身分組",
             "範例: !addserver D:\\MC\\skyworld_1.21.4_25560_fabric\\StartServer.bat"
@@ -63,55 +48,110 @@ class AddServerCommands(commands.Cog):
     }
 
     def __init__(self, bot):
-        self.bot = bot
+        super().__init__(bot)
+        self.discovery = self.manage(get_discovery(bot))
+
+    async def cog_load(self):
+        # 合併上次留下的清單日誌 (例如寫入途中機器人被關閉)
+        try:
+            await get_registry(self.bot).store.recover()
+        except Exception as e:
+            logger.error(f"合併伺服器清單日誌失敗：{e}", exc_info=True)
+        await super().cog_load()
+
+    async def scan(self, ctx):
+        """立即掃描 base_path 並回報變動"""
+        if not self.discovery.enabled:
+            return await ctx.send("❌ 尚未設定 server.base_path，無法自動偵測伺服器")
+        try:
+            added, removed = await self.discovery.refresh()
+        except Exception as e:
+            logger.error(f"掃描伺服器資料夾失敗：{e}", exc_info=True)
+            return await ctx.send("❌ 掃描伺服器資料夾時發生錯誤")
+        stats = self.discovery.last_stats
+        lines = [
+            f"🔍 掃描完成：{len(self.discovery.registry.discovered)} 個自動偵測的伺服器 "
+            f"(走訪 {stats.visited} 個資料夾，重新讀取 {stats.listed} 個，耗時 {stats.duration:.2f} 秒)"
+        ]
+        lines.extend(f"➕ {path}" for path in added[:10])
+        lines.extend(f"➖ {path}" for path in removed[:10])
+        if len(added) > 10 or len(removed) > 10:
+            lines.append("…")
+        await ctx.send("\n".join(lines))
 
     @commands.command(name="addserver")
     @commands.has_role('canOpenServer')
-    async def add_server(self, ctx, path_to_bat: str):
-        """新增伺服器到管理清單"""
+    async def add_server(self, ctx, path_to_bat: str, *more_paths):
+        """新增伺服器到管理清單 (可一次新增多個)"""
+        if path_to_bat == 'scan':
+            return await self.scan(ctx)
+        if path_to_bat == 'remove':
+            return await self.remove_server(ctx, *more_paths)
+        paths = (path_to_bat,) + more_paths
+        registry = get_registry(self.bot)
         try:
-            # 驗證路徑格式
-            server_info = parse_server_info(path_to_bat)
-            
-            # 檢查檔案是否存在
-            if not os.path.exists(path_to_bat):
-                return await ctx.send("❌ 檔案不存在，請檢查路徑")
-                
-            if not path_to_bat.lower().endswith('.bat'):
-                return await ctx.send("❌ 必須是 .bat 檔案")
+            infos = []
+            for path in paths:
+                # 驗證路徑格式
+                server_info = registry.parser.parse(path)
+
+                # 檢查檔案是否存在
+                if not os.path.exists(path):
+                    return await ctx.send(f"❌ 檔案不存在，請檢查路徑：{path}")
+
+                # 只接受本機可以啟動的腳本 (.bat / .cmd 僅限 Windows、.sh、.jar)
+                try:
+                    build_command(path)
+                except ValueError as e:
+                    return await ctx.send(f"❌ {e}")
+                infos.append(server_info)
 
-            # 讀取並更新 servers.json
-            servers_file = 'assets/servers.json'
-            with open(servers_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # 檢查是否已存在
-            if any(s['path'] == path_to_bat for s in data['servers']):
+            # 多個路徑一次寫入；已存在的會被略過
+            added = set(await registry.store.add(*paths))
+            if not added:
                 return await ctx.send("⚠️ 此伺服器已存在於清單中")
+            await registry.ensure_fresh()
 
-            data['servers'].append({"path": path_to_bat})
-            
-            with open(servers_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-                
             # 回覆成功訊息
-            success_msg = (
-                f"✅ 已成功新增伺服器！\n"
-                f"名稱：{server_info['name']}\n"
-                f"版本：{server_info['version']}\n"
-                f"端口：{server_info['port']}\n"
-                f"核心：{server_info['core']}"
-            )
-            await ctx.send(success_msg)
-            
+            lines = []
+            for path, server_info in zip(paths, infos):
+                if path not in added:
+                    lines.append(f"⚠️ 已存在：{server_info.name} {server_info.version}")
+                    continue
+                lines.append(
+                    f"✅ 已成功新增伺服器！\n"
+                    f"名稱：{server_info.name}\n"
+                    f"版本：{server_info.version}\n"
+                    f"端口：{server_info.port}\n"
+                    f"核心：{server_info.core}"
+                )
+            await ctx.send("\n".join(lines))
+
         except ValueError as e:
             await ctx.send(f"❌ 路徑格式錯誤：{str(e)}")
-        except json.JSONDecodeError:
+        except ServerStoreError:
             await ctx.send("❌ 設定檔案格式錯誤")
         except Exception as e:
             logger.error(f"新增伺服器失敗：{e}", exc_info=True)
             await ctx.send("❌ 新增伺服器時發生未預期錯誤")
 
+    async def remove_server(self, ctx, *paths):
+        """從管理清單移除伺服器"""
+        if not paths:
+            return await ctx.send("❌ 請指定要移除的啟動腳本路徑")
+        try:
+            registry = get_registry(self.bot)
+            removed = await registry.store.remove(*paths)
+            if not removed:
+                return await ctx.send("⚠️ 清單中沒有此伺服器")
+            await registry.ensure_fresh()
+            await ctx.send("\n".join(f"🗑️ 已移除：{path}" for path in removed))
+        except ServerStoreError:
+            await ctx.send("❌ 設定檔案格式錯誤")
+        except Exception as e:
+            logger.error(f"移除伺服器失敗：{e}", exc_info=True)
+            await ctx.send("❌ 移除伺服器時發生未預期錯誤")
+
 async def setup(bot):
     await bot.add_cog(AddServerCommands(bot))
     logger.info('AddServer 指令已載入') 
\ No newline at end of file
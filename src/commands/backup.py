@@ -0,0 +1,311 @@
+from discord.ext import commands
+import asyncio
+import logging
+import os
+import time
+from src.utils import format_bytes, resolve_server
+from src.services.archive import (
+    ARCHIVE_ROOT, COMPRESS_LEVEL, ArchiveStats, ProgressThrottle, archive_name, archive_to_file, latest_archive
+)
+from src.services.alist import AlistError, UploadProgress, get_alist_client, para_path, upload_file
+from src.services.backup import BackupError, get_backup_engine, saves_paused
+from src.services.preflight import port_in_use
+from src.services.rcon import get_rcon_pool
+from src.services.supervisor import get_supervisor
+from src.cog_base import ManagedCog
+
+logger = logging.getLogger('bot')
+
+# 列出快照時顯示的數量
+LIST_LIMIT = 10
+
+
+class WorldBackup(ManagedCog):
+    COMMAND_HELP = {
+        "name": "backup",
+        "title": "世界備份",
+        "category": "進階",
+        "color": "0x1ABC9C",  # 青綠色
+        "description": "建立伺服器世界的增量快照，並可還原到任一快照",
+        "sections": [
+            {
+                "title": "參數格式",
+                "content": ["伺服器名稱"]
+            },
+            {
+                "title": "相關指令",
+                "content": [
+                    "`!backup list <伺服器>` - 列出快照",
+                    "`!backup restore <伺服器> <快照 ID>` - 還原快照 (需先關閉伺服器)",
+                    "`!backup prune <伺服器>` - 依保留規則清理舊快照",
+                    "`!backup archive <伺服器> [upload|achieve]` - 將整個伺服器資料夾封存為單一 .tar.gz，"
+                    "可上傳到 Alist 的 1_project/<資料夾>/backups 或 4_achieve/<資料夾>",
+                    "`!backup upload <伺服器> [upload|achieve]` - 重新上傳最新的封存檔 (從中斷處續傳)"
+                ]
+            },
+            {
+                "title": "注意事項",
+                "content": [
+                    "運行中的伺服器會先暫停自動存檔並寫入存檔 (save-off / save-all flush)，完成後恢復",
+                    "只有變動過的檔案會重新雜湊；區域檔依 chunk 時間戳只讀取改寫過的 chunk，相同內容只存一份",
+                    "每次備份後自動套用保留規則：保留最新數個快照與最近數天每天一個",
+                    "還原會覆寫世界資料夾，快照之後新增的檔案會被刪除",
+                    "封存以多核心平行壓縮，附有 MANIFEST.json 記錄每個檔案的 SHA-256，進度每 5 秒更新"
+                ]
+            }
+        ],
+        "tips": [
+            "用法: !backup <伺服器> / !backup list|restore|prune|archive|upload <伺服器>",
+            "異地備份: !backup archive skyworld upload",
+            "功能: 增量備份與還原伺服器世界",
+            "權限需求: canOpenServer 身分組",
+            "範例: !backup skyworld、!backup restore skyworld 20250101-120000"
+        ]
+    }
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.supervisor = get_supervisor(bot)
+        self.rcon_pool = get_rcon_pool(bot)
+        self.engine = get_backup_engine(bot)
+        logger.info('Backup 指令已初始化')
+
+    async def cog_unload(self):
+        await super().cog_unload()
+        # 程序池與連線在下次使用時重新建立
+        self.engine.close()
+        client = getattr(self.bot, 'alist_client', None)
+        if client is not None:
+            await client.close()
+
+    async def running_elsewhere(self, info):
+        """伺服器是否在機器人之外運行 (休眠監聽佔用的端口不算)"""
+        idle = getattr(self.bot, 'idle_manager', None)
+        if idle is not None and info.port in idle.listeners:
+            return False
+        return await asyncio.to_thread(port_in_use, info.port) is not None
+
+    async def saves_paused(self, info):
+        """依伺服器運行方式選擇以主控台或 RCON 暫停存檔"""
+        managed = self.supervisor.get(info.name)
+        rcon_pool = None
+        if managed is not None and managed.is_running and not managed.has_console:
+            # 重啟後接回的伺服器沒有主控台管線，改用 RCON
+            managed, rcon_pool = None, self.rcon_pool
+        elif (managed is None or not managed.is_running) and await self.running_elsewhere(info):
+            rcon_pool = self.rcon_pool
+        return saves_paused(info, managed, rcon_pool)
+
+    @commands.command(name="backup")
+    @commands.has_role('canOpenServer')
+    async def backup(self, ctx, server: str, *args):
+        """建立世界快照，或 list / restore / prune"""
+        actions = {
+            'list': self.list_snapshots, 'restore': self.restore, 'prune': self.prune,
+            'archive': self.archive, 'upload': self.upload
+        }
+        if server in actions:
+            if not args:
+                return await ctx.send(f"❌ 請指定伺服器，例如：!backup {server} skyworld")
+            return await actions[server](ctx, *args)
+        try:
+            info = await resolve_server(self.bot, ctx, server)
+            if info is None:
+                return
+            if self.engine.busy(info):
+                return await ctx.send(f"⏳ {info.name} 正在備份或還原中")
+
+            reply = await ctx.send(f"💾 正在備份 {info.name}…")
+            async with await self.saves_paused(info):
+                manifest = await self.engine.snapshot(info)
+
+            message = (
+                f"✅ {info.name} 備份完成：`{manifest['id']}`\n"
+                f"• 檔案：{len(manifest['files'])} 個，共 {format_bytes(manifest['size'])}\n"
+                f"• 變動：{manifest['changed']} 個檔案 ({format_bytes(manifest['changed_size'])})，"
+                f"實際讀取 {format_bytes(manifest['read'])}\n"
+                f"⏱️ 耗時 {manifest['duration']:.1f} 秒"
+            )
+            if manifest['removed']:
+                message += (
+                    f"\n🧹 依保留規則刪除 {len(manifest['removed'])} 個舊快照，"
+                    f"釋放 {format_bytes(manifest['freed'])}"
+                )
+            await reply.edit(content=message)
+        except BackupError as e:
+            await ctx.send(f"❌ 備份失敗：{e}")
+        except Exception as e:
+            logger.error(f"backup 指令錯誤：{e}", exc_info=True)
+            await ctx.send(f"❌ 備份失敗：{str(e)}")
+
+    async def list_snapshots(self, ctx, server, *args):
+        info = await resolve_server(self.bot, ctx, server)
+        if info is None:
+            return
+        store = self.engine.store_for(info)
+        ids = await asyncio.to_thread(store.snapshot_ids)
+        if not ids:
+            return await ctx.send(f"ℹ️ {info.name} 尚無快照")
+        lines = []
+        for snapshot_id in reversed(ids[-LIST_LIMIT:]):
+            manifest = await asyncio.to_thread(store.load, snapshot_id)
+            created = time.strftime('%Y-%m-%d %H:%M', time.localtime(manifest['created']))
+            lines.append(
+                f"• `{snapshot_id}` - {created}，{format_bytes(manifest['size'])}，"
+                f"{manifest['changed']} 個檔案變動"
+            )
+        await ctx.send(f"💾 {info.name} 的快照 (共 {len(ids)} 個)：\n" + "\n".join(lines))
+
+    async def restore(self, ctx, server, snapshot_id=None, *args):
+        if snapshot_id is None:
+            return await ctx.send("❌ 請指定快照 ID，可用 !backup list <伺服器> 查看")
+        info = await resolve_server(self.bot, ctx, server)
+        if info is None:
+            return
+        # 還原期間不能讓休眠監聽喚醒伺服器
+        idle = getattr(self.bot, 'idle_manager', None)
+        if idle is not None:
+            await idle.release(info)
+        try:
+            if self.supervisor.is_running(info.name) or await self.running_elsewhere(info):
+                return await ctx.send(f"⚠️ {info.name} 正在運行，請先使用 !stop 關閉再還原")
+            reply = await ctx.send(f"♻️ 正在將 {info.name} 還原為 `{snapshot_id}`…")
+            restored = await self.engine.restore(info, snapshot_id)
+            await reply.edit(content=f"✅ {info.name} 已還原為 `{snapshot_id}` (改寫 {restored} 個檔案)")
+        except BackupError as e:
+            await ctx.send(f"❌ 還原失敗：{e}")
+        except Exception as e:
+            logger.error(f"backup restore 錯誤：{e}", exc_info=True)
+            await ctx.send(f"❌ 還原失敗：{str(e)}")
+        finally:
+            if idle is not None:
+                idle.resume(info.name)
+
+    async def prune(self, ctx, server, *args):
+        info = await resolve_server(self.bot, ctx, server)
+        if info is None:
+            return
+        removed, freed = await self.engine.prune(info)
+        if not removed:
+            return await ctx.send(f"ℹ️ {info.name} 沒有需要清理的快照")
+        await ctx.send(f"🧹 已刪除 {len(removed)} 個舊快照，釋放 {format_bytes(freed)}")
+
+    def archive_progress(self, info, stats):
+        rate = stats.bytes_in / stats.elapsed if stats.elapsed else 0
+        return (
+            f"📦 正在封存 {info.name}：{stats.files} 個檔案，{format_bytes(stats.bytes_in)} "
+            f"→ {format_bytes(stats.bytes_out)} ({format_bytes(rate)}/s)\n"
+            f"📄 {stats.current or ''}"
+        )
+
+    def upload_progress(self, info, progress):
+        done = progress.sent + progress.skipped
+        rate = progress.sent / progress.elapsed if progress.elapsed else 0
+        percent = done / progress.total if progress.total else 1
+        return (
+            f"☁️ 正在上傳 {info.name} 的封存檔：{percent:.0%} "
+            f"({format_bytes(done)} / {format_bytes(progress.total)}，{format_bytes(rate)}/s)"
+        )
+
+    def archive_root(self):
+        return self.bot.config.get('backup', {}).get('archive_root') or ARCHIVE_ROOT
+
+    def alist_client(self, target):
+        """檢查上傳目標並取得 Alist 用戶端，有問題時回傳錯誤訊息"""
+        if target not in ('upload', 'achieve'):
+            return None, "❌ 上傳目標只能是 upload (1_project) 或 achieve (4_achieve)"
+        client = get_alist_client(self.bot)
+        if client is None:
+            return None, "❌ 尚未設定 Alist 的網址與帳號，無法上傳"
+        return client, None
+
+    async def upload_archive(self, client, info, path, target, reply, message=""):
+        """將封存檔上傳到伺服器資料夾對應的 PARA 目錄"""
+        folder = os.path.basename(os.path.normpath(info.folder))
+        if target == 'achieve':
+            remote_dir = para_path('achieve', folder)
+        else:
+            remote_dir = para_path('project', folder, 'backups')
+        prefix = f"{message}\n" if message else ""
+        progress = UploadProgress(await asyncio.to_thread(os.path.getsize, path))
+        throttle = ProgressThrottle(progress, lambda p: reply.edit(content=prefix + self.upload_progress(info, p)))
+        throttle.start()
+        try:
+            remote = await upload_file(client, path, remote_dir, progress=progress)
+        except AlistError as e:
+            raise AlistError(
+                f"{e}\n💡 本機封存檔 `{path}` 已保留，使用 `!backup upload {info.name}` 可從中斷的分段續傳"
+            )
+        finally:
+            await throttle.stop()
+        resumed = f"，略過已上傳的 {format_bytes(progress.skipped)}" if progress.skipped else ""
+        await reply.edit(content=(
+            f"{prefix}☁️ 已上傳到 Alist：`{remote}` (耗時 {progress.elapsed:.1f} 秒{resumed})"
+        ))
+
+    async def archive(self, ctx, server, target=None, *args):
+        client = None
+        if target is not None:
+            client, error = self.alist_client(target)
+            if error:
+                return await ctx.send(error)
+        try:
+            info = await resolve_server(self.bot, ctx, server)
+            if info is None:
+                return
+            backup_cfg = self.bot.config.get('backup', {})
+            path = os.path.join(self.archive_root(), archive_name(info.folder))
+            stats = ArchiveStats()
+            reply = await ctx.send(f"📦 正在封存 {info.name}…")
+            # 編輯訊息有速率限制，進度每隔數秒才更新一次
+            throttle = ProgressThrottle(stats, lambda s: reply.edit(content=self.archive_progress(info, s)))
+            throttle.start()
+            try:
+                async with await self.saves_paused(info):
+                    manifest = await archive_to_file(
+                        info.folder, path, stats,
+                        level=int(backup_cfg.get('compress_level', COMPRESS_LEVEL)),
+                        workers=int(backup_cfg.get('compress_workers', 0)) or None
+                    )
+            finally:
+                await throttle.stop()
+            message = (
+                f"✅ {info.name} 封存完成：`{path}`\n"
+                f"• {len(manifest['files'])} 個檔案，{format_bytes(stats.bytes_in)} → "
+                f"{format_bytes(stats.bytes_out)} ({stats.ratio:.0%})\n"
+                f"⏱️ 耗時 {stats.elapsed:.1f} 秒"
+            )
+            await reply.edit(content=message)
+            if client is not None:
+                await self.upload_archive(client, info, path, target, reply, message)
+        except AlistError as e:
+            await ctx.send(f"❌ 上傳到 Alist 失敗：{e}")
+        except BackupError as e:
+            await ctx.send(f"❌ 封存失敗：{e}")
+        except Exception as e:
+            logger.error(f"backup archive 錯誤：{e}", exc_info=True)
+            await ctx.send(f"❌ 封存失敗：{str(e)}")
+
+    async def upload(self, ctx, server, target='upload', *args):
+        """重新上傳最新的封存檔 (續傳中斷的上傳)"""
+        client, error = self.alist_client(target)
+        if error:
+            return await ctx.send(error)
+        try:
+            info = await resolve_server(self.bot, ctx, server)
+            if info is None:
+                return
+            path = await asyncio.to_thread(latest_archive, self.archive_root(), info.folder)
+            if path is None:
+                return await ctx.send(f"❌ 找不到 {info.name} 的封存檔，請先使用 `!backup archive {info.name}`")
+            reply = await ctx.send(f"☁️ 正在上傳 `{path}`…")
+            await self.upload_archive(client, info, path, target, reply)
+        except AlistError as e:
+            await ctx.send(f"❌ 上傳到 Alist 失敗：{e}")
+        except Exception as e:
+            logger.error(f"backup upload 錯誤：{e}", exc_info=True)
+            await ctx.send(f"❌ 上傳失敗：{str(e)}")
+
+async def setup(bot):
+    await bot.add_cog(WorldBackup(bot))
+    logger.info('Backup 指令已載入')
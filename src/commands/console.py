@@ -0,0 +1,182 @@
+from discord.ext import commands
+import asyncio
+import logging
+import re
+from src.utils import resolve_server
+from src.services.console import ConsoleBatcher
+from src.services.supervisor import get_supervisor
+from src.cog_base import ManagedCog
+
+logger = logging.getLogger('bot')
+
+# 常用的過濾條件
+FILTER_PRESETS = {
+    '--errors': r'WARN|ERROR|Exception',
+    '--joins': r'joined the game|left the game',
+    '--chat': r'<[^>]+>',
+}
+
+# 開始轉送時先顯示的最近行數
+BACKLOG_LINES = 20
+
+# 過濾條件在事件迴圈上逐行比對，限制長度並拒絕巢狀重複 (例如 (a+)+)，避免回溯爆炸拖住機器人
+MAX_FILTER_LENGTH = 100
+NESTED_QUANTIFIER = re.compile(r"\((?:[^()\\]|\\.)*[+*}](?:[^()\\]|\\.)*\)[+*{]")
+
+
+def compile_filter(args):
+    """將參數轉為正規表達式 (可為預設條件名稱)，無參數時回傳 None；格式不允許時拋出 re.error"""
+    if not args:
+        return None
+    text = ' '.join(args)
+    source = FILTER_PRESETS.get(text, text)
+    if len(source) > MAX_FILTER_LENGTH:
+        raise re.error(f"長度不可超過 {MAX_FILTER_LENGTH} 個字元")
+    if NESTED_QUANTIFIER.search(source):
+        raise re.error("不支援巢狀重複 (例如 (a+)+)")
+    return re.compile(source, re.IGNORECASE)
+
+
+class ConsoleTail(ManagedCog):
+    COMMAND_HELP = {
+        "name": "console",
+        "title": "主控台輸出",
+        "category": "進階",
+        "color": "0x34495E",  # 深藍灰
+        "description": "將伺服器主控台的新輸出即時轉送到目前頻道",
+        "sections": [
+            {
+                "title": "參數格式",
+                "content": ["伺服器名稱", "過濾條件 (選填，正規表達式或預設條件)"]
+            },
+            {
+                "title": "預設條件",
+                "content": [
+                    "`--errors` - 只顯示 WARN / ERROR",
+                    "`--joins` - 只顯示玩家進出",
+                    "`--chat` - 只顯示聊天訊息"
+                ]
+            },
+            {
+                "title": "相關指令",
+                "content": [
+                    "`!console off [伺服器]` - 停止目前頻道的轉送"
+                ]
+            },
+            {
+                "title": "注意事項",
+                "content": [
+                    "僅限由機器人啟動的伺服器 (機器人重啟前啟動的伺服器需重新啟動後才能使用)",
+                    "輸出每 2 秒或累積滿一則訊息時合併送出",
+                    "輸出過快時只保留最新的內容，並提示略過的行數",
+                    "伺服器關閉時自動停止轉送",
+                    "過濾條件最多 100 個字元，不支援巢狀重複 (例如 (a+)+)"
+                ]
+            }
+        ],
+        "tips": [
+            "用法: !console <伺服器> [過濾條件]",
+            "功能: 即時查看伺服器主控台輸出",
+            "權限需求: canOpenServer 身分組",
+            "範例: !console skyworld --errors、!console skyworld \"Done|Stopping\""
+        ]
+    }
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.supervisor = get_supervisor(bot)
+        # 進行中的轉送 (頻道 ID, 伺服器名稱) -> 過濾條件原文 (或 None)；轉送任務在 self.tasks 中
+        # 放在跨重新載入保留的狀態裡 (只存資料)，重新載入後依頻道 ID 找回頻道並恢復轉送
+        self.tails = self.state.setdefault('tails', {})
+        logger.info('Console 指令已初始化')
+
+    async def cog_load(self):
+        await super().cog_load()
+        for key, source in list(self.tails.items()):
+            channel = self.bot.get_channel(key[0])
+            managed = self.supervisor.get(key[1])
+            if channel is None or managed is None or not managed.is_running:
+                del self.tails[key]
+                continue
+            pattern = compile_filter([source]) if source is not None else None
+            self.tasks.spawn(self.tail(channel, managed, managed.console.subscribe(pattern)), key)
+        if self.tails:
+            logger.info(f"已恢復 {len(self.tails)} 個主控台轉送")
+
+    async def find_process(self, ctx, server):
+        managed = self.supervisor.get(server)
+        if managed is None:
+            info = await resolve_server(self.bot, ctx, server)
+            if info is None:
+                return None
+            managed = self.supervisor.get(info.name)
+            if managed is None:
+                await ctx.send(f"❌ {info.name} 不是由機器人啟動，無法讀取主控台")
+        return managed
+
+    async def tail(self, channel, managed, subscription):
+        key = (channel.id, managed.name)
+        try:
+            await ConsoleBatcher(subscription, channel.send).run()
+            await channel.send(f"⚫ {managed.name} 已停止，結束主控台轉送")
+        except asyncio.CancelledError:
+            # 被取代、被 !console off 停止或模組卸載；紀錄由對應的一方處理
+            raise
+        except Exception as e:
+            logger.error(f"主控台轉送錯誤：{e}", exc_info=True)
+        finally:
+            subscription.close()
+        if self.tasks.get(key) is asyncio.current_task():
+            self.tails.pop(key, None)
+
+    @commands.command(name="console")
+    @commands.has_role('canOpenServer')
+    async def console(self, ctx, server: str, *args):
+        """即時轉送伺服器主控台輸出"""
+        if server == 'off':
+            return await self.stop_tail(ctx, args[0] if args else None)
+        try:
+            pattern = compile_filter(args)
+        except re.error as e:
+            return await ctx.send(f"❌ 過濾條件格式錯誤：{e}")
+
+        managed = await self.find_process(ctx, server)
+        if managed is None:
+            return
+        if not managed.is_running:
+            return await ctx.send(f"⚫ {managed.name} 未在運行")
+        if not managed.has_console:
+            return await ctx.send(f"ℹ️ {managed.name} 於機器人重啟前啟動，無法讀取主控台 (重新啟動後即可使用)")
+
+        key = (ctx.channel.id, managed.name)
+        self.tasks.cancel(key)
+
+        backlog = managed.console.tail(BACKLOG_LINES, pattern)
+        subscription = managed.console.subscribe(pattern)
+        header = f"🖥️ 開始轉送 {managed.name} 的主控台"
+        if pattern is not None:
+            header += f" (過濾：`{pattern.pattern}`)"
+        await ctx.send(header)
+        if backlog:
+            batcher = ConsoleBatcher(subscription, ctx.send)
+            for block in batcher.pack(backlog)[-1:]:
+                await ctx.send(batcher.format(block))
+        self.tails[key] = pattern.pattern if pattern is not None else None
+        self.tasks.spawn(self.tail(ctx.channel, managed, subscription), key)
+
+    async def stop_tail(self, ctx, server):
+        keys = [
+            key for key in self.tails
+            if key[0] == ctx.channel.id and (server is None or key[1] == server)
+        ]
+        if not keys:
+            return await ctx.send("ℹ️ 目前頻道沒有進行中的主控台轉送")
+        for key in keys:
+            self.tails.pop(key)
+            self.tasks.cancel(key)
+        await ctx.send("🛑 已停止主控台轉送：" + "、".join(key[1] for key in keys))
+
+
+async def setup(bot):
+    await bot.add_cog(ConsoleTail(bot))
+    logger.info('Console 指令已載入')
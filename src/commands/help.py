@@ -5,7 +5,6 @@ import json
 from pathlib import Path
 import frontmatter
 import re
-from src.bot import config  # 直接使用主程式的設定
 
 logger = logging.getLogger('bot')
 
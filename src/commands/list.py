@@ -1,12 +1,20 @@
 from discord.ext import commands
-import json
 import logging
-from pathlib import Path
-import re
+from src.services.registry import get_registry
+from src.services.supervisor import get_supervisor
+from src.services.status import RUNNING, SLEEPING, STARTING, STOPPED, get_status_collector, server_state
+from src.cog_base import ManagedCog
 
 logger = logging.getLogger('bot')
 
-class ServerList(commands.Cog, name="伺服器管理"):
+STATUS_TEXT = {
+    RUNNING: "🟢 運行中",
+    STARTING: "🟡 啟動中",
+    SLEEPING: "💤 休眠中",
+    STOPPED: "⚫ 關閉",
+}
+
+class ServerList(ManagedCog, name="伺服器管理"):
     COMMAND_HELP = {
         "name": "list",
         "title": "伺服器列表",
@@ -16,24 +24,35 @@ class ServerList(commands.Cog, name="伺服器管理"):
         "sections": [
             {
                 "title": "參數格式",
-                "content": []  # 無參數
+                "content": ["--fresh (選填)"]
             },
             {
                 "title": "狀態說明",
                 "content": [
-                    "🟢 運行中 - 伺服器正常運作",
+                    "🟢 運行中 - 伺服器正常運作並接受連線",
+                    "🟡 啟動中 - 程序已啟動但尚未接受連線",
+                    "💤 休眠中 - 伺服器未啟動，玩家連線時會自動喚醒 (wake_on_join)",
                     "⚫ 關閉 - 伺服器未啟動"
                 ]
             },
             {
                 "title": "顯示資訊",
                 "content": [
-                    "包含版本號、使用核心與監聽端口"
+                    "包含版本號、使用核心與監聽端口",
+                    "運行中的伺服器另外顯示線上人數、延遲與 MOTD",
+                    "狀態以 Server List Ping 實際連線查詢，非本機器人啟動的伺服器也能偵測"
+                ]
+            },
+            {
+                "title": "更新機制",
+                "content": [
+                    "背景每 5 分鐘自動查詢一次，指令直接回傳最近一次結果",
+                    "加上 --fresh 可立即重新查詢 (有冷卻時間)"
                 ]
             }
         ],
         "tips": [
-            "用法: !list",
+            "用法: !list [--fresh]",
             "功能: 顯示所有伺服器即時狀態",
             "權限需求: canOpenServer 身分組",
             "列表每 5 分鐘自動更新"
@@ -41,35 +60,54 @@ class ServerList(commands.Cog, name="伺服器管理"):
     }
 
     def __init__(self, bot):
-        self.bot = bot
+        super().__init__(bot)
+        self.collector = self.manage(get_status_collector(bot))
+        self.supervisor = get_supervisor(bot)
+        self.listen(self.supervisor.add_exit_listener, self.supervisor.remove_exit_listener, self.on_server_exit)
         logger.info('List 指令已初始化')
 
+    async def on_server_exit(self, managed):
+        """伺服器程序結束時立即更新該端口狀態，不必等下次定時刷新"""
+        if managed.spec.port is not None:
+            await self.collector.refresh_port(managed.spec.port)
+
     @commands.command(name="list", description="列出所有可用的 Minecraft 伺服器")
     @commands.has_role('canOpenServer')
-    async def list(self, ctx):
+    async def list(self, ctx, *options):
         """列出所有可用的伺服器"""
         try:
-            with open('assets/servers.json', 'r', encoding='utf-8') as f:
-                servers = json.load(f)['servers']
+            registry = get_registry(self.bot)
+            await registry.ensure_fresh()
+            cooldown = 0
+            if '--fresh' in options:
+                snapshot, cooldown = await self.collector.force_refresh()
+            else:
+                snapshot = await self.collector.get([info.port for info in registry])
             
+            # 休眠監聽也會回應狀態查詢，這些端口不算運行中
+            idle = getattr(self.bot, 'idle_manager', None)
+            sleeping_ports = set(idle.listeners) if idle is not None else set()
+
             server_list = "📋 自動偵測的伺服器列表：\n\n"
             
-            for s in servers:
-                try:
-                    info = parse_server_info(s['path'])
-                    start_cog = self.bot.get_cog('StartServer')
-                    proc = start_cog.active_servers.get(info['name'])
-                    is_active = proc is not None and proc.poll() is None
-                    
-                    status = "🟢 運行中" if is_active else "⚫ 關閉"
+            for info in registry:
+                state, slp = server_state(info, snapshot, self.supervisor, sleeping_ports)
+                server_list += (
+                    f"• {info.name} ({STATUS_TEXT[state]})\n"
+                    f"  版本：{info.version} | 端口：{info.port} | 核心：{info.core}\n"
+                )
+                if slp is not None:
                     server_list += (
-                        f"• {info['name']} ({status})\n"
-                        f"  版本：{info['version']} | 端口：{info['port']} | 核心：{info['core']}\n"
-                        f"  路徑：{s['path']}\n\n"
+                        f"  玩家：{slp.players_online}/{slp.players_max} | "
+                        f"延遲：{slp.latency_ms:.0f} ms | 協定：{slp.protocol}\n"
                     )
-                except Exception as e:
-                    logger.error(f"解析伺服器 {s['path']} 失敗：{e}")
+                    if slp.motd:
+                        server_list += f"  MOTD：{slp.motd}\n"
+                server_list += f"  路徑：{info.path}\n\n"
             
+            server_list += f"🕒 狀態更新於 {snapshot.age:.0f} 秒前"
+            if cooldown:
+                server_list += f"\n⏳ 強制刷新冷卻中，請於 {cooldown:.0f} 秒後再試"
             await ctx.send(server_list)
             
         except Exception as e:
@@ -78,29 +116,3 @@ class ServerList(commands.Cog, name="伺服器管理"):
 async def setup(bot):
     await bot.add_cog(ServerList(bot))
     logger.info('List 指令已載入')
-
-def parse_server_info(full_path):
-    """
-    解析路徑格式：.../名稱_版本_port_核心類型/StartServer.bat
-    範例：生存伺服器_1.20_25561_fabric
-    """
-    path_obj = Path(full_path)
-    
-    # 獲取父資料夾名稱
-    folder_name = path_obj.parent.name
-    
-    # 使用正則表達式解析
-    pattern = r"^(?P<name>.+?)_(?P<version>\d+\.\d+\.?\d*)_(?P<port>\d+)_(?P<core>.+)$"
-    match = re.match(pattern, folder_name)
-    
-    if not match:
-        raise ValueError(f"路徑格式錯誤：{folder_name}，預期格式：名稱_版本_port_核心類型")
-    
-    return {
-        "name": match.group("name"),
-        "version": match.group("version"),
-        "port": int(match.group("port")),
-        "core": match.group("core"),
-        "folder": str(path_obj.parent),
-        "script": path_obj.name
-    } 
\ No newline at end of file
@@ -0,0 +1,113 @@
+from discord.ext import commands
+import logging
+import re
+from src.utils import resolve_server
+from src.services.rcon import RconError, get_rcon_pool
+
+logger = logging.getLogger('bot')
+
+# 原版 list 指令回應：There are 3 of a max of 20 players online: a, b, c
+PLAYERS_PATTERN = re.compile(r"There are (?P<online>\d+) of a max(?: of)? (?P<max>\d+) players online:?(?P<names>.*)", re.S)
+
+
+class RconCommands(commands.Cog):
+    COMMAND_HELP = {
+        "name": "rcon",
+        "title": "遠端主控台",
+        "category": "進階",
+        "color": "0x1ABC9C",  # 綠松色
+        "description": "透過 RCON 對運行中的伺服器下達指令",
+        "sections": [
+            {
+                "title": "參數格式",
+                "content": ["伺服器名稱", "指令"]
+            },
+            {
+                "title": "相關指令",
+                "content": [
+                    "`!players <伺服器>` - 查看線上玩家",
+                    "`!say <伺服器> <訊息>` - 在遊戲內廣播訊息",
+                    "`!rcon <伺服器> <指令>` - 執行任意主控台指令"
+                ]
+            },
+            {
+                "title": "注意事項",
+                "content": [
+                    "伺服器需在 server.properties 設定 enable-rcon=true",
+                    "伺服器名稱可輸入「名稱」或「名稱_版本」",
+                    "每個伺服器維持一條已登入的連線，斷線時自動重連"
+                ]
+            }
+        ],
+        "tips": [
+            "用法: !rcon <伺服器> <指令>",
+            "功能: 透過 RCON 操作運行中的伺服器",
+            "權限需求: canOpenServer 身分組",
+            "範例: !players skyworld、!say skyworld 五分鐘後重啟"
+        ]
+    }
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.pool = get_rcon_pool(bot)
+        logger.info('RCON 指令已初始化')
+
+    async def cog_unload(self):
+        await self.pool.close()
+
+    async def run(self, ctx, server, command):
+        """執行 RCON 指令，回傳 (伺服器, 回應文字)；失敗時回覆錯誤並回傳 None"""
+        info = await resolve_server(self.bot, ctx, server)
+        if info is None:
+            return None
+        try:
+            return info, await self.pool.command(info, command)
+        except RconError as e:
+            await ctx.send(f"❌ RCON 執行失敗：{e}")
+        except Exception as e:
+            logger.error(f"RCON 指令錯誤：{e}", exc_info=True)
+            await ctx.send("❌ RCON 執行時發生未預期錯誤")
+        return None
+
+    @commands.command(name="rcon")
+    @commands.has_role('canOpenServer')
+    async def rcon(self, ctx, server: str, *, command: str):
+        """執行任意主控台指令"""
+        result = await self.run(ctx, server, command)
+        if result is None:
+            return
+        info, response = result
+        response = response.strip() or "(無回應)"
+        if len(response) > 1900:
+            response = response[:1900] + "\n…(已截斷)"
+        await ctx.send(f"🖥️ {info.name} > `{command}`\n```\n{response}\n```")
+
+    @commands.command(name="say")
+    @commands.has_role('canOpenServer')
+    async def say(self, ctx, server: str, *, message: str):
+        """在遊戲內廣播訊息"""
+        result = await self.run(ctx, server, f"say [{ctx.author.display_name}] {message}")
+        if result is not None:
+            await ctx.send(f"📢 已在 {result[0].name} 廣播訊息")
+
+    @commands.command(name="players")
+    @commands.has_role('canOpenServer')
+    async def players(self, ctx, server: str):
+        """查看線上玩家"""
+        result = await self.run(ctx, server, "list")
+        if result is None:
+            return
+        info, response = result
+        match = PLAYERS_PATTERN.search(response)
+        if not match:
+            return await ctx.send(f"👥 {info.name}：{response.strip()}")
+        names = [n.strip() for n in match.group('names').split(',') if n.strip()]
+        message = f"👥 {info.name} 線上玩家：{match.group('online')}/{match.group('max')}"
+        if names:
+            message += "\n" + "\n".join(f"• {n}" for n in names)
+        await ctx.send(message)
+
+
+async def setup(bot):
+    await bot.add_cog(RconCommands(bot))
+    logger.info('RCON 指令已載入')
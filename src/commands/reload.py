@@ -0,0 +1,70 @@
+from discord.ext import commands
+import logging
+
+logger = logging.getLogger('bot')
+
+EXTENSION_PREFIX = 'src.commands.'
+
+
+class ReloadCommands(commands.Cog):
+    COMMAND_HELP = {
+        "name": "reload",
+        "title": "重新載入指令",
+        "category": "系統",
+        "color": "0x95A5A6",  # 灰色
+        "description": "不重啟機器人直接套用指令模組的修改",
+        "sections": [
+            {
+                "title": "參數格式",
+                "content": ["[模組名稱|all]"]
+            },
+            {
+                "title": "重新載入時",
+                "content": [
+                    "運行中的伺服器、程序監看與快取都掛在機器人上，不受影響",
+                    "舊模組的背景任務與回呼會先停止，不會重複輪詢",
+                    "主控台轉送會在重新載入後自動恢復"
+                ]
+            }
+        ],
+        "tips": [
+            "用法: !reload <模組名稱> / !reload all",
+            "功能: 熱更新指令模組",
+            "權限需求: 機器人擁有者",
+            "範例: !reload start"
+        ]
+    }
+
+    def __init__(self, bot):
+        self.bot = bot
+        logger.info('Reload 指令已初始化')
+
+    @commands.command(name="reload")
+    @commands.is_owner()
+    async def reload(self, ctx, name: str = None):
+        """重新載入指定 (或全部) 指令模組"""
+        loaded = sorted(
+            extension[len(EXTENSION_PREFIX):] for extension in self.bot.extensions
+            if extension.startswith(EXTENSION_PREFIX)
+        )
+        if name is None:
+            return await ctx.send(f"ℹ️ 已載入的模組：{'、'.join(loaded)}\n用法：!reload <模組名稱> 或 !reload all")
+        targets = loaded if name == 'all' else [name]
+        results = []
+        for target in targets:
+            try:
+                await self.bot.reload_extension(f"{EXTENSION_PREFIX}{target}")
+                results.append(f"✅ {target}")
+                logger.info(f"已重新載入：{target}")
+            except commands.ExtensionNotLoaded:
+                results.append(f"❌ {target}：模組未載入")
+            except commands.ExtensionError as e:
+                # 載入失敗時 discord.py 會保留舊版本
+                logger.error(f"重新載入 {target} 失敗：{e}", exc_info=True)
+                results.append(f"❌ {target}：{e}")
+        await ctx.send("\n".join(results))
+
+
+async def setup(bot):
+    await bot.add_cog(ReloadCommands(bot))
+    logger.info('Reload 指令已載入')
@@ -3,62 +3,33 @@
 # 運行測試：poetry run pytest tests/
 
 from discord.ext import commands
-import subprocess
-import json
+import asyncio
 import os
-from plyer import notification
+import time
 import logging
-import psutil  # 新增依賴，需安裝
-import asyncio
-import re
-from pathlib import Path
+from src.services.registry import get_registry
+from src.services.supervisor import LaunchSpec, get_supervisor
+from src.services.notifier import get_notifier
+from src.services.preflight import run_preflight
+from src.services.scheduler import GB, LaunchCancelled, get_launch_scheduler
+from src.services.readiness import (
+    FAILED, LOADING, READY, SPAWNED, get_startup_history, wait_until_ready
+)
+from src.services.slp import DEFAULT_HOST
+from src.services.logtail import get_log_watcher
+from src.services.tps import get_tps_monitor
+from src.services.idle import get_idle_manager
+from src.cog_base import ManagedCog
 
 logger = logging.getLogger(__name__)
 
-def send_desktop_notification(title, message):
-    try:
-        notification.notify(
-            title=f"[MC Server Bot] {title}",
-            message=f"{message}\n\n來自 open-myMinecraftServer 系統通知",
-            app_name='MC Server Controller',
-            timeout=15,
-            toast=True
-        )
-        logger.info(f"系統通知已發送：{title}")
-    except Exception as e:
-        logger.error(f"通知發送失敗：{str(e)}")
-
-def parse_server_info(full_path):
-    """
-    解析路徑格式：.../名稱_版本_port_核心類型/StartServer.bat
-    範例：skywind_empire2_1.21.4_25560_fabric
-    """
-    path_obj = Path(full_path)
-    
-    # 獲取父資料夾名稱
-    folder_name = path_obj.parent.name
-    
-    # 使用正則表達式解析
-    pattern = r"^(?P<name>.+?)_(?P<version>\d+\.\d+\.\d+)_(?P<port>\d+)_(?P<core>.+)$"
-    match = re.match(pattern, folder_name)
-    
-    if not match:
-        raise ValueError(
-            f"路徑格式錯誤：{folder_name}\n"
-            "正確格式應為：名稱_三位版本號_端口_核心類型\n"
-            "範例：skywind_empire2_1.21.4_25560_fabric"
-        )
-    
-    return {
-        "name": match.group("name"),
-        "version": match.group("version"),
-        "port": int(match.group("port")),
-        "core": match.group("core"),
-        "folder": str(path_obj.parent),
-        "script": path_obj.name
-    }
+STAGE_TEXT = {
+    SPAWNED: "🚀 程序已啟動，等待伺服器載入…",
+    LOADING: "⏳ 伺服器載入中…",
+    READY: "✅ 伺服器已就緒",
+}
 
-class StartServer(commands.Cog):
+class StartServer(ManagedCog):
     COMMAND_HELP = {
         "name": "start",
         "title": "伺服器啟動",
@@ -77,6 +48,15 @@ class StartServer(commands.Cog):
                 "content": [
                     "需要 'canOpenServer' 角色權限",
                     "啟動過程約需 1-3 分鐘",
+                    "回覆會依序更新：程序啟動 → 載入中 → 已就緒",
+                    "出現 Done 訊息或端口可連線時即視為就緒，並記錄啟動耗時",
+                    "主機資源已滿時會排隊等待，可用 !queue 查看、!queue cancel 取消",
+                    "名稱可只輸入前綴或部分文字，版本可省略小版本號 (如 1.21)",
+                    "找不到時會列出相近的伺服器供參考",
+                    "支援 .bat (Windows)、.sh 與 .jar 啟動腳本",
+                    "啟動前會檢查端口是否被佔用、是否與其他伺服器重複，以及記憶體是否足夠 -Xmx 設定",
+                    "可設定無人超過一段時間自動停止；開啟 wake_on_join 時，玩家連線到已停止的伺服器會自動啟動",
+                    "機器人重啟後會自動接回仍在運行的伺服器，不會重複啟動",
                     "⚠️ 若無權限請聯繫管理員取得"
                 ]
             }
@@ -90,23 +70,122 @@ class StartServer(commands.Cog):
     }
     
     def __init__(self, bot):
-        self.bot = bot
-        self.active_servers = {}
-        self.checker_task = self.bot.loop.create_task(self.check_server_status())
-
-    async def check_server_status(self):
-        """定時檢查伺服器狀態"""
-        await self.bot.wait_until_ready()
-        while not self.bot.is_closed():
-            try:
-                for name, proc in list(self.active_servers.items()):
-                    if proc.poll() is not None:
-                        del self.active_servers[name]
-                        logger.info(f"伺服器 {name} 已停止")
-                        send_desktop_notification('伺服器關閉', f'{name} 已停止運行')
-            except Exception as e:
-                logger.error(f"狀態檢查錯誤: {e}")
-            await asyncio.sleep(60)
+        super().__init__(bot)
+        self.supervisor = get_supervisor(bot)
+        self.notifier = get_notifier(bot)
+        self.history = get_startup_history(bot)
+        self.log_watcher = self.manage(get_log_watcher(bot))
+        self.tps_monitor = self.manage(get_tps_monitor(bot))
+        self.scheduler = self.manage(get_launch_scheduler(bot))
+        self.idle = self.manage(get_idle_manager(bot, wake_server=self.wake_server))
+        self.listen(self.supervisor.add_exit_listener, self.supervisor.remove_exit_listener, self.on_server_exit)
+        # TPS 監控：記錄檔的 Can't keep up! 事件 + 定期 RCON 探測
+        self.listen(self.log_watcher.subscribe, self.log_watcher.unsubscribe, self.tps_monitor.on_log_event, {'lag'})
+        self.listen(self.tps_monitor.add_alert_listener, self.tps_monitor.remove_alert_listener, self.on_tps_alert)
+
+    @property
+    def active_servers(self):
+        """目前運行中的伺服器 {名稱: ManagedProcess}"""
+        return self.supervisor.running()
+
+    async def on_server_exit(self, managed):
+        """伺服器程序結束時立即通知"""
+        self.notifier.notify('伺服器關閉', f'{managed.name} 已停止運行')
+        await self.tps_monitor.forget(managed.name)
+        self.scheduler.activity.forget(managed.name)
+        # 釋放的資源讓排隊中的請求啟動
+        self.scheduler.release(managed.name)
+        # 端口已空出，改由休眠監聽接手
+        if self.idle.wake_on_join:
+            await self.idle.sync()
+
+    async def on_tps_alert(self, info, state, recovered):
+        """TPS 低於門檻、恢復或停止監控時通知到設定的頻道"""
+        if recovered is None:
+            message = f"⚫ {info.name} 已停止監控，解除效能警告"
+        else:
+            tps = state.estimated_tps()
+            mspt = state.mspt.mean()
+            detail = f"TPS {tps:.1f}" + (f" | MSPT {mspt:.1f} ms" if mspt is not None else "")
+            if recovered:
+                message = f"✅ {info.name} 已恢復正常 ({detail})"
+            else:
+                message = f"🐢 {info.name} 運行落後 ({detail})"
+        self.notifier.notify('伺服器效能', message)
+        channel_id = self.bot.config.get('tps', {}).get('alert_channel')
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if channel is not None:
+            await channel.send(message)
+
+    async def preflight(self, ctx, info, registry):
+        """執行啟動前檢查；未通過時回覆錯誤並回傳 None"""
+        result = await asyncio.to_thread(run_preflight, info, registry, self.supervisor)
+        if not result.ok:
+            await ctx.send("❌ 啟動前檢查未通過：\n" + "\n".join(f"• {error}" for error in result.errors))
+            return None
+        return result
+
+    async def wake_server(self, info):
+        """玩家嘗試加入休眠中的伺服器時啟動 (沒有 Discord 指令上下文)"""
+        registry = get_registry(self.bot)
+        preflight = await asyncio.to_thread(run_preflight, info, registry, self.supervisor)
+        if not preflight.ok:
+            logger.warning(f"喚醒 {info.name} 的啟動前檢查未通過：{preflight.errors}")
+            self.notifier.notify('伺服器喚醒失敗', f'{info.name}：' + '；'.join(preflight.errors))
+            return
+        if self.supervisor.is_running(info.name) or self.scheduler.pending(info.name):
+            return
+        ticket = self.scheduler.request(info, preflight.heap)
+        try:
+            await ticket.wait()
+        except LaunchCancelled:
+            return
+        try:
+            managed = await self.supervisor.start(LaunchSpec.from_server_info(info))
+        finally:
+            self.scheduler.started(ticket)
+        self.notifier.notify('伺服器喚醒', f'有玩家嘗試加入，正在啟動 {info.name}')
+
+        host = self.bot.config.get('server', {}).get('status_host') or DEFAULT_HOST
+        result = await wait_until_ready(managed, host=host)
+        if result.stage == READY:
+            await asyncio.to_thread(self.history.record, info.name, info.version, result.elapsed, result.source)
+            self.notifier.notify('伺服器啟動通知', f'{info.name} 已就緒 ({result.elapsed:.0f} 秒)')
+
+    def progress_message(self, info, stage):
+        return (
+            f"{STAGE_TEXT[stage]}：{info.name}\n"
+            f"📌 連線位址：{self.bot.config['network']['ddns']}:{info.port}\n"
+            f"⚡ 版本：{info.version} | 核心：{info.core}"
+        )
+
+    async def report_ready(self, reply, info, managed):
+        """等待伺服器就緒並隨階段更新回覆"""
+        host = self.bot.config.get('server', {}).get('status_host') or DEFAULT_HOST
+
+        async def on_stage(stage):
+            await reply.edit(content=self.progress_message(info, stage))
+
+        result = await wait_until_ready(managed, host=host, on_stage=on_stage)
+        if result.stage == READY:
+            baseline = await asyncio.to_thread(
+                self.history.record, info.name, info.version, result.elapsed, result.source
+            )
+            message = f"{self.progress_message(info, READY)}\n⏱️ 啟動耗時 {result.elapsed:.1f} 秒"
+            if self.history.is_regression(result.elapsed, baseline):
+                message += f" (🐢 比過去中位數 {baseline:.1f} 秒慢)"
+            await reply.edit(content=message)
+            self.notifier.notify('伺服器啟動通知', f'{info.name} 已就緒 ({result.elapsed:.0f} 秒)')
+        elif result.stage == FAILED:
+            await reply.edit(content=(
+                f"❌ {info.name} 在就緒前停止 (結束代碼 {result.returncode})\n"
+                f"💡 可使用 !console 或查看 logs/latest.log 了解原因"
+            ))
+        else:
+            await reply.edit(content=(
+                f"⚠️ {info.name} 在 {result.elapsed:.0f} 秒內未就緒，程序仍在運行\n"
+                f"💡 可使用 !console {info.name} 查看主控台輸出"
+            ))
 
     @commands.command()
     @commands.has_role('canOpenServer')
@@ -119,42 +198,32 @@ class StartServer(commands.Cog):
             
             input_name, input_version = name_version.rsplit('_', 1)
             
-            # 讀取並匹配伺服器
-            with open('assets/servers.json', 'r', encoding='utf-8') as f:
-                servers = json.load(f)['servers']
-            
-            # 讀取全局配置
-            with open('assets/config.json', 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            
-            matched = []
-            for s in servers:
-                try:
-                    info = parse_server_info(s['path'])
-                    if (input_name in info['name'] and 
-                        input_version == info['version']):
-                        matched.append(s['path'])
-                except Exception as e:
-                    logger.error(f"解析失敗：{s['path']} - {e}")
+            # 從共用清單查詢伺服器
+            registry = get_registry(self.bot)
+            await registry.ensure_fresh()
+
+            result = registry.index.lookup(input_name, input_version)
             
-            if not matched:
-                return await ctx.send("❌ 找不到符合的伺服器")
-            if len(matched) > 1:
-                return await ctx.send(f"❌ 找到多個匹配伺服器，請明確指定：\n" + "\n".join(matched))
+            if not result.matches:
+                message = "❌ 找不到符合的伺服器"
+                if result.suggestions:
+                    message += "\n💡 你是不是要找：\n" + "\n".join(f"• {s}" for s in result.suggestions)
+                return await ctx.send(message)
+            if len(result.matches) > 1:
+                return await ctx.send(f"❌ 找到多個匹配伺服器，請明確指定：\n" + "\n".join(
+                    f"• {info.name}_{info.version}" for info in result.matches[:10]
+                ))
             
-            full_path = matched[0]
-            server_info = parse_server_info(full_path)
+            server_info = result.unique
             
-            if server_info['name'] in self.active_servers:
-                proc = self.active_servers[server_info['name']]
-                if proc.poll() is None:  # 進程仍在運行
-                    return await ctx.send("⚠️ 伺服器已在運行中")
-                else:  # 進程已結束但未清理
-                    del self.active_servers[server_info['name']]
+            if self.supervisor.is_running(server_info.name):
+                return await ctx.send("⚠️ 伺服器已在運行中")
             
+            # 休眠監聽佔用著端口，啟動流程期間先釋放
+            await self.idle.release(server_info)
             try:
                 # 檢查啟動腳本是否存在
-                script_path = os.path.join(server_info['folder'], server_info['script'])
+                script_path = os.path.join(server_info.folder, server_info.script)
                 logger.info(f"檢查啟動腳本路徑：{script_path}")
                 print(f"[DEBUG] 腳本路徑：{script_path}")
                 print(f"[DEBUG] 檔案是否存在：{os.path.exists(script_path)}")
@@ -162,33 +231,80 @@ class StartServer(commands.Cog):
                     logger.error(f"啟動腳本不存在：{script_path}")
                     return await ctx.send(f"❌ 找不到啟動腳本：{script_path}")
                 
-                # 啟動伺服器
-                proc = subprocess.Popen(
-                    ['cmd.exe', '/k', full_path],
-                    cwd=server_info['folder'],
-                    creationflags=subprocess.CREATE_NEW_CONSOLE
-                )
+                # 啟動前檢查：端口衝突、清單中的重複端口與可用記憶體，在建立程序前就失敗
+                preflight = await self.preflight(ctx, server_info, registry)
+                if preflight is None:
+                    return
+                if preflight.warnings:
+                    await ctx.send("⚠️ 注意：\n" + "\n".join(f"• {w}" for w in preflight.warnings))
                 
-                self.active_servers[server_info['name']] = proc
+                # 主機資源不足時排隊等待
+                if self.scheduler.pending(server_info.name):
+                    return await ctx.send(f"⚠️ {server_info.name} 已在排隊等待啟動")
+                ticket = self.scheduler.request(server_info, preflight.heap, ctx.author.id)
+                if ticket.waiting:
+                    await ctx.send(
+                        f"⏳ 主機資源已滿，{server_info.name} 排隊中 (第 {self.scheduler.position(ticket)} 位)\n"
+                        f"💡 使用 !queue 查看佇列、!queue cancel 取消"
+                    )
+                    try:
+                        await ticket.wait()
+                    except LaunchCancelled:
+                        return await ctx.send(f"🚫 已取消 {server_info.name} 的啟動請求")
+                    # 排隊期間狀況可能改變，輪到時重新檢查
+                    if self.supervisor.is_running(server_info.name) or await self.preflight(ctx, server_info, registry) is None:
+                        self.scheduler.started(ticket)
+                        return
                 
-                # 發送成功訊息，包含連線資訊
-                success_msg = (
-                    f"✅ {server_info['name']} 啟動成功！\n"
-                    f"📌 連線位址：{config['network']['ddns']}:{server_info['port']}\n"
-                    f"⚡ 版本：{server_info['version']} | 核心：{server_info['core']}"
-                )
-                await ctx.send(success_msg)
+                # 啟動伺服器
+                try:
+                    spec = LaunchSpec.from_server_info(server_info)
+                    managed = await self.supervisor.start(spec)
+                finally:
+                    self.scheduler.started(ticket)
                 
-                # 發送系統通知
-                send_desktop_notification('伺服器啟動通知', f'{server_info['name']} 已成功啟動')
+                # 先回覆已啟動程序，再隨啟動階段編輯同一則訊息
+                reply = await ctx.send(self.progress_message(server_info, SPAWNED))
+                await self.report_ready(reply, server_info, managed)
                 
             except Exception as e:
                 await ctx.send(f"❌ 啟動失敗：{str(e)}")
                 logger.error(f"啟動過程錯誤：{e}", exc_info=True)
+            finally:
+                self.idle.resume(server_info.name)
         except Exception as e:  # 新增最外層的 except
             await ctx.send(f"❌ 發生未預期錯誤：{str(e)}")
             logger.error(f"start 指令未處理錯誤：{e}", exc_info=True)
 
+    @commands.command(name="queue")
+    @commands.has_role('canOpenServer')
+    async def queue(self, ctx, action: str = None, server: str = None):
+        """查看啟動佇列，或以 !queue cancel [伺服器] 取消排隊"""
+        if action == 'cancel':
+            tickets = [
+                ticket for ticket in list(self.scheduler.queue)
+                if (ticket.name == server if server else ticket.requester == ctx.author.id)
+            ]
+            if not tickets:
+                return await ctx.send("ℹ️ 沒有可取消的排隊請求")
+            for ticket in tickets:
+                self.scheduler.cancel(ticket)
+            return await ctx.send("🚫 已取消：" + "、".join(ticket.name for ticket in tickets))
+
+        count, used = self.scheduler.usage()
+        limit = self.scheduler.max_running or "不限"
+        budget = f"{self.scheduler.memory_budget / GB:.1f} GB" if self.scheduler.memory_budget else "不限"
+        message = f"🖥️ 運行中：{count} / {limit} | Heap：{used / GB:.1f} GB / {budget}\n"
+        if not self.scheduler.queue:
+            message += "✅ 目前沒有排隊中的啟動請求"
+        else:
+            message += "⏳ 啟動佇列：\n" + "\n".join(
+                f"{index}. {ticket.name}_{ticket.info.version} ({ticket.heap / GB:.1f} GB) - "
+                f"<@{ticket.requester}>，已等待 {(time.time() - ticket.created_at) / 60:.0f} 分鐘"
+                for index, ticket in enumerate(self.scheduler.queue, 1)
+            )
+        await ctx.send(message)
+
 
 async def setup(bot):
     await bot.add_cog(StartServer(bot))
@@ -0,0 +1,155 @@
+from discord.ext import commands
+import logging
+from src.utils import format_bytes, resolve_server
+from src.services.supervisor import get_supervisor
+from src.services.telemetry import get_telemetry, sparkline
+from src.services.tps import get_tps_monitor
+from src.cog_base import ManagedCog
+
+logger = logging.getLogger('bot')
+
+SPARK_WIDTH = 40
+
+
+class ServerStats(ManagedCog):
+    COMMAND_HELP = {
+        "name": "stats",
+        "title": "資源用量",
+        "category": "進階",
+        "color": "0x16A085",  # 深綠
+        "description": "顯示伺服器程序的 CPU、記憶體、執行緒、控制代碼與磁碟 I/O",
+        "sections": [
+            {
+                "title": "參數格式",
+                "content": ["伺服器名稱"]
+            },
+            {
+                "title": "顯示資訊",
+                "content": [
+                    "目前數值與記錄期間的最小 / 平均 / 最大值",
+                    "CPU 與記憶體的趨勢迷你圖",
+                    "統計包含啟動腳本與其 Java 子程序"
+                ]
+            },
+            {
+                "title": "相關指令",
+                "content": [
+                    "`!tps <伺服器>` - 查看 TPS 與 tick 延遲"
+                ]
+            },
+            {
+                "title": "注意事項",
+                "content": [
+                    "僅限由機器人啟動的伺服器",
+                    "預設每 5 秒取樣一次，保留約 1 小時",
+                    "CPU 百分比以單一核心為 100%"
+                ]
+            }
+        ],
+        "tips": [
+            "用法: !stats <伺服器>",
+            "功能: 查看伺服器資源用量",
+            "權限需求: canOpenServer 身分組",
+            "範例: !stats skyworld、!tps skyworld"
+        ]
+    }
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.supervisor = get_supervisor(bot)
+        self.telemetry = self.manage(get_telemetry(bot))
+        self.tps_monitor = get_tps_monitor(bot)
+        logger.info('Stats 指令已初始化')
+
+    def format_stats(self, name, samples):
+        latest = samples[-1]
+        cpu = [s.cpu_percent for s in samples]
+        rss = [s.rss for s in samples]
+        message = (
+            f"📊 {name} 資源用量 ({len(samples)} 筆樣本，{latest.processes} 個程序)\n"
+            f"• CPU：{latest.cpu_percent:.1f}% "
+            f"(最小 {min(cpu):.1f}% / 平均 {sum(cpu) / len(cpu):.1f}% / 最大 {max(cpu):.1f}%)\n"
+            f"• 記憶體：{format_bytes(latest.rss)} "
+            f"(最小 {format_bytes(min(rss))} / 平均 {format_bytes(sum(rss) / len(rss))} / 最大 {format_bytes(max(rss))})\n"
+            f"• 執行緒：{latest.threads} | 控制代碼：{latest.handles}\n"
+        )
+        if len(samples) >= 2:
+            previous = samples[-2]
+            elapsed = (latest.time - previous.time) or 1
+            message += (
+                f"• 磁碟 I/O：讀取 {format_bytes((latest.read_bytes - previous.read_bytes) / elapsed)}/s | "
+                f"寫入 {format_bytes((latest.write_bytes - previous.write_bytes) / elapsed)}/s\n"
+            )
+            message += (
+                f"```\nCPU {sparkline(cpu, SPARK_WIDTH)}\n"
+                f"RAM {sparkline(rss, SPARK_WIDTH)}\n```"
+            )
+        return message
+
+    @commands.command(name="stats")
+    @commands.has_role('canOpenServer')
+    async def stats(self, ctx, server: str):
+        """顯示伺服器資源用量"""
+        try:
+            managed = self.supervisor.get(server)
+            if managed is None:
+                info = await resolve_server(self.bot, ctx, server)
+                if info is None:
+                    return
+                managed = self.supervisor.get(info.name)
+                if managed is None:
+                    return await ctx.send(f"❌ {info.name} 不是由機器人啟動，沒有資源紀錄")
+
+            samples = self.telemetry.history(managed.name)
+            if not samples:
+                if not managed.is_running:
+                    return await ctx.send(f"⚫ {managed.name} 未在運行")
+                await self.telemetry.sample()
+                samples = self.telemetry.history(managed.name)
+                if not samples:
+                    return await ctx.send(f"⏳ {managed.name} 尚無資源紀錄，請稍後再試")
+            await ctx.send(self.format_stats(managed.name, samples))
+        except Exception as e:
+            logger.error(f"stats 指令錯誤：{e}", exc_info=True)
+            await ctx.send(f"❌ 取得資源用量失敗：{str(e)}")
+
+    @commands.command(name="tps")
+    @commands.has_role('canOpenServer')
+    async def tps(self, ctx, server: str):
+        """顯示伺服器 TPS 與 tick 延遲"""
+        try:
+            info = await resolve_server(self.bot, ctx, server)
+            if info is None:
+                return
+            state = self.tps_monitor.servers.get(info.name)
+            if state is None and self.supervisor.is_running(info.name):
+                state = self.tps_monitor.state(info.name)
+                await self.tps_monitor.probe(info)
+            tps = state.estimated_tps() if state is not None else None
+            if tps is None:
+                return await ctx.send(f"ℹ️ {info.name} 尚無 TPS 資料 (需啟用 RCON 或出現延遲記錄)")
+
+            window = state.tps.values()
+            status = "🐢 落後中" if state.alerting else "✅ 正常"
+            message = f"⏱️ {info.name} TPS：{tps:.1f} ({status})\n"
+            if window:
+                message += (
+                    f"• RCON ({state.probe})：平均 {sum(window) / len(window):.1f} / "
+                    f"最低 {min(window):.1f}\n"
+                )
+            mspt = state.mspt.mean()
+            if mspt is not None:
+                message += f"• 平均 MSPT：{mspt:.1f} ms\n"
+            lag = state.lag_ticks.values()
+            message += f"• 近 {state.lag_ticks.seconds / 60:.0f} 分鐘延遲記錄：{len(lag)} 次，共落後 {sum(lag)} ticks"
+            if len(window) >= 2:
+                message += f"\n```\nTPS {sparkline(window, SPARK_WIDTH)}\n```"
+            await ctx.send(message)
+        except Exception as e:
+            logger.error(f"tps 指令錯誤：{e}", exc_info=True)
+            await ctx.send(f"❌ 取得 TPS 失敗：{str(e)}")
+
+
+async def setup(bot):
+    await bot.add_cog(ServerStats(bot))
+    logger.info('Stats 指令已載入')
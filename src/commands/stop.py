@@ -0,0 +1,114 @@
+from discord.ext import commands
+import logging
+from src.utils import resolve_server
+from src.services.rcon import get_rcon_pool
+from src.services.shutdown import graceful_stop, server_stopper
+from src.services.supervisor import get_supervisor
+
+logger = logging.getLogger('bot')
+
+STAGE_TEXT = {
+    'stop': "✅ 已正常關閉 (存檔完成)",
+    'term': "⚠️ 未在時限內關閉，已終止整個程序樹",
+    'kill': "❗ 未回應終止訊號，已強制結束整個程序樹",
+    'not_running': "⚫ 伺服器未在運行",
+    'foreign': "❌ 端口被其他程式使用，無法確認是此伺服器，未強制結束",
+}
+
+
+class StopServer(commands.Cog):
+    COMMAND_HELP = {
+        "name": "stop",
+        "title": "伺服器關閉與重啟",
+        "category": "基礎",
+        "color": "0xE74C3C",  # 紅色
+        "description": "安全地關閉或重啟 Minecraft 伺服器",
+        "sections": [
+            {
+                "title": "參數格式",
+                "content": ["伺服器名稱"]
+            },
+            {
+                "title": "關閉流程",
+                "content": [
+                    "1. 送出 save-all flush 與 stop (主控台或 RCON)",
+                    "2. 時限內未關閉則終止整個程序樹 (含 Java 子程序)",
+                    "3. 仍未結束則強制結束",
+                    "完成後回報關閉所花的時間"
+                ]
+            },
+            {
+                "title": "相關指令",
+                "content": [
+                    "`!restart <伺服器>` - 關閉後以相同設定重新啟動"
+                ]
+            }
+        ],
+        "tips": [
+            "用法: !stop <伺服器> / !restart <伺服器>",
+            "功能: 存檔後安全關閉或重啟伺服器",
+            "權限需求: canOpenServer 身分組",
+            "範例: !stop skyworld、!restart skyworld_1.21.4"
+        ]
+    }
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.supervisor = get_supervisor(bot)
+        self.rcon_pool = get_rcon_pool(bot)
+        logger.info('Stop 指令已初始化')
+
+    def format_result(self, name, result):
+        message = f"{STAGE_TEXT[result.stage]}：{name}"
+        if result.stage not in ('not_running', 'foreign'):
+            message += f"\n⏱️ 耗時 {result.duration:.1f} 秒"
+            if result.method:
+                message += f" (透過 {result.method})"
+        return message
+
+    @commands.command(name="stop")
+    @commands.has_role('canOpenServer')
+    async def stop(self, ctx, server: str):
+        """存檔後關閉伺服器"""
+        try:
+            info = await resolve_server(self.bot, ctx, server)
+            if info is None:
+                return
+            reply = await ctx.send(f"🛑 正在關閉 {info.name}…")
+            idle = getattr(self.bot, 'idle_manager', None)
+            result = await graceful_stop(info, self.supervisor, self.rcon_pool, idle)
+            await reply.edit(content=self.format_result(info.name, result))
+        except Exception as e:
+            logger.error(f"stop 指令錯誤：{e}", exc_info=True)
+            await ctx.send(f"❌ 關閉失敗：{str(e)}")
+
+    @commands.command(name="restart")
+    @commands.has_role('canOpenServer')
+    async def restart(self, ctx, server: str):
+        """關閉後以相同的啟動設定重新啟動"""
+        try:
+            # 由本機器人啟動過的伺服器直接使用快取的啟動資訊，不必重新查詢清單
+            managed = self.supervisor.get(server)
+            if managed is None:
+                info = await resolve_server(self.bot, ctx, server)
+                if info is None:
+                    return
+                managed = self.supervisor.get(info.name)
+                if managed is None:
+                    return await ctx.send(f"❌ {info.name} 不是由機器人啟動，請先使用 !start")
+
+            reply = await ctx.send(f"🔄 正在重新啟動 {managed.name}…")
+            stop = server_stopper(self.supervisor, self.rcon_pool)
+            result, _ = await self.supervisor.restart(managed.name, stop=stop)
+            await reply.edit(content=(
+                f"{self.format_result(managed.name, result)}\n"
+                f"🚀 已重新啟動 {managed.name}"
+            ))
+        except Exception as e:
+            logger.error(f"restart 指令錯誤：{e}", exc_info=True)
+            await ctx.send(f"❌ 重啟失敗：{str(e)}")
+
+
+async def setup(bot):
+    await bot.add_cog(StopServer(bot))
+    logger.info('Stop 指令已載入')
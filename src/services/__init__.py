@@ -0,0 +1,3 @@
+# 服務模組套件初始化檔案
+# 此檔案用於標記 services 目錄為 Python 子套件
+# 放置由 bot 持有、供各指令模組 (cog) 共用的背景服務
@@ -0,0 +1,60 @@
+import logging
+import time
+from src.services.slp import DEFAULT_HOST, DEFAULT_TIMEOUT, query_many
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """
+    追蹤受管理伺服器的線上人數
+
+    以 SLP 查詢運行中伺服器的端口，記錄每個伺服器從何時開始沒有玩家。
+    查詢失敗 (例如仍在啟動) 時不改變紀錄，避免誤判為閒置。
+    """
+
+    def __init__(self, supervisor, host=DEFAULT_HOST, timeout=DEFAULT_TIMEOUT):
+        self.supervisor = supervisor
+        self.host = host
+        self.timeout = timeout
+        self.players = {}
+        self._idle_since = {}
+
+    async def update(self, now=None):
+        """查詢所有運行中伺服器的人數"""
+        running = self.supervisor.running()
+        for name in list(self.players):
+            if name not in running:
+                self.forget(name)
+
+        ports = {managed.spec.port: name for name, managed in running.items() if managed.spec.port}
+        statuses = await query_many(list(ports), host=self.host, timeout=self.timeout)
+        now = time.time() if now is None else now
+        for port, status in statuses.items():
+            if status.online:
+                self.record(ports[port], status.players_online, now)
+        return self.players
+
+    def record(self, name, players, now=None):
+        now = time.time() if now is None else now
+        self.players[name] = players
+        if players > 0:
+            self._idle_since.pop(name, None)
+        else:
+            self._idle_since.setdefault(name, now)
+
+    def forget(self, name):
+        self.players.pop(name, None)
+        self._idle_since.pop(name, None)
+
+    def idle_for(self, name, now=None):
+        """伺服器已連續無人的秒數，有玩家或尚無資料時回傳 0"""
+        since = self._idle_since.get(name)
+        if since is None:
+            return 0.0
+        return (time.time() if now is None else now) - since
+
+    def idle_servers(self, seconds, now=None):
+        """無人超過 seconds 秒的伺服器，閒置最久的排在前面"""
+        idle = [(self.idle_for(name, now), name) for name in self._idle_since]
+        return [name for duration, name in sorted(idle, reverse=True) if duration >= seconds]
@@ -0,0 +1,324 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import time
+from urllib.parse import quote
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+# Alist 預設的 token 有效期為 48 小時；無法從 JWT 讀出到期時間時使用
+TOKEN_TTL = 48 * 3600
+# 到期前多久就先重新登入
+TOKEN_MARGIN = 300
+# 超過此大小的檔案分段上傳，失敗時只重傳失敗的分段
+PART_SIZE = 64 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+UPLOAD_CONCURRENCY = 2
+UPLOAD_RETRIES = 3
+RETRY_DELAY = 2
+PARTS_MANIFEST = 'parts.json'
+# PARA 目錄 (與 !alist 說明一致)
+PARA_DIRS = {
+    'project': '1_project',
+    'repo': '2_repo',
+    'achieve': '4_achieve',
+}
+
+
+class AlistError(Exception):
+    """Alist API 回傳錯誤或無法連線"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def token_expiry(token, now=None, ttl=TOKEN_TTL):
+    """從 JWT 的 exp 取得到期時間，無法解析時以登入時間加上 ttl 估計"""
+    now = time.time() if now is None else now
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return now + ttl
+
+
+def para_path(category, *parts):
+    """PARA 目錄下的遠端路徑，例如 para_path('project', 'sky_1.21.4_25565_fabric', 'backups')"""
+    return posixpath.join('/', PARA_DIRS[category], *parts)
+
+
+class AlistClient:
+    """
+    Alist REST API 的非同步用戶端
+
+    共用一個 keep-alive 連線的 aiohttp session；token 快取到接近到期才重新登入，
+    API 回報 token 失效 (401) 時自動重新登入並重試一次。
+    """
+
+    def __init__(self, base_url, username, password, timeout=DEFAULT_TIMEOUT, connections=8):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.connections = connections
+        self._session = None
+        self._token = None
+        self._expires = 0.0
+        self._login_lock = asyncio.Lock()
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connections),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _check(self, body):
+        if not isinstance(body, dict):
+            raise AlistError("Alist 回應格式錯誤")
+        if body.get('code') != 200:
+            raise AlistError(body.get('message') or f"Alist 錯誤 {body.get('code')}", body.get('code'))
+        return body.get('data')
+
+    async def token(self):
+        """取得有效的 token；同時多個請求只會登入一次"""
+        async with self._login_lock:
+            if self._token is None or time.time() >= self._expires - TOKEN_MARGIN:
+                try:
+                    async with self.session.post(
+                        f"{self.base_url}/api/auth/login",
+                        json={'username': self.username, 'password': self.password}
+                    ) as response:
+                        data = self._check(await response.json(content_type=None))
+                except (aiohttp.ClientError, ValueError) as e:
+                    raise AlistError(f"無法連線到 Alist：{e}")
+                self._token = data['token']
+                self._expires = token_expiry(self._token)
+                logger.info("已登入 Alist")
+            return self._token
+
+    async def request(self, method, endpoint, headers=None, **kwargs):
+        """呼叫 API 並回傳 data；token 失效時重新登入，請求內容可重送時自動重試一次"""
+        retry = 'data' not in kwargs  # 串流上傳的內容已被讀取，交由呼叫端重試
+        for attempt in range(2):
+            request_headers = dict(headers or {}, Authorization=await self.token())
+            try:
+                async with self.session.request(
+                    method, f"{self.base_url}/api/{endpoint}", headers=request_headers, **kwargs
+                ) as response:
+                    try:
+                        body = await response.json(content_type=None)
+                    except ValueError:
+                        raise AlistError(f"Alist 回應 HTTP {response.status}", response.status)
+            except aiohttp.ClientError as e:
+                raise AlistError(f"Alist 請求失敗：{e}")
+            if isinstance(body, dict) and body.get('code') == 401:
+                self._token = None
+                if retry and attempt == 0:
+                    continue
+            return self._check(body)
+
+    async def list(self, path, refresh=False):
+        """列出資料夾內容 [{name, size, is_dir, modified}, ...]"""
+        data = await self.request('POST', 'fs/list', json={
+            'path': path, 'page': 1, 'per_page': 0, 'refresh': refresh
+        })
+        return (data or {}).get('content') or []
+
+    async def get(self, path):
+        """取得檔案資訊，不存在時回傳 None"""
+        try:
+            return await self.request('POST', 'fs/get', json={'path': path})
+        except AlistError as e:
+            if 'not found' in str(e).lower():
+                return None
+            raise
+
+    async def mkdir(self, path):
+        await self.request('POST', 'fs/mkdir', json={'path': path})
+
+    async def remove(self, folder, names):
+        await self.request('POST', 'fs/remove', json={'dir': folder, 'names': list(names)})
+
+    async def put(self, path, body, size):
+        """上傳檔案；body 可為 bytes 或 async iterable，以串流送出不需整個載入記憶體"""
+        headers = {
+            'File-Path': quote(path),
+            'Content-Type': 'application/octet-stream',
+            'Content-Length': str(size),
+        }
+        return await self.request('PUT', 'fs/put', data=body, headers=headers)
+
+
+async def read_range(path, offset, length, read_size=READ_SIZE):
+    """以 async generator 逐段讀取檔案的一段範圍 (讀檔在執行緒中進行)"""
+    f = await asyncio.to_thread(open, path, 'rb')
+    try:
+        await asyncio.to_thread(f.seek, offset)
+        remaining = length
+        while remaining > 0:
+            data = await asyncio.to_thread(f.read, min(read_size, remaining))
+            if not data:
+                raise AlistError(f"{path} 在上傳期間變短")
+            remaining -= len(data)
+            yield data
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+def _file_digest(path, offset, length):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            data = f.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            digest.update(data)
+            remaining -= len(data)
+    return digest.hexdigest()
+
+
+class UploadProgress:
+    """上傳進度 (位元組)，可交給 ProgressThrottle 之類的定期回報"""
+
+    def __init__(self, total):
+        self.total = total
+        self.sent = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+
+async def upload_file(client, path, remote_dir, part_size=PART_SIZE, concurrency=UPLOAD_CONCURRENCY,
+                      retries=UPLOAD_RETRIES, progress=None, retry_delay=RETRY_DELAY):
+    """
+    將本機檔案上傳到 remote_dir，回傳遠端路徑
+
+    不超過 part_size 的檔案直接上傳；較大的檔案切成分段放在 <檔名>.parts/ 中，
+    最多 concurrency 個分段同時上傳，失敗的分段重試 retries 次。
+    遠端已存在且大小相符的分段會略過，中斷後再次執行即可續傳。
+    全部完成後才寫入 parts.json (含各分段的 SHA-256)，合併方式：依序串接所有分段。
+    """
+    size = await asyncio.to_thread(os.path.getsize, path)
+    name = os.path.basename(path)
+    progress = progress or UploadProgress(size)
+    await client.mkdir(remote_dir)
+
+    async def send(remote_path, offset, length):
+        """串流上傳一段範圍，回傳其 SHA-256"""
+        for attempt in range(1, retries + 1):
+            digest = hashlib.sha256()
+            sent = 0
+
+            async def counted():
+                nonlocal sent
+                async for data in read_range(path, offset, length):
+                    digest.update(data)
+                    sent += len(data)
+                    progress.sent += len(data)
+                    yield data
+
+            try:
+                await client.put(remote_path, counted(), length)
+                return digest.hexdigest()
+            except (AlistError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # 其他分段可能同時在上傳，只扣除這次嘗試送出的量
+                progress.sent -= sent
+                if attempt == retries:
+                    raise AlistError(f"上傳 {posixpath.basename(remote_path)} 失敗：{e}")
+                logger.warning(f"上傳 {remote_path} 失敗 (第 {attempt} 次)，稍後重試：{e}")
+                await asyncio.sleep(min(retry_delay * 2 ** (attempt - 1), 30))
+
+    if size <= part_size:
+        remote_path = posixpath.join(remote_dir, name)
+        await send(remote_path, 0, size)
+        return remote_path
+
+    parts_dir = posixpath.join(remote_dir, f"{name}.parts")
+    await client.mkdir(parts_dir)
+    existing = {entry['name']: entry.get('size') for entry in await client.list(parts_dir, refresh=True)}
+    parts = []
+    for index, offset in enumerate(range(0, size, part_size)):
+        length = min(part_size, size - offset)
+        parts.append((f"part-{index:05d}", offset, length))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send_part(part_name, offset, length):
+        if existing.get(part_name) == length:
+            # 上次已上傳的分段只需在本機計算雜湊
+            progress.skipped += length
+            return await asyncio.to_thread(_file_digest, path, offset, length)
+        async with semaphore:
+            return await send(posixpath.join(parts_dir, part_name), offset, length)
+
+    tasks = [asyncio.ensure_future(send_part(*part)) for part in parts]
+    try:
+        digests = await asyncio.gather(*tasks)
+    except BaseException:
+        # 任一分段失敗就停止其他分段，已完成的分段下次會略過
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    manifest = json.dumps({
+        'name': name,
+        'size': size,
+        'part_size': part_size,
+        'parts': [
+            {'name': part_name, 'size': length, 'sha256': digest}
+            for (part_name, _, length), digest in zip(parts, digests)
+        ],
+    }, ensure_ascii=False, indent=1).encode('utf-8')
+    await client.put(posixpath.join(parts_dir, PARTS_MANIFEST), manifest, len(manifest))
+    return parts_dir
+
+
+def alist_base_url(alist_cfg):
+    """Alist API 位址：設定了 api_url 時直接使用，否則以 url 加上 http_port"""
+    if alist_cfg.get('api_url'):
+        return alist_cfg['api_url']
+    url = alist_cfg.get('url', '')
+    host = url.split('://', 1)[-1]
+    if ':' in host.split('/', 1)[0]:
+        return url
+    return f"{url.rstrip('/')}:{alist_cfg.get('http_port', 5244)}"
+
+
+def get_alist_client(bot):
+    """取得 bot 共用的 Alist 用戶端，不存在時依設定建立；未設定帳號時回傳 None"""
+    client = getattr(bot, 'alist_client', None)
+    if client is None:
+        alist_cfg = getattr(bot, 'config', {}).get('network', {}).get('alist', {})
+        if not alist_cfg.get('url') or not alist_cfg.get('username'):
+            return None
+        client = AlistClient(alist_base_url(alist_cfg), alist_cfg['username'], alist_cfg.get('password', ''))
+        bot.alist_client = client
+    return client
@@ -0,0 +1,338 @@
+import asyncio
+import collections
+import concurrent.futures
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import tarfile
+import threading
+import time
+from src.services.lifecycle import BackgroundService
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_ROOT = 'archives'
+MANIFEST_NAME = 'MANIFEST.json'
+# 每個壓縮區塊的大小；各區塊獨立壓縮成一個 gzip member，串接後仍是合法的 .gz
+BLOCK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+READ_SIZE = 256 * 1024
+# 串流輸出時暫存的區塊數，上傳較慢時壓縮會暫停等待
+STREAM_QUEUE = 8
+PROGRESS_INTERVAL = 5.0
+EXCLUDE_NAMES = {'session.lock'}
+
+
+class ArchiveCancelled(Exception):
+    """串流封存被中止 (例如上傳端已停止讀取)"""
+
+
+class ArchiveStats:
+    """封存進度：已處理的檔案數、原始位元組與壓縮後位元組"""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.current = None
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def ratio(self):
+        return self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+
+    def __repr__(self):
+        return f"ArchiveStats(files={self.files}, in={self.bytes_in}, out={self.bytes_out})"
+
+
+def iter_files(root, exclude=EXCLUDE_NAMES):
+    """逐一列出資料夾中的檔案 (相對路徑, 絕對路徑)，以 scandir 遞迴，不先建立完整清單"""
+    stack = ['']
+    while stack:
+        relative = stack.pop()
+        with os.scandir(os.path.join(root, relative)) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        for entry in entries:
+            if entry.name in exclude:
+                continue
+            child = f"{relative}/{entry.name}" if relative else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(child)
+            elif entry.is_file(follow_symlinks=False):
+                yield child, entry.path
+
+
+def archive_name(folder, now=None):
+    """以伺服器資料夾名稱 (名稱_版本_端口_核心) 加上時間命名封存檔"""
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now))
+    return f"{os.path.basename(os.path.normpath(folder))}_{stamp}.tar.gz"
+
+
+def latest_archive(root, folder):
+    """archive_root 中屬於該伺服器資料夾的最新封存檔，沒有時回傳 None"""
+    prefix = f"{os.path.basename(os.path.normpath(folder))}_"
+    try:
+        names = [
+            name for name in os.listdir(root)
+            if name.startswith(prefix) and name.endswith('.tar.gz')
+            and len(name) == len(prefix) + len('00000000-000000.tar.gz')
+        ]
+    except FileNotFoundError:
+        return None
+    # 檔名中的時間戳可直接依字串排序
+    return os.path.join(root, max(names)) if names else None
+
+
+class ParallelGzipWriter(io.RawIOBase):
+    """
+    多執行緒 gzip 壓縮的檔案物件
+
+    寫入的資料切成固定大小的區塊，交給執行緒池各自壓縮 (zlib 壓縮時會釋放 GIL)，
+    再依原順序交給 sink。同時處理中的區塊數有上限，記憶體用量與輸出大小無關。
+    """
+
+    def __init__(self, sink, level=COMPRESS_LEVEL, block_size=BLOCK_SIZE, workers=None, stats=None):
+        self.sink = sink
+        self.level = level
+        self.block_size = block_size
+        self.workers = workers or os.cpu_count() or 1
+        self.stats = stats or ArchiveStats()
+        self._buffer = bytearray()
+        self._pending = collections.deque()
+        self._pool = concurrent.futures.ThreadPoolExecutor(self.workers)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            self._submit(bytes(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+        return len(data)
+
+    def _submit(self, block):
+        self._pending.append(self._pool.submit(gzip.compress, block, self.level, mtime=0))
+        while len(self._pending) > self.workers * 2:
+            self._emit()
+
+    def _emit(self):
+        compressed = self._pending.popleft().result()
+        self.stats.bytes_out += len(compressed)
+        self.sink(compressed)
+
+    def abort(self):
+        """放棄尚未輸出的區塊 (封存失敗時)"""
+        self._buffer.clear()
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._emit()
+        finally:
+            for future in self._pending:
+                future.cancel()
+            self._pool.shutdown(wait=True)
+            super().close()
+
+
+def write_archive(folder, sink, stats=None, level=COMPRESS_LEVEL, workers=None, exclude=EXCLUDE_NAMES,
+                  block_size=BLOCK_SIZE):
+    """
+    將資料夾封存為 tar.gz 並逐段交給 sink (同步執行，請在執行緒中呼叫)
+
+    每個檔案在寫入的同時計算 SHA-256，最後附上 MANIFEST.json 供完整性檢查。
+    回傳 manifest。
+    """
+    stats = stats or ArchiveStats()
+    writer = ParallelGzipWriter(sink, level=level, block_size=block_size, workers=workers, stats=stats)
+    manifest = {'folder': os.path.basename(os.path.normpath(folder)), 'created': time.time(), 'files': {}}
+    try:
+        with tarfile.open(fileobj=writer, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+            for relative, path in iter_files(folder, exclude):
+                try:
+                    with open(path, 'rb') as f:
+                        tarinfo = tar.gettarinfo(arcname=relative, fileobj=f)
+                        reader = HashingReader(f, stats)
+                        stats.current = relative
+                        tar.addfile(tarinfo, reader)
+                except FileNotFoundError:
+                    continue  # 走訪期間被刪除的檔案
+                manifest['files'][relative] = {'size': tarinfo.size, 'sha256': reader.hexdigest()}
+                stats.files += 1
+            data = json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8')
+            tarinfo = tarfile.TarInfo(MANIFEST_NAME)
+            tarinfo.size = len(data)
+            tarinfo.mtime = int(manifest['created'])
+            tar.addfile(tarinfo, io.BytesIO(data))
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return manifest
+
+
+class HashingReader:
+    """讀取時同時計算 SHA-256 並累計進度；只讀取 tar 標頭記錄的大小，檔案變大也不會破壞封存"""
+
+    def __init__(self, f, stats):
+        self._f = f
+        self._hash = hashlib.sha256()
+        self._stats = stats
+
+    def read(self, size=-1):
+        data = self._f.read(size if size is not None and size >= 0 else READ_SIZE)
+        self._hash.update(data)
+        self._stats.bytes_in += len(data)
+        return data
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def verify_archive(path):
+    """依封存內的 MANIFEST.json 檢查每個檔案的大小與 SHA-256，回傳問題清單 (空清單表示完整)"""
+    problems = []
+    seen = {}
+    manifest = None
+    # 串流模式 (r|gz) 不支援多個 gzip member，需使用一般模式
+    with tarfile.open(path, mode='r:gz') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            f = tar.extractfile(member)
+            if member.name == MANIFEST_NAME:
+                manifest = json.loads(f.read().decode('utf-8'))
+                continue
+            digest = hashlib.sha256()
+            for block in iter(lambda: f.read(READ_SIZE), b''):
+                digest.update(block)
+            seen[member.name] = {'size': member.size, 'sha256': digest.hexdigest()}
+    if manifest is None:
+        return [f"缺少 {MANIFEST_NAME}"]
+    for name, expected in manifest['files'].items():
+        actual = seen.pop(name, None)
+        if actual is None:
+            problems.append(f"缺少檔案：{name}")
+        elif actual != expected:
+            problems.append(f"內容不符：{name}")
+    problems.extend(f"清單外的檔案：{name}" for name in seen)
+    return problems
+
+
+class ProgressThrottle(BackgroundService):
+    """
+    限制進度回報頻率
+
+    封存 (或上傳) 在背景更新 stats，這裡每 interval 秒檢查一次，有變化才呼叫 update
+    (例如編輯 Discord 訊息，避免觸發速率限制)。
+    """
+
+    def __init__(self, stats, update, interval=PROGRESS_INTERVAL):
+        self.stats = stats
+        self.update = update
+        self.interval = interval
+        self._last = None
+
+    def _snapshot(self):
+        return dict(vars(self.stats))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            current = self._snapshot()
+            if current == self._last:
+                continue
+            self._last = current
+            try:
+                await self.update(self.stats)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"更新封存進度失敗：{e}")
+
+
+async def archive_to_file(folder, path, stats=None, level=COMPRESS_LEVEL, workers=None):
+    """封存到檔案；先寫入暫存檔，完成後才改名，回傳 manifest"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.part"
+
+    def run():
+        with open(tmp_path, 'wb') as out:
+            manifest = write_archive(folder, out.write, stats, level, workers)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+        return manifest
+
+    try:
+        return await asyncio.to_thread(run)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+async def archive_stream(folder, stats=None, level=COMPRESS_LEVEL, workers=None, queue_size=STREAM_QUEUE):
+    """
+    以 async generator 逐段產生封存內容，可直接交給上傳端
+
+    佇列滿時壓縮執行緒會等待，消費端停止讀取 (或被取消) 時封存隨之中止。
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(queue_size)
+    cancelled = threading.Event()
+    done = object()
+
+    def sink(chunk):
+        if cancelled.is_set():
+            raise ArchiveCancelled("封存已中止")
+        asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+
+    def run():
+        try:
+            write_archive(folder, sink, stats, level, workers)
+        finally:
+            if not cancelled.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+    worker = loop.run_in_executor(None, run)
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is done:
+                break
+            yield chunk
+        await worker
+    finally:
+        if not worker.done():
+            cancelled.set()
+            # 讓等待放入佇列的執行緒繼續，看到中止旗標後結束
+            while not worker.done():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.sleep(0.01)
+            try:
+                worker.result()
+            except ArchiveCancelled:
+                pass
+            except Exception as e:
+                logger.warning(f"中止封存時發生錯誤：{e}")
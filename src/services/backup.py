@@ -0,0 +1,420 @@
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from src.services.rcon import RconError, read_server_properties
+from src.services.region import HEADER_SIZE, REGION_SUFFIXES, read_header
+
+logger = logging.getLogger(__name__)
+
+BACKUP_ROOT = 'backups'
+# 非區域檔以固定大小切塊
+BLOCK_SIZE = 1024 * 1024
+DIGEST_SIZE = 20
+KEEP_LAST = 10
+KEEP_DAILY = 7
+SAVE_TIMEOUT = 60
+SAVED_PATTERN = re.compile(r"Saved the game|Saved the world")
+
+
+class BackupError(Exception):
+    """備份或還原失敗"""
+
+
+def world_folders(folder):
+    """伺服器的世界資料夾 (相對路徑)，依 server.properties 的 level-name，含 Bukkit 系的地獄與終界"""
+    try:
+        level = read_server_properties(folder).get('level-name') or 'world'
+    except OSError:
+        level = 'world'
+    candidates = [level, f"{level}_nether", f"{level}_the_end"]
+    return [name for name in candidates if os.path.isdir(os.path.join(folder, name))]
+
+
+def block_pieces(size, block=BLOCK_SIZE):
+    return [(start, min(block, size - start)) for start in range(0, size, block)]
+
+
+def object_path(objects, digest):
+    return os.path.join(objects, digest[:2], digest)
+
+
+def put_object(objects, data):
+    """寫入一個片段 (已存在時略過)，回傳雜湊"""
+    digest = hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+    target = object_path(objects, digest)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as out:
+            out.write(data)
+        os.replace(tmp_path, target)
+    return digest
+
+
+def _store_region(f, header, objects, previous):
+    """
+    區域檔以 chunk 為單位儲存
+
+    位置與時間戳都與上一個快照相同的 chunk 直接沿用舊片段，不讀取資料；
+    未被位置表引用的 sector 不儲存，還原時以 0 填補。
+    """
+    raw, parsed = header
+    known = {}
+    if previous is not None and 'chunks' in previous:
+        for (index, timestamp), (digest, length, offset) in zip(previous['chunks'], previous['pieces'][1:]):
+            known[index] = (timestamp, offset, length, digest)
+
+    size = os.fstat(f.fileno()).st_size
+    pieces = [[put_object(objects, raw), HEADER_SIZE, 0]]
+    chunks = []
+    read = HEADER_SIZE
+    for chunk in parsed.chunks(size):
+        old = known.get(chunk.index)
+        if old is not None and old[:3] == (chunk.timestamp, chunk.offset, chunk.length):
+            digest = old[3]
+        else:
+            f.seek(chunk.offset)
+            data = f.read(chunk.length)
+            read += len(data)
+            digest = put_object(objects, data)
+        pieces.append([digest, chunk.length, chunk.offset])
+        chunks.append([chunk.index, chunk.timestamp])
+    return {'pieces': pieces, 'chunks': chunks}, read
+
+
+def store_file(path, objects, previous=None):
+    """
+    將檔案切塊雜湊並寫入內容定址儲存區，回傳 (清單項目, 實際讀取的位元組數)
+
+    在 process pool 中執行；previous 為上一個快照中同一檔案的清單項目。
+    """
+    with open(path, 'rb') as f:
+        header = read_header(f) if path.endswith(REGION_SUFFIXES) else None
+        if header is not None:
+            return _store_region(f, header, objects, previous)
+        pieces = []
+        read = 0
+        for start, length in block_pieces(os.fstat(f.fileno()).st_size):
+            data = f.read(length)
+            read += len(data)
+            pieces.append([put_object(objects, data), len(data)])
+        return {'pieces': pieces}, read
+
+
+def scan_files(root, folders):
+    """列出世界資料夾中的檔案 {相對路徑: (大小, mtime_ns)}；使用 scandir 避免額外 stat"""
+    files = {}
+    stack = list(folders)
+    while stack:
+        relative = stack.pop()
+        with os.scandir(os.path.join(root, relative)) as entries:
+            for entry in entries:
+                child = f"{relative}/{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(child)
+                elif entry.is_file(follow_symlinks=False) and entry.name != 'session.lock':
+                    stat = entry.stat(follow_symlinks=False)
+                    files[child] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+class BackupStore:
+    """
+    單一伺服器的備份儲存區
+
+    objects/ 依內容雜湊存放檔案片段，snapshots/ 每個快照一個 JSON 清單，
+    記錄每個檔案由哪些片段組成；快照之間共用相同的片段。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.objects = os.path.join(path, 'objects')
+        self.snapshot_dir = os.path.join(path, 'snapshots')
+
+    def snapshot_ids(self):
+        """由舊到新排列的快照 ID"""
+        try:
+            names = os.listdir(self.snapshot_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith('.json'))
+
+    def load(self, snapshot_id):
+        try:
+            with open(os.path.join(self.snapshot_dir, f"{snapshot_id}.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise BackupError(f"找不到快照 {snapshot_id}")
+
+    def latest(self):
+        ids = self.snapshot_ids()
+        return self.load(ids[-1]) if ids else None
+
+    def save(self, manifest):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = os.path.join(self.snapshot_dir, f"{manifest['id']}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def new_id(self, now=None):
+        base = time.strftime('%Y%m%d-%H%M%S', time.localtime(now))
+        existing = set(self.snapshot_ids())
+        snapshot_id, suffix = base, 1
+        while snapshot_id in existing:
+            suffix += 1
+            snapshot_id = f"{base}-{suffix}"
+        return snapshot_id
+
+    def retained(self, keep_last=KEEP_LAST, keep_daily=KEEP_DAILY):
+        """保留最新 keep_last 個快照，另外保留最近 keep_daily 天每天最後一個"""
+        ids = self.snapshot_ids()
+        # 最新的快照一定保留
+        keep = set(ids[-max(keep_last, 1):])
+        days = collections.OrderedDict()
+        for snapshot_id in reversed(ids):
+            days.setdefault(snapshot_id[:8], snapshot_id)
+        keep.update(list(days.values())[:keep_daily])
+        return keep
+
+    def prune(self, keep_last=KEEP_LAST, keep_daily=KEEP_DAILY):
+        """依保留規則刪除舊快照並回收不再使用的片段，回傳 (刪除的快照, 釋放的位元組)"""
+        keep = self.retained(keep_last, keep_daily)
+        removed = [snapshot_id for snapshot_id in self.snapshot_ids() if snapshot_id not in keep]
+        for snapshot_id in removed:
+            os.remove(os.path.join(self.snapshot_dir, f"{snapshot_id}.json"))
+        return removed, self.collect_garbage() if removed else 0
+
+    def collect_garbage(self):
+        """刪除沒有任何快照引用的片段"""
+        used = set()
+        for snapshot_id in self.snapshot_ids():
+            for entry in self.load(snapshot_id)['files'].values():
+                used.update(piece[0] for piece in entry['pieces'])
+        freed = 0
+        if not os.path.isdir(self.objects):
+            return freed
+        for prefix in os.scandir(self.objects):
+            for entry in os.scandir(prefix.path):
+                if entry.name not in used:
+                    freed += entry.stat().st_size
+                    os.remove(entry.path)
+        return freed
+
+    def restore_file(self, entry, target):
+        """依片段組回檔案，先寫入暫存檔再取代，避免中斷時留下半個檔案"""
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.restore.tmp"
+        with open(tmp_path, 'wb') as out:
+            for piece in entry['pieces']:
+                # 區域檔的片段帶有檔案中的位置，中間未使用的 sector 留空 (讀回為 0)
+                if len(piece) > 2:
+                    out.seek(piece[2])
+                with open(object_path(self.objects, piece[0]), 'rb') as f:
+                    out.write(f.read())
+            out.truncate(entry['size'])
+        os.replace(tmp_path, target)
+
+    def missing(self, manifest):
+        return [
+            piece[0] for entry in manifest['files'].values() for piece in entry['pieces']
+            if not os.path.exists(object_path(self.objects, piece[0]))
+        ]
+
+
+class BackupEngine:
+    """
+    增量世界備份
+
+    與上一個快照比對大小與修改時間，只有變動的檔案送進 process pool 切塊雜湊，
+    未變動的檔案直接沿用上一個快照的片段清單，大型世界的增量備份只需數秒。
+    區域檔再依標頭的 chunk 時間戳，只讀取實際改寫過的 chunk。
+    """
+
+    def __init__(self, root=BACKUP_ROOT, workers=None, keep_last=KEEP_LAST, keep_daily=KEEP_DAILY):
+        self.root = root
+        self.workers = workers or None
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+        self._pool = None
+        self._locks = {}
+
+    def store_for(self, info):
+        return BackupStore(os.path.join(self.root, f"{info.name}_{info.version}"))
+
+    def lock_for(self, info):
+        return self._locks.setdefault(info.path, asyncio.Lock())
+
+    def busy(self, info):
+        return self.lock_for(info).locked()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def snapshot(self, info, folders=None):
+        """建立快照並套用保留規則，回傳快照清單 (含統計)"""
+        async with self.lock_for(info):
+            started = time.perf_counter()
+            store = self.store_for(info)
+            folders = folders or await asyncio.to_thread(world_folders, info.folder)
+            if not folders:
+                raise BackupError(f"{info.name} 沒有世界資料夾")
+            files = await asyncio.to_thread(scan_files, info.folder, folders)
+            previous = await asyncio.to_thread(store.latest)
+            previous_files = previous['files'] if previous else {}
+
+            manifest_files, changed = {}, []
+            for relative, (size, mtime_ns) in files.items():
+                old = previous_files.get(relative)
+                if old is not None and old['size'] == size and old['mtime_ns'] == mtime_ns:
+                    manifest_files[relative] = old
+                else:
+                    changed.append(relative)
+
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(*(
+                loop.run_in_executor(
+                    self.pool, store_file, os.path.join(info.folder, relative), store.objects,
+                    previous_files.get(relative)
+                )
+                for relative in changed
+            ))
+            read = 0
+            for relative, (entry, bytes_read) in zip(changed, results):
+                size, mtime_ns = files[relative]
+                manifest_files[relative] = dict(entry, size=size, mtime_ns=mtime_ns)
+                read += bytes_read
+
+            manifest = {
+                'id': store.new_id(),
+                'server': info.name,
+                'version': info.version,
+                'created': time.time(),
+                'folders': folders,
+                'files': manifest_files,
+                'size': sum(entry['size'] for entry in manifest_files.values()),
+                'changed': len(changed),
+                'changed_size': sum(files[relative][0] for relative in changed),
+                'read': read,
+            }
+            await asyncio.to_thread(store.save, manifest)
+            manifest['removed'], manifest['freed'] = await asyncio.to_thread(
+                store.prune, self.keep_last, self.keep_daily
+            )
+            manifest['duration'] = time.perf_counter() - started
+            logger.info(
+                f"{info.name} 備份完成 {manifest['id']}：{len(manifest_files)} 個檔案，"
+                f"{len(changed)} 個有變動，耗時 {manifest['duration']:.1f} 秒"
+            )
+            return manifest
+
+    async def prune(self, info):
+        """依保留規則清理舊快照，回傳 (刪除的快照, 釋放的位元組)"""
+        async with self.lock_for(info):
+            return await asyncio.to_thread(self.store_for(info).prune, self.keep_last, self.keep_daily)
+
+    def _restore(self, info, manifest):
+        store = self.store_for(info)
+        missing = store.missing(manifest)
+        if missing:
+            raise BackupError(f"快照 {manifest['id']} 缺少 {len(missing)} 個片段，無法還原")
+        current = scan_files(info.folder, [
+            name for name in manifest['folders'] if os.path.isdir(os.path.join(info.folder, name))
+        ])
+        for relative in current:
+            if relative not in manifest['files']:
+                os.remove(os.path.join(info.folder, relative))
+        restored = 0
+        for relative, entry in manifest['files'].items():
+            if current.get(relative) == (entry['size'], entry['mtime_ns']):
+                continue
+            target = os.path.join(info.folder, relative)
+            store.restore_file(entry, target)
+            os.utime(target, ns=(entry['mtime_ns'], entry['mtime_ns']))
+            restored += 1
+        return restored
+
+    async def restore(self, info, snapshot_id):
+        """將世界資料夾還原為指定快照 (伺服器必須已停止)，回傳改寫的檔案數"""
+        async with self.lock_for(info):
+            manifest = await asyncio.to_thread(self.store_for(info).load, snapshot_id)
+            return await asyncio.to_thread(self._restore, info, manifest)
+
+
+@contextlib.asynccontextmanager
+async def saves_paused(info, managed=None, rcon_pool=None, timeout=SAVE_TIMEOUT):
+    """
+    備份期間暫停自動存檔：save-off → save-all flush → (備份) → save-on
+
+    由本機器人啟動的伺服器 (managed) 使用主控台並等待存檔完成的訊息；
+    在機器人之外運行的伺服器傳入 rcon_pool 使用 RCON (save-all flush 會在存檔完成後才回應)。
+    兩者皆無表示伺服器未運行，不需協調。
+    """
+    if managed is not None and managed.is_running:
+        async def send(command):
+            await managed.send_line(command)
+
+        async def flush():
+            subscription = managed.console.subscribe(SAVED_PATTERN)
+            try:
+                await send('save-all flush')
+                if not await subscription.wait(timeout):
+                    raise BackupError(f"{info.name} 在 {timeout} 秒內未完成存檔")
+            finally:
+                subscription.close()
+    elif rcon_pool is not None:
+        async def send(command, command_timeout=None):
+            try:
+                await rcon_pool.command(info, command, command_timeout)
+            except RconError as e:
+                raise BackupError(f"{info.name} 正在運行，但 RCON 失敗：{e}")
+
+        async def flush():
+            # 逾時交給 RCON 指令本身，否則會先被連線預設的短逾時中斷
+            await send('save-all flush', timeout)
+    else:
+        yield
+        return
+
+    await send('save-off')
+    try:
+        await flush()
+        yield
+    finally:
+        try:
+            await send('save-on')
+        except Exception as e:
+            logger.error(f"{info.name} 恢復自動存檔失敗：{e}")
+
+
+def get_backup_engine(bot):
+    """取得 bot 共用的備份引擎，不存在時依設定建立"""
+    engine = getattr(bot, 'backup_engine', None)
+    if engine is None:
+        backup_cfg = getattr(bot, 'config', {}).get('backup', {})
+        engine = BackupEngine(
+            root=backup_cfg.get('root') or BACKUP_ROOT,
+            workers=int(backup_cfg.get('workers', 0)),
+            keep_last=int(backup_cfg.get('keep_last', KEEP_LAST)),
+            keep_daily=int(backup_cfg.get('keep_daily', KEEP_DAILY))
+        )
+        bot.backup_engine = engine
+    return engine
@@ -0,0 +1,244 @@
+import asyncio
+import collections
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 每個伺服器保留的主控台行數
+BUFFER_LINES = 1000
+# 單行最大長度，超過的部分截斷 (避免單行無換行的輸出吃光記憶體)
+MAX_LINE = 4096
+# 每個訂閱者最多暫存的行數，超過時丟棄最舊的行
+SUBSCRIBER_LINES = 2000
+# 讀取管線的區塊大小
+READ_CHUNK = 64 * 1024
+
+# Discord 單則訊息上限
+DISCORD_LIMIT = 2000
+FLUSH_INTERVAL = 2.0
+# 每次送出的訊息上限，更多的輸出只保留最新的部分
+MAX_MESSAGES = 3
+
+
+class ConsoleLine:
+    """一行主控台輸出"""
+
+    __slots__ = ('seq', 'time', 'stream', 'text')
+
+    def __init__(self, seq, stream, text, timestamp=None):
+        self.seq = seq
+        self.time = timestamp if timestamp is not None else time.time()
+        self.stream = stream
+        self.text = text
+
+    def __repr__(self):
+        return f"ConsoleLine({self.seq}, {self.stream!r}, {self.text!r})"
+
+
+class ConsoleSubscription:
+    """
+    訂閱新的主控台輸出
+
+    以固定長度的 deque 暫存，消費太慢時丟棄最舊的行並累計 dropped，
+    不論伺服器輸出多少，記憶體用量都有上限。
+    """
+
+    def __init__(self, buffer, maxlen=SUBSCRIBER_LINES, pattern=None):
+        self._buffer = buffer
+        self._lines = collections.deque(maxlen=maxlen)
+        self._event = asyncio.Event()
+        self.pattern = pattern
+        self.dropped = 0
+        self.closed = False
+
+    def _push(self, line):
+        if self.pattern is not None and not self.pattern.search(line.text):
+            return
+        if len(self._lines) == self._lines.maxlen:
+            self.dropped += 1
+        self._lines.append(line)
+        self._event.set()
+
+    def _close(self):
+        self.closed = True
+        self._event.set()
+
+    @property
+    def exhausted(self):
+        """訂閱已結束且沒有未讀取的行"""
+        return self.closed and not self._lines
+
+    def drain(self):
+        """取出目前暫存的所有行"""
+        lines = list(self._lines)
+        self._lines.clear()
+        if not self.closed:
+            self._event.clear()
+        return lines
+
+    async def wait(self, timeout=None):
+        """等待新的行或訂閱結束，回傳是否有可讀取的資料"""
+        if not self._lines and not self.closed:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return bool(self._lines)
+
+    def close(self):
+        self._buffer.unsubscribe(self)
+
+
+class ConsoleBuffer:
+    """每個伺服器的主控台環狀緩衝區，並將新行推送給訂閱者"""
+
+    def __init__(self, maxlen=BUFFER_LINES, max_line=MAX_LINE):
+        self._lines = collections.deque(maxlen=maxlen)
+        self._subscribers = []
+        self.max_line = max_line
+        self.seq = 0
+        self.closed = False
+
+    def __len__(self):
+        return len(self._lines)
+
+    def append(self, text, stream='stdout'):
+        if len(text) > self.max_line:
+            text = text[:self.max_line] + '…'
+        self.seq += 1
+        line = ConsoleLine(self.seq, stream, text)
+        self._lines.append(line)
+        for subscriber in self._subscribers:
+            subscriber._push(line)
+        return line
+
+    def tail(self, count=None, pattern=None):
+        """取得最後 count 行 (可依正則過濾)"""
+        lines = [l for l in self._lines if pattern is None or pattern.search(l.text)]
+        return lines if count is None else lines[-count:]
+
+    def subscribe(self, pattern=None, maxlen=SUBSCRIBER_LINES):
+        subscription = ConsoleSubscription(self, maxlen, pattern)
+        if self.closed:
+            subscription._close()
+        else:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription in self._subscribers:
+            self._subscribers.remove(subscription)
+        subscription._close()
+
+    def close(self):
+        """程序結束時呼叫，通知所有訂閱者"""
+        self.closed = True
+        for subscriber in self._subscribers:
+            subscriber._close()
+        self._subscribers.clear()
+
+
+async def pump_stream(stream, buffer, name, chunk_size=READ_CHUNK):
+    """
+    持續讀取子程序的輸出管線並寫入緩衝區
+    以固定大小區塊讀取再切行，避免超長的單行觸發 StreamReader 的行長度限制
+    """
+    pending = b''
+    max_bytes = buffer.max_line * 4
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for raw in lines:
+            buffer.append(raw.rstrip(b'\r').decode('utf-8', errors='replace'), name)
+        if len(pending) > max_bytes:
+            buffer.append(pending.decode('utf-8', errors='replace'), name)
+            pending = b''
+    if pending:
+        buffer.append(pending.rstrip(b'\r').decode('utf-8', errors='replace'), name)
+
+
+def escape_block(text):
+    """避免輸出中的 ``` 提前結束 Discord 程式碼區塊"""
+    return text.replace('```', '`​``')
+
+
+class ConsoleBatcher:
+    """
+    將訂閱的主控台輸出合併成 Discord 訊息
+
+    累積的內容達到訊息上限，或第一行等待超過 interval 秒時送出，
+    訊息數量與輸出量無關，只受 interval 與字數限制。
+    """
+
+    def __init__(self, subscription, send, limit=DISCORD_LIMIT, interval=FLUSH_INTERVAL,
+                 max_messages=MAX_MESSAGES):
+        self.subscription = subscription
+        self.send = send
+        self.limit = limit
+        self.interval = interval
+        self.max_messages = max_messages
+        self.sent_messages = 0
+        self._reported_dropped = 0
+
+    @property
+    def capacity(self):
+        # 扣除程式碼區塊標記 "```\n" 與 "\n```"
+        return self.limit - 8
+
+    def format(self, lines):
+        return '```\n' + '\n'.join(lines) + '\n```'
+
+    def pack(self, lines):
+        """將行切成數個不超過上限的區塊"""
+        blocks, current, size = [], [], 0
+        for line in lines:
+            text = escape_block(line.text)
+            if len(text) > self.capacity:
+                text = text[:self.capacity - 1] + '…'
+            extra = len(text) + (1 if current else 0)
+            if current and size + extra > self.capacity:
+                blocks.append(current)
+                current, size = [], 0
+                extra = len(text)
+            current.append(text)
+            size += extra
+        if current:
+            blocks.append(current)
+        return blocks
+
+    async def _flush(self, lines):
+        blocks = self.pack(lines)
+        skipped = sum(len(block) for block in blocks[:-self.max_messages])
+        blocks = blocks[-self.max_messages:]
+        dropped = self.subscription.dropped - self._reported_dropped + skipped
+        self._reported_dropped = self.subscription.dropped
+        if dropped:
+            await self.send(f"⚠️ 輸出過快，已略過 {dropped} 行")
+            self.sent_messages += 1
+        for block in blocks:
+            await self.send(self.format(block))
+            self.sent_messages += 1
+
+    async def run(self):
+        """持續轉送直到訂閱結束"""
+        loop = asyncio.get_running_loop()
+        pending, size, deadline = [], 0, None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            await self.subscription.wait(timeout)
+            for line in self.subscription.drain():
+                pending.append(line)
+                size += len(line.text) + 1
+                if deadline is None:
+                    deadline = loop.time() + self.interval
+
+            closed = self.subscription.exhausted
+            if pending and (size >= self.capacity or loop.time() >= deadline or closed):
+                lines, pending, size, deadline = pending, [], 0, None
+                await self._flush(lines)
+            if closed:
+                return
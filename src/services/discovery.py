@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from src.services.lifecycle import BackgroundService
+from src.services.registry import get_registry
+from src.services.server_path import default_parser
+
+logger = logging.getLogger(__name__)
+
+# 依序尋找的啟動腳本 (不分大小寫)；非 Windows 上優先使用 .sh
+WINDOWS_SCRIPTS = ('startserver.bat', 'startserver.cmd', 'start.bat', 'run.bat')
+POSIX_SCRIPTS = ('startserver.sh', 'start.sh', 'run.sh')
+# 最多往下找幾層 (例如 base_path/1_project/名稱_版本_端口_核心 為第 2 層)
+MAX_DEPTH = 4
+DISCOVERY_INTERVAL = 300
+# mtime 太接近掃描時間的資料夾下次仍重新列出，避免同一時間刻度內的變動被漏掉
+RACY_WINDOW = 2.0
+
+
+def script_names(platform=sys.platform):
+    if platform == 'win32':
+        return WINDOWS_SCRIPTS + POSIX_SCRIPTS
+    return POSIX_SCRIPTS + WINDOWS_SCRIPTS
+
+
+class DirState:
+    """上次列出資料夾時的結果"""
+    __slots__ = ('mtime_ns', 'children', 'script')
+
+    def __init__(self, mtime_ns, children=(), script=None):
+        self.mtime_ns = mtime_ns
+        self.children = children
+        self.script = script
+
+
+class ScanStats:
+    """一次掃描的統計：走訪 (stat) 的資料夾數與實際重新列出內容的資料夾數"""
+
+    def __init__(self):
+        self.visited = 0
+        self.listed = 0
+        self.duration = 0.0
+
+    def __repr__(self):
+        return f"ScanStats(visited={self.visited}, listed={self.listed}, duration={self.duration:.3f})"
+
+
+class ServerDiscovery:
+    """
+    在 base_path 底下尋找 名稱_版本_端口_核心 格式的伺服器資料夾
+
+    第一次掃描以 os.scandir 走訪整棵樹並記住每個資料夾的 mtime；
+    之後只需 stat 各資料夾，mtime 沒變 (沒有新增、刪除或改名的項目) 就沿用上次的結果，
+    只重新列出有變動的資料夾。伺服器資料夾本身不再往下走 (世界資料夾可能有大量子資料夾)。
+    掃描是同步的，請在執行緒中呼叫。
+    """
+
+    def __init__(self, roots, max_depth=MAX_DEPTH, platform=sys.platform, racy_window=RACY_WINDOW, parser=None):
+        self.roots = [os.path.abspath(root) for root in roots if root]
+        self.parser = parser or default_parser()
+        self.max_depth = max_depth
+        self.scripts = script_names(platform)
+        self.racy_window = racy_window
+        self._dirs = {}
+
+    def _list(self, path, depth, mtime_ns, now):
+        """列出資料夾：伺服器資料夾找出啟動腳本，其他資料夾記錄子資料夾"""
+        if now - mtime_ns / 1e9 < self.racy_window:
+            mtime_ns = None
+        is_server = self.parser.match_folder(os.path.basename(path)) is not None
+        children, files = [], {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if is_server:
+                        if entry.is_file():
+                            files[entry.name.lower()] = entry.name
+                    elif entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                        children.append(entry.path)
+                except OSError:
+                    continue
+        if is_server:
+            for script in self.scripts:
+                if script in files:
+                    return DirState(mtime_ns, script=os.path.join(path, files[script]))
+            return DirState(mtime_ns)
+        if depth >= self.max_depth:
+            children = []
+        return DirState(mtime_ns, children=tuple(sorted(children)))
+
+    def scan(self, stats=None):
+        """掃描所有根目錄，回傳找到的啟動腳本路徑 (已排序)"""
+        stats = stats or ScanStats()
+        started = time.monotonic()
+        now = time.time()
+        found = []
+        seen = {}
+        stack = [(root, 0) for root in reversed(self.roots)]
+        while stack:
+            path, depth = stack.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            stats.visited += 1
+            state = self._dirs.get(path)
+            if state is None or state.mtime_ns is None or state.mtime_ns != mtime_ns:
+                try:
+                    state = self._list(path, depth, mtime_ns, now)
+                except OSError as e:
+                    logger.warning(f"無法讀取資料夾 {path}：{e}")
+                    continue
+                stats.listed += 1
+            seen[path] = state
+            if state.script:
+                found.append(state.script)
+            stack.extend((child, depth + 1) for child in reversed(state.children))
+        # 已消失的資料夾不再保留
+        self._dirs = seen
+        stats.duration = time.monotonic() - started
+        return sorted(found)
+
+
+class DiscoveryService(BackgroundService):
+    """定期掃描 base_path，並將結果合併到伺服器清單"""
+
+    def __init__(self, registry, roots, interval=DISCOVERY_INTERVAL, max_depth=MAX_DEPTH):
+        self.registry = registry
+        self.discovery = ServerDiscovery(roots, max_depth=max_depth, parser=registry.parser)
+        self.interval = interval
+        self.last_stats = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.discovery.roots)
+
+    async def refresh(self):
+        """掃描一次 (在執行緒中進行)，回傳 (新增的路徑, 移除的路徑)"""
+        if not self.enabled:
+            return [], []
+        async with self._lock:
+            stats = ScanStats()
+            found = await asyncio.to_thread(self.discovery.scan, stats)
+            before = set(self.registry.discovered)
+            added = [path for path in found if path not in before]
+            removed = sorted(before.difference(found))
+            if added or removed:
+                self.registry.set_discovered(found)
+                await self.registry.ensure_fresh()
+                logger.info(f"自動偵測伺服器：新增 {len(added)} 個，移除 {len(removed)} 個")
+            self.last_stats = stats
+            logger.debug(f"掃描 {stats.visited} 個資料夾，重新列出 {stats.listed} 個，耗時 {stats.duration:.2f} 秒")
+            return added, removed
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"自動偵測伺服器失敗：{e}", exc_info=True)
+            if self.interval <= 0:
+                return
+            await asyncio.sleep(self.interval)
+
+    def should_run(self):
+        """未設定 base_path 時不啟動背景掃描"""
+        return self.enabled
+
+
+def discovery_roots(server_cfg):
+    """base_path 可為單一路徑、以 os.pathsep 分隔的多個路徑或清單"""
+    base_path = server_cfg.get('base_path') or []
+    if isinstance(base_path, str):
+        base_path = base_path.split(os.pathsep)
+    return [path.strip() for path in base_path if path and path.strip()]
+
+
+def get_discovery(bot):
+    """取得 bot 共用的自動偵測服務，不存在時依設定建立"""
+    service = getattr(bot, 'server_discovery', None)
+    if service is None:
+        server_cfg = getattr(bot, 'config', {}).get('server', {})
+        service = DiscoveryService(
+            get_registry(bot),
+            discovery_roots(server_cfg),
+            interval=float(server_cfg.get('discovery_interval', DISCOVERY_INTERVAL)),
+            max_depth=int(server_cfg.get('discovery_depth', MAX_DEPTH))
+        )
+        bot.server_discovery = service
+    return service
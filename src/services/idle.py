@@ -0,0 +1,308 @@
+import asyncio
+import inspect
+import json
+import logging
+import struct
+from src.services.activity import ActivityTracker
+from src.services.lifecycle import BackgroundService
+from src.services.registry import get_registry
+from src.services.scheduler import get_launch_scheduler
+from src.services.slp import (
+    MAX_PACKET, STATE_STATUS, decode_varint, encode_string, make_packet, parse_handshake, read_packet
+)
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = 60
+# 休眠端口上的連線必須在這段時間內送完封包，避免閒置連線佔用資源
+CLIENT_TIMEOUT = 5.0
+SLEEPING_MOTD = "💤 伺服器休眠中，加入即可喚醒"
+WAKING_MESSAGE = "⏳ 伺服器正在啟動，請稍候一分鐘後重新連線"
+# 舊版 (1.6 以前) 的伺服器列表查詢以 0xFE 開頭，不是 VarInt 長度
+LEGACY_PING = 0xFE
+
+
+def status_response(protocol, motd, waking=False):
+    """休眠中的狀態回應；回傳客戶端的協定版本，讓列表不顯示版本不符"""
+    return {
+        "version": {"name": "💤 休眠中" if not waking else "⏳ 啟動中", "protocol": protocol},
+        "players": {"online": 0, "max": 0, "sample": []},
+        "description": {"text": WAKING_MESSAGE if waking else motd},
+    }
+
+
+class SleepingListener:
+    """
+    已停止伺服器端口上的輕量監聽
+
+    回應伺服器列表查詢 (顯示休眠中)；玩家嘗試登入時回覆斷線訊息並觸發 on_wake。
+    真正的伺服器啟動前必須先 close() 釋放端口。
+    """
+
+    def __init__(self, info, on_wake, host='', motd=SLEEPING_MOTD, timeout=CLIENT_TIMEOUT):
+        self.info = info
+        self.on_wake = on_wake
+        self.host = host
+        self.motd = motd
+        self.timeout = timeout
+        self.waking = False
+        self._server = None
+
+    @property
+    def port(self):
+        return self.info.port
+
+    @property
+    def listening(self):
+        return self._server is not None
+
+    async def open(self):
+        self._server = await asyncio.start_server(self._handle, self.host or None, self.port)
+        logger.info(f"{self.info.name} 休眠中，監聽端口 {self.port}")
+
+    async def close(self):
+        if self._server is None:
+            return
+        server, self._server = self._server, None
+        server.close()
+        await server.wait_closed()
+        logger.info(f"停止監聽 {self.info.name} 的端口 {self.port}")
+
+    async def _handle(self, reader, writer):
+        try:
+            await asyncio.wait_for(self._converse(reader, writer), self.timeout)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError,
+                IndexError, struct.error, UnicodeDecodeError):
+            pass
+        except Exception as e:
+            logger.warning(f"{self.info.name} 休眠監聽處理連線失敗：{e}")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _converse(self, reader, writer):
+        # 先讀出長度 VarInt 的位元組，才能分辨舊版查詢
+        header = await reader.readexactly(1)
+        if header[0] == LEGACY_PING:
+            return
+        while header[-1] & 0x80 and len(header) < 5:
+            header += await reader.readexactly(1)
+        length, _ = decode_varint(header)
+        if length <= 0 or length > MAX_PACKET:
+            raise ValueError(f"封包長度異常：{length}")
+        body = await reader.readexactly(length)
+        if not body or body[0] != 0x00:
+            raise ValueError("預期 Handshake 封包")
+        protocol, _, _, next_state = parse_handshake(body[1:])
+
+        if next_state == STATE_STATUS:
+            await self._answer_status(reader, writer, protocol)
+        else:
+            # 登入 (或 1.20.5 以後的 Transfer)：回覆斷線原因後喚醒伺服器
+            reason = json.dumps({"text": WAKING_MESSAGE}, ensure_ascii=False)
+            writer.write(make_packet(0x00, encode_string(reason)))
+            await writer.drain()
+            self.wake()
+
+    async def _answer_status(self, reader, writer, protocol):
+        packet_id, _ = await read_packet(reader)
+        if packet_id != 0x00:
+            return
+        body = json.dumps(status_response(protocol, self.motd, self.waking), ensure_ascii=False)
+        writer.write(make_packet(0x00, encode_string(body)))
+        await writer.drain()
+        packet_id, payload = await read_packet(reader)
+        if packet_id == 0x01:
+            writer.write(make_packet(0x01, payload[:8]))
+            await writer.drain()
+
+    def wake(self):
+        if self.waking:
+            return
+        self.waking = True
+        logger.info(f"有玩家嘗試加入 {self.info.name}，喚醒伺服器")
+        result = self.on_wake(self.info)
+        if inspect.isawaitable(result):
+            asyncio.ensure_future(result)
+
+
+class IdleManager(BackgroundService):
+    """
+    閒置伺服器自動停止與加入時喚醒
+
+    auto_stop_after 秒內持續無玩家 (依 SLP 人數) 的伺服器會被停止 (0 表示停用)；
+    wake_on_join 開啟時，已停止的伺服器端口由 SleepingListener 接手，
+    有玩家嘗試登入時呼叫 wake_server 啟動真正的伺服器。
+    """
+
+    def __init__(self, supervisor, registry, activity=None, stop_server=None, wake_server=None,
+                 auto_stop_after=0, wake_on_join=False, host='', motd=SLEEPING_MOTD,
+                 check_interval=CHECK_INTERVAL):
+        self.supervisor = supervisor
+        self.registry = registry
+        self.activity = activity or ActivityTracker(supervisor)
+        self.stop_server = stop_server or supervisor.stop
+        self.wake_server = wake_server
+        self.auto_stop_after = auto_stop_after
+        self.wake_on_join = wake_on_join
+        self.host = host
+        self.motd = motd
+        self.check_interval = check_interval
+        self.listeners = {}
+        # 正在走啟動流程的伺服器，期間不重新監聽其端口
+        self._held = set()
+        self._waking = {}
+        self._lock = asyncio.Lock()
+
+    def sleeping(self):
+        """目前休眠中 (有監聽) 的伺服器名稱"""
+        return sorted(listener.info.name for listener in self.listeners.values())
+
+    async def auto_stop(self, now=None):
+        """停止閒置超過門檻的伺服器，回傳停止的伺服器名稱"""
+        if not self.auto_stop_after:
+            return []
+        names = [
+            name for name in self.activity.idle_servers(self.auto_stop_after, now)
+            if self.supervisor.is_running(name)
+        ]
+        for name in names:
+            logger.info(f"{name} 無人超過 {self.auto_stop_after / 60:.0f} 分鐘，自動停止")
+        results = await asyncio.gather(*(self.stop_server(name) for name in names), return_exceptions=True)
+        stopped = []
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"自動停止 {name} 失敗：{result}")
+            else:
+                self.activity.forget(name)
+                stopped.append(name)
+        return stopped
+
+    def _wanted(self):
+        """應該休眠監聽的伺服器 {端口: ServerInfo}；同一端口有多個伺服器時無法判斷要喚醒哪個，略過"""
+        if not self.wake_on_join or self.wake_server is None:
+            return {}
+        running = self.supervisor.running()
+        used = {managed.spec.port for managed in running.values() if managed.spec.port}
+        wanted = {}
+        for info in self.registry.all():
+            if not info.port or info.port in used or info.name in self._held:
+                continue
+            if len(self.registry.by_port(info.port)) == 1:
+                wanted[info.port] = info
+        return wanted
+
+    async def sync(self):
+        """依目前運行狀態開啟或關閉休眠監聽"""
+        async with self._lock:
+            wanted = self._wanted()
+            for port in list(self.listeners):
+                listener = self.listeners[port]
+                if wanted.get(port) is None or wanted[port].path != listener.info.path:
+                    await listener.close()
+                    del self.listeners[port]
+            for port, info in wanted.items():
+                if port in self.listeners:
+                    continue
+                listener = SleepingListener(info, self._on_wake, host=self.host, motd=self.motd)
+                try:
+                    await listener.open()
+                except OSError as e:
+                    # 端口被其他程式佔用 (例如 bot 之外啟動的伺服器)，下次檢查再試
+                    logger.debug(f"無法監聽 {info.name} 的端口 {port}：{e}")
+                    continue
+                self.listeners[port] = listener
+
+    async def release(self, info):
+        """啟動真正的伺服器前釋放端口；啟動流程結束後呼叫 resume"""
+        async with self._lock:
+            self._held.add(info.name)
+            listener = self.listeners.pop(info.port, None)
+            if listener is not None:
+                await listener.close()
+
+    async def close_listener(self, port):
+        """關閉指定端口的休眠監聽，回傳是否原本有在監聽"""
+        async with self._lock:
+            listener = self.listeners.pop(port, None)
+            if listener is None:
+                return False
+            await listener.close()
+            return True
+
+    def resume(self, name):
+        """啟動流程結束 (無論成功與否)，之後依運行狀態決定是否監聽"""
+        self._held.discard(name)
+
+    def _on_wake(self, info):
+        if info.name not in self._waking:
+            self._waking[info.name] = asyncio.create_task(self._wake(info))
+
+    async def _wake(self, info):
+        try:
+            await self.release(info)
+            await self.wake_server(info)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"喚醒 {info.name} 失敗：{e}", exc_info=True)
+        finally:
+            self._waking.pop(info.name, None)
+            self.resume(info.name)
+        # 啟動失敗時恢復監聽；成功時端口已由伺服器使用，sync 會略過
+        await self.sync()
+
+    async def check(self, now=None):
+        """更新人數、停止閒置伺服器並同步休眠監聽"""
+        await self.activity.update(now)
+        await self.auto_stop(now)
+        await self.sync()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"閒置檢查失敗：{e}", exc_info=True)
+            await asyncio.sleep(self.check_interval)
+
+    def should_run(self):
+        """兩項功能都停用時不啟動背景檢查"""
+        return bool(self.auto_stop_after or self.wake_on_join)
+
+    async def _on_stop(self):
+        for task in list(self._waking.values()):
+            task.cancel()
+        async with self._lock:
+            for listener in self.listeners.values():
+                await listener.close()
+            self.listeners.clear()
+
+
+def get_idle_manager(bot, wake_server=None):
+    """取得 bot 共用的閒置管理，不存在時依設定建立；人數紀錄與啟動排程共用"""
+    manager = getattr(bot, 'idle_manager', None)
+    if manager is None:
+        config = getattr(bot, 'config', {})
+        idle_cfg = config.get('idle', {})
+        scheduler = get_launch_scheduler(bot)
+        manager = IdleManager(
+            scheduler.supervisor,
+            get_registry(bot),
+            activity=scheduler.activity,
+            stop_server=scheduler.stop_server,
+            wake_server=wake_server,
+            auto_stop_after=float(idle_cfg.get('auto_stop_minutes', 0)) * 60,
+            wake_on_join=bool(idle_cfg.get('wake_on_join', False)),
+            host=idle_cfg.get('listen_host', ''),
+            motd=idle_cfg.get('sleeping_motd') or SLEEPING_MOTD
+        )
+        bot.idle_manager = manager
+    elif wake_server is not None:
+        manager.wake_server = wake_server
+    return manager
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+
+async def _cancel_and_wait(tasks):
+    for task in tasks:
+        task.cancel()
+    # 被取消的任務以 CancelledError 結束，其他例外已在任務內記錄
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class BackgroundService(ABC):
+    """
+    背景服務的共用骨架
+
+    子類別必須實作 async _run() (否則無法建立實例)；start() 可重複呼叫 (已在執行時不會再開一個)，
+    stop() 取消並等待任務結束後呼叫 _on_stop() 做額外清理。
+    服務本身掛在 bot 上 (見各 get_xxx)，指令模組重新載入時只會停止再啟動同一個實例。
+    """
+
+    _task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def should_run(self):
+        """設定停用時回傳 False，start() 就不建立任務"""
+        return True
+
+    @abstractmethod
+    async def _run(self):
+        """背景任務本體，通常是 while True 迴圈"""
+
+    def start(self):
+        if self.should_run() and not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            task, self._task = self._task, None
+            await _cancel_and_wait([task])
+        await self._on_stop()
+
+    async def _on_stop(self):
+        pass
+
+
+class ManagedTasks:
+    """
+    一組由擁有者 (通常是指令模組) 管理的任務
+
+    任務結束後自動移除；同一個 key 再次建立時會取消舊的；cancel_all() 於卸載時呼叫，
+    確保重新載入後不會留下仍在執行的舊任務。
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    def spawn(self, coro, key=None):
+        key = key if key is not None else object()
+        previous = self._tasks.pop(key, None)
+        if previous is not None:
+            previous.cancel()
+        task = asyncio.create_task(coro)
+        self._tasks[key] = task
+        task.add_done_callback(lambda done: self._discard(key, done))
+        return task
+
+    def _discard(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"背景任務發生錯誤：{task.exception()}", exc_info=task.exception())
+
+    def get(self, key):
+        return self._tasks.get(key)
+
+    def keys(self):
+        return list(self._tasks)
+
+    def cancel(self, key):
+        """取消指定任務，回傳是否存在"""
+        task = self._tasks.pop(key, None)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    async def cancel_all(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        await _cancel_and_wait(tasks)
+
+    def __contains__(self, key):
+        return key in self._tasks
+
+    def __len__(self):
+        return len(self._tasks)
+
+
+def handover(bot, owner, factory=dict):
+    """
+    跨重新載入保留的狀態
+
+    以 owner (例如指令模組名稱) 存放在 bot 上；模組重新載入後取得的是同一個物件，
+    只應放資料 (快取、設定、要恢復的工作)，不要放綁定舊實例的方法或任務。
+    """
+    states = getattr(bot, 'handover_state', None)
+    if states is None:
+        states = {}
+        bot.handover_state = states
+    if owner not in states:
+        states[owner] = factory()
+    return states[owner]
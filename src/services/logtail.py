@@ -0,0 +1,255 @@
+import asyncio
+import inspect
+import logging
+import os
+import re
+from typing import NamedTuple
+from src.services.lifecycle import BackgroundService
+from src.services.registry import get_registry
+
+logger = logging.getLogger(__name__)
+
+LOG_FILE = os.path.join('logs', 'latest.log')
+DEFAULT_INTERVAL = 1.0
+# 每次讀取的區塊大小；單次輪詢最多讀取的位元組數
+READ_CHUNK = 64 * 1024
+MAX_POLL_BYTES = 4 * 1024 * 1024
+# 單行最大長度，超過時直接切斷
+MAX_LINE = 16 * 1024
+# 判斷輪替用的檔頭長度
+HEAD_BYTES = 128
+
+# 行首格式
+# 原版 / Fabric：[12:34:56] [Server thread/INFO]: 訊息
+# Forge：[18Oct2026 12:34:56.789] [Server thread/INFO] [minecraft/DedicatedServer]: 訊息
+# Paper / Spigot：[12:34:56 INFO]: 訊息
+LINE_PATTERNS = (
+    re.compile(r"^\[(?P<time>[^\]]+)\] \[(?P<thread>[^\]]+)/(?P<level>[A-Z]+)\](?: \[[^\]]*\])?: (?P<message>.*)$"),
+    re.compile(r"^\[(?P<time>\d{2}:\d{2}:\d{2}) (?P<level>[A-Z]+)\]: (?P<message>.*)$"),
+)
+
+PLAYER = r"(?P<player>[A-Za-z0-9_]{1,16})"
+DEATH_PHRASES = (
+    "was slain by", "was shot by", "was killed", "was blown up by", "blew up", "drowned",
+    "fell from", "fell off", "fell out of the world", "fell while", "hit the ground too hard",
+    "burned to death", "went up in flames", "walked into fire", "tried to swim in lava",
+    "discovered the floor was lava", "starved to death", "suffocated in a wall",
+    "was squashed", "was squished", "was pricked to death", "was poked to death",
+    "was stung to death", "was impaled", "was skewered", "was fireballed", "was pummeled",
+    "was struck by lightning", "was obliterated", "was doomed to fall", "withered away",
+    "froze to death", "experienced kinetic energy", "died",
+)
+
+# 依序比對訊息內容，第一個符合的決定事件類型
+EVENT_PATTERNS = (
+    ('done', re.compile(r"^Done \((?P<seconds>[\d.]+)s\)!")),
+    ('lag', re.compile(r"^Can't keep up! .*?Running (?P<ms>\d+)ms or (?P<ticks>\d+) ticks behind")),
+    ('join', re.compile(rf"^{PLAYER} joined the game")),
+    ('leave', re.compile(rf"^{PLAYER} left the game")),
+    ('chat', re.compile(r"^(?:\[Not Secure\] )?<(?P<player>[^>]+)> (?P<text>.*)$")),
+    ('death', re.compile(rf"^{PLAYER} (?P<cause>(?:{'|'.join(re.escape(p) for p in DEATH_PHRASES)}).*)$")),
+    ('crash', re.compile(
+        r"^(?:This crash report has been saved to: (?P<report>.+)"
+        r"|Encountered an unexpected exception.*|Preparing crash report.*)$"
+    )),
+)
+
+EVENT_KINDS = tuple(kind for kind, _ in EVENT_PATTERNS) + ('line',)
+
+
+class LogEvent(NamedTuple):
+    """latest.log 中的一行，kind 為事件類型 (無法分類時為 line)"""
+    kind: str
+    time: str
+    level: str
+    message: str
+    data: dict
+
+
+def parse_line(line):
+    """解析一行記錄，格式不符 (例如堆疊追蹤) 時回傳 None"""
+    for pattern in LINE_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            break
+    else:
+        return None
+
+    level = match.group('level')
+    message = match.group('message')
+    for kind, event_pattern in EVENT_PATTERNS:
+        found = event_pattern.match(message)
+        if found:
+            data = {k: v for k, v in found.groupdict().items() if v is not None}
+            return LogEvent(kind, match.group('time'), level, message, data)
+    if level == 'FATAL':
+        return LogEvent('crash', match.group('time'), level, message, {})
+    return LogEvent('line', match.group('time'), level, message, {})
+
+
+class LogTailer:
+    """
+    增量讀取單一記錄檔
+
+    記住上次讀到的位元組位置，只讀取新增的部分；
+    檔案被截斷、置換 (inode 改變) 或檔頭改變時視為輪替，從頭讀起。
+    每次輪詢的讀取量與單行長度都有上限，不論檔案多大記憶體用量固定。
+    """
+
+    def __init__(self, path, from_end=True, max_line=MAX_LINE):
+        self.path = str(path)
+        self.from_end = from_end
+        self.max_line = max_line
+        self.offset = None
+        self.rotations = 0
+        self._identity = None
+        self._head = b''
+        self._pending = b''
+
+    def _read_head(self, f):
+        f.seek(0)
+        return f.read(HEAD_BYTES)
+
+    def _rotated(self, st, f):
+        if self._identity != (st.st_dev, st.st_ino) or st.st_size < self.offset:
+            return True
+        # Windows 上重建的檔案可能沿用相同 inode，再以檔頭內容確認
+        head = self._read_head(f)
+        return head[:len(self._head)] != self._head
+
+    def _reset(self, st, f, offset):
+        self._identity = (st.st_dev, st.st_ino)
+        self._head = self._read_head(f)
+        self._pending = b''
+        self.offset = offset
+
+    def poll(self, max_bytes=MAX_POLL_BYTES):
+        """讀取新增的完整行 (str 清單)；檔案不存在時回傳空清單"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return []
+        with f:
+            st = os.fstat(f.fileno())
+            if self.offset is None:
+                self._reset(st, f, st.st_size if self.from_end else 0)
+            elif self._rotated(st, f):
+                logger.info(f"記錄檔已輪替：{self.path}")
+                self.rotations += 1
+                self._reset(st, f, 0)
+            elif len(self._head) < HEAD_BYTES:
+                self._head = self._read_head(f)
+
+            lines = []
+            f.seek(self.offset)
+            remaining = max_bytes
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    break
+                self.offset += len(chunk)
+                remaining -= len(chunk)
+                data = self._pending + chunk
+                *complete, self._pending = data.split(b'\n')
+                lines.extend(raw.rstrip(b'\r').decode('utf-8', errors='replace') for raw in complete)
+                if len(self._pending) > self.max_line:
+                    lines.append(self._pending.decode('utf-8', errors='replace'))
+                    self._pending = b''
+            return lines
+
+    def events(self, max_bytes=MAX_POLL_BYTES):
+        """讀取新增的行並解析為 LogEvent"""
+        events = []
+        for line in self.poll(max_bytes):
+            event = parse_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+
+class LogWatcher(BackgroundService):
+    """
+    追蹤所有已註冊伺服器的 latest.log 並分派事件
+
+    只讀取檔案，不需要由本機器人啟動伺服器。
+    訂閱者以 subscribe(callback, kinds) 註冊，收到 (ServerInfo, LogEvent)。
+    """
+
+    def __init__(self, registry, interval=DEFAULT_INTERVAL):
+        self.registry = registry
+        self.interval = interval
+        self._tailers = {}
+        self._subscribers = []
+
+    def subscribe(self, callback, kinds=None):
+        """註冊事件回呼 (可為協程函式)；kinds 為要接收的事件類型，None 表示全部"""
+        self._subscribers.append((callback, frozenset(kinds) if kinds else None))
+
+    def unsubscribe(self, callback):
+        self._subscribers = [(cb, kinds) for cb, kinds in self._subscribers if cb != callback]
+
+    def tailer_for(self, info):
+        tailer = self._tailers.get(info.path)
+        if tailer is None:
+            tailer = LogTailer(os.path.join(info.folder, LOG_FILE))
+            self._tailers[info.path] = tailer
+        return tailer
+
+    def _poll_all(self, servers):
+        """讀取所有伺服器的新事件 (在執行緒中執行)"""
+        results = []
+        for info in servers:
+            try:
+                events = self.tailer_for(info).events()
+            except OSError as e:
+                logger.warning(f"讀取 {info.name} 記錄檔失敗：{e}")
+                continue
+            if events:
+                results.append((info, events))
+        return results
+
+    async def poll(self):
+        """輪詢一次並分派事件，回傳分派的事件數"""
+        await self.registry.ensure_fresh()
+        servers = list(self.registry)
+        known = {info.path for info in servers}
+        for path in list(self._tailers):
+            if path not in known:
+                del self._tailers[path]
+
+        count = 0
+        for info, events in await asyncio.to_thread(self._poll_all, servers):
+            for event in events:
+                count += 1
+                await self._dispatch(info, event)
+        return count
+
+    async def _dispatch(self, info, event):
+        for callback, kinds in list(self._subscribers):
+            if kinds is not None and event.kind not in kinds:
+                continue
+            try:
+                result = callback(info, event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"記錄事件回呼錯誤：{e}", exc_info=True)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"記錄檔輪詢失敗：{e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+
+def get_log_watcher(bot):
+    """取得 bot 共用的記錄檔追蹤器，不存在時建立"""
+    watcher = getattr(bot, 'log_watcher', None)
+    if watcher is None:
+        watcher = LogWatcher(get_registry(bot))
+        bot.log_watcher = watcher
+    return watcher
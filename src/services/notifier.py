@@ -0,0 +1,315 @@
+import asyncio
+import inspect
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 同一批合併時最多列出的訊息行數
+MAX_LINES = 10
+
+
+class Notification:
+    """一則待發送的通知"""
+
+    def __init__(self, title, message, channel='server'):
+        self.title = title
+        self.message = message
+        self.channel = channel
+        self.created_at = time.time()
+
+    def __repr__(self):
+        return f"Notification({self.channel!r}, {self.title!r}, {self.message!r})"
+
+
+class RateLimiter:
+    """簡單的 token bucket：每 per 秒最多 count 次"""
+
+    def __init__(self, count, per, clock=time.monotonic):
+        self.capacity = count
+        self.per = per
+        self.tokens = float(count)
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / self.per)
+        self.updated = now
+
+    def try_acquire(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self):
+        """距離下一個 token 可用的秒數"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.per / self.capacity
+
+
+class NotificationSink(ABC):
+    """
+    通知輸出端基底類別
+    send 可為一般函式 (會放到執行緒執行) 或協程函式
+    channels 為 None 時接收所有頻道
+    """
+    name = 'sink'
+    channels = None
+
+    def accepts(self, channel):
+        return self.channels is None or channel in self.channels
+
+    @abstractmethod
+    def send(self, title, message):
+        """送出一則通知"""
+
+
+class PlyerSink(NotificationSink):
+    """桌面系統通知"""
+    name = 'desktop'
+
+    def send(self, title, message):
+        from plyer import notification
+        notification.notify(
+            title=f"[MC Server Bot] {title}",
+            message=f"{message}\n\n來自 open-myMinecraftServer 系統通知",
+            app_name='MC Server Controller',
+            timeout=15,
+            toast=True
+        )
+
+
+class LogFileSink(NotificationSink):
+    """寫入通知記錄檔"""
+    name = 'log'
+
+    def __init__(self, path='notifications.log'):
+        self.path = path
+
+    def send(self, title, message):
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(f"{timestamp} [{title}] {message}\n")
+
+
+class WebhookSink(NotificationSink):
+    """透過 Discord Webhook 發送"""
+    name = 'webhook'
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self._session = None
+
+    async def send(self, title, message):
+        import aiohttp
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        payload = {"content": f"**{title}**\n{message}"[:2000]}
+        async with self._session.post(self.url, json=payload) as resp:
+            resp.raise_for_status()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class MemorySink(NotificationSink):
+    """將通知保存在記憶體，供測試使用"""
+    name = 'memory'
+
+    def __init__(self, channels=None):
+        self.channels = channels
+        self.sent = []
+
+    def send(self, title, message):
+        self.sent.append((title, message))
+
+
+def coalesce(items):
+    """將同頻道同標題的通知合併為一則"""
+    groups = {}
+    for item in items:
+        groups.setdefault(item.title, []).append(item)
+
+    merged = []
+    for title, group in groups.items():
+        if len(group) == 1:
+            merged.append((title, group[0].message))
+            continue
+        lines = [f"• {item.message}" for item in group[:MAX_LINES]]
+        if len(group) > MAX_LINES:
+            lines.append(f"…以及其他 {len(group) - MAX_LINES} 則")
+        merged.append((f"{title} ({len(group)} 則)", "\n".join(lines)))
+    return merged
+
+
+class Notifier:
+    """
+    非阻塞通知分派器
+
+    notify() 只把通知放進佇列後立即返回，指令延遲不受輸出端影響；
+    背景 worker 在 coalesce 秒內合併同類通知，依頻道限速後交給各輸出端。
+    """
+
+    def __init__(self, sinks=(), coalesce_seconds=2.0, rate_count=5, rate_per=60.0,
+                 max_queue=1000, sink_timeout=30.0):
+        self.sinks = list(sinks)
+        self.coalesce_seconds = coalesce_seconds
+        self.rate_count = rate_count
+        self.rate_per = rate_per
+        self.sink_timeout = sink_timeout
+        self._queue = deque(maxlen=max_queue)
+        self._pending = {}
+        self._limiters = {}
+        self._wakeup = None
+        self._worker = None
+        self._inflight = set()
+
+    def notify(self, title, message, channel='server'):
+        """排入一則通知 (非阻塞)"""
+        if len(self._queue) == self._queue.maxlen:
+            logger.warning("通知佇列已滿，捨棄最舊的通知")
+        self._queue.append(Notification(title, message, channel))
+        self._ensure_worker()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_worker(self):
+        if self._worker is not None and not self._worker.done():
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # 尚無事件迴圈，等待下一次在迴圈內呼叫時再啟動
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    def _limiter(self, channel):
+        limiter = self._limiters.get(channel)
+        if limiter is None:
+            limiter = self._limiters[channel] = RateLimiter(self.rate_count, self.rate_per)
+        return limiter
+
+    def _drain_queue(self):
+        while self._queue:
+            item = self._queue.popleft()
+            self._pending.setdefault(item.channel, []).append(item)
+
+    async def _run(self):
+        while True:
+            if not self._queue and not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            # 等待合併視窗，收集同一波的通知
+            await asyncio.sleep(self.coalesce_seconds)
+            self._drain_queue()
+
+            next_wait = None
+            for channel in list(self._pending):
+                limiter = self._limiter(channel)
+                if not limiter.try_acquire():
+                    # 超過頻率限制：保留到下一輪，屆時與新通知一起合併
+                    wait = limiter.wait_time()
+                    next_wait = wait if next_wait is None else min(next_wait, wait)
+                    continue
+                items = self._pending.pop(channel)
+                for title, message in coalesce(items):
+                    self._dispatch(channel, title, message)
+
+            if next_wait is not None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), next_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _dispatch(self, channel, title, message):
+        """每個輸出端各自一個任務，慢的輸出端不會拖累其他輸出端"""
+        for sink in self.sinks:
+            if sink.accepts(channel):
+                task = asyncio.create_task(self._send(sink, title, message))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, sink, title, message):
+        try:
+            if inspect.iscoroutinefunction(sink.send):
+                await asyncio.wait_for(sink.send(title, message), self.sink_timeout)
+            else:
+                await asyncio.wait_for(asyncio.to_thread(sink.send, title, message), self.sink_timeout)
+            logger.info(f"通知已發送 ({sink.name})：{title}")
+        except Exception as e:
+            logger.error(f"通知發送失敗 ({sink.name})：{e}")
+
+    async def flush(self):
+        """立即送出所有待發通知 (忽略合併視窗與頻率限制)，並等待發送完成"""
+        self._drain_queue()
+        pending, self._pending = self._pending, {}
+        for channel, items in pending.items():
+            for title, message in coalesce(items):
+                self._dispatch(channel, title, message)
+        if self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+
+    async def close(self):
+        """停止背景 worker，送出剩餘通知並關閉輸出端"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        await self.flush()
+        for sink in self.sinks:
+            close = getattr(sink, 'close', None)
+            if close is not None:
+                await close()
+
+
+SINK_TYPES = {
+    'desktop': lambda cfg: PlyerSink(),
+    'log': lambda cfg: LogFileSink(cfg.get('log_file') or 'notifications.log'),
+    'webhook': lambda cfg: WebhookSink(cfg['webhook_url']) if cfg.get('webhook_url') else None,
+}
+
+
+def build_notifier(config):
+    """依設定檔 notifications 區段建立通知分派器"""
+    cfg = config.get('notifications', {}) if config else {}
+    sinks = []
+    for sink_name in cfg.get('sinks', ['desktop']):
+        factory = SINK_TYPES.get(sink_name)
+        if factory is None:
+            logger.warning(f"未知的通知輸出端：{sink_name}")
+            continue
+        sink = factory(cfg)
+        if sink is not None:
+            sinks.append(sink)
+
+    rate = cfg.get('rate_limit', {})
+    return Notifier(
+        sinks,
+        coalesce_seconds=float(cfg.get('coalesce_seconds', 2)),
+        rate_count=int(rate.get('count', 5)),
+        rate_per=float(rate.get('per', 60))
+    )
+
+
+def get_notifier(bot):
+    """取得 bot 共用的通知分派器，不存在時依設定建立"""
+    notifier = getattr(bot, 'notifier', None)
+    if notifier is None:
+        notifier = build_notifier(getattr(bot, 'config', {}))
+        bot.notifier = notifier
+    return notifier
@@ -0,0 +1,150 @@
+import logging
+import os
+import re
+import socket
+import psutil
+from src.services.rcon import read_server_properties
+from src.services.supervisor import IS_WINDOWS, find_listening_pid
+
+logger = logging.getLogger(__name__)
+
+XMX_PATTERN = re.compile(r"-Xmx(\d+)([kKmMgGtT]?)\b")
+UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+# Forge / NeoForge 把 JVM 參數放在另一個檔案
+JVM_ARGS_FILES = ('user_jvm_args.txt',)
+# 除了 heap 以外，JVM 本身 (metaspace、執行緒堆疊等) 需要的額外記憶體比例
+JVM_OVERHEAD = 1.1
+MAX_SCRIPT_SIZE = 256 * 1024
+
+
+def format_size(value):
+    return f"{value / 1024 ** 3:.1f} GB"
+
+
+class PreflightResult:
+    """啟動前檢查結果：errors 會阻止啟動，warnings 只提示"""
+
+    def __init__(self):
+        self.errors = []
+        self.warnings = []
+        self.heap = None
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def __repr__(self):
+        return f"PreflightResult(errors={self.errors!r}, warnings={self.warnings!r})"
+
+
+def parse_xmx(text):
+    """取出 -Xmx 設定的位元組數 (多個時取最後一個，與 JVM 行為相同)"""
+    matches = XMX_PATTERN.findall(text)
+    if not matches:
+        return None
+    amount, unit = matches[-1]
+    return int(amount) * UNITS[unit.lower()]
+
+
+def _read_text(path):
+    with open(path, 'rb') as f:
+        return f.read(MAX_SCRIPT_SIZE).decode('utf-8', errors='replace')
+
+
+def configured_heap(info):
+    """從啟動腳本 (或 user_jvm_args.txt) 讀取最大 heap，沒有設定時回傳 None"""
+    candidates = [os.path.join(info.folder, info.script)]
+    candidates += [os.path.join(info.folder, name) for name in JVM_ARGS_FILES]
+    for path in candidates:
+        if os.path.splitext(path)[1].lower() == '.jar':
+            continue
+        try:
+            heap = parse_xmx(_read_text(path))
+        except OSError:
+            continue
+        if heap is not None:
+            return heap
+    return None
+
+
+def port_in_use(port, host=''):
+    """嘗試綁定端口，無法綁定時回傳錯誤訊息，可用時回傳 None"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        if not IS_WINDOWS:
+            # 與 Java 相同，允許綁定仍在 TIME_WAIT 的端口；Windows 上此選項會允許搶佔，故不設定
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+    except OSError as e:
+        return e.strerror or str(e)
+    finally:
+        sock.close()
+    return None
+
+
+def _holder(port):
+    """找出佔用端口的程序名稱 (找不到時回傳 None)"""
+    pid = find_listening_pid(port)
+    if pid is None:
+        return None
+    try:
+        return f"{psutil.Process(pid).name()} (PID {pid})"
+    except psutil.Error:
+        return f"PID {pid}"
+
+
+def check_port(info, result):
+    error = port_in_use(info.port)
+    if error is not None:
+        holder = _holder(info.port)
+        result.errors.append(
+            f"端口 {info.port} 已被佔用" + (f"：{holder}" if holder else f" ({error})")
+        )
+
+
+def check_registry(info, registry, result, supervisor=None):
+    """檢查清單中是否有其他伺服器使用相同端口"""
+    others = [other for other in registry.by_port(info.port) if other.path != info.path]
+    for other in others:
+        if supervisor is not None and supervisor.is_running(other.name):
+            result.errors.append(f"端口 {info.port} 已由運行中的 {other.name}_{other.version} 使用")
+        else:
+            result.warnings.append(f"{other.name}_{other.version} 也設定為端口 {info.port}，兩者無法同時運行")
+
+
+def check_properties(info, result):
+    """server.properties 的 server-port 與資料夾名稱不一致時提示"""
+    try:
+        props = read_server_properties(info.folder)
+    except OSError:
+        return
+    port = props.get('server-port')
+    if port and port.isdigit() and int(port) != info.port:
+        result.warnings.append(
+            f"server.properties 的 server-port={port} 與資料夾名稱的端口 {info.port} 不一致"
+        )
+
+
+def check_memory(info, result, overhead=JVM_OVERHEAD):
+    """檢查可用記憶體是否足夠 -Xmx 設定"""
+    heap = configured_heap(info)
+    result.heap = heap
+    if heap is None:
+        result.warnings.append("啟動腳本未設定 -Xmx，無法檢查記憶體")
+        return
+    available = psutil.virtual_memory().available
+    if heap * overhead > available:
+        result.errors.append(
+            f"可用記憶體不足：需要約 {format_size(heap * overhead)} (-Xmx {format_size(heap)})，"
+            f"目前可用 {format_size(available)}"
+        )
+
+
+def run_preflight(info, registry, supervisor=None):
+    """執行所有啟動前檢查；全部是本機操作，通常數毫秒內完成"""
+    result = PreflightResult()
+    check_registry(info, registry, result, supervisor)
+    check_port(info, result)
+    check_properties(info, result)
+    check_memory(info, result)
+    return result
@@ -0,0 +1,251 @@
+import asyncio
+import itertools
+import logging
+import os
+import struct
+
+logger = logging.getLogger(__name__)
+
+# 封包類型
+TYPE_RESPONSE = 0
+TYPE_COMMAND = 2
+TYPE_LOGIN = 3
+
+DEFAULT_TIMEOUT = 5.0
+MAX_PACKET = 64 * 1024
+
+
+class RconError(Exception):
+    """RCON 通訊錯誤"""
+
+
+class RconAuthError(RconError):
+    """RCON 密碼錯誤"""
+
+
+class RconDisconnected(RconError):
+    """RCON 連線在等待回應時中斷"""
+
+
+def encode_packet(request_id, packet_type, payload):
+    body = struct.pack('<ii', request_id, packet_type) + payload.encode('utf-8') + b'\x00\x00'
+    return struct.pack('<i', len(body)) + body
+
+
+async def read_packet(reader):
+    """讀取一個 RCON 封包，回傳 (request_id, type, payload)"""
+    length = struct.unpack('<i', await reader.readexactly(4))[0]
+    if length < 10 or length > MAX_PACKET:
+        raise RconError(f"封包長度異常：{length}")
+    body = await reader.readexactly(length)
+    request_id, packet_type = struct.unpack('<ii', body[:8])
+    return request_id, packet_type, body[8:-2].decode('utf-8', errors='replace')
+
+
+def read_server_properties(folder):
+    """讀取伺服器資料夾中的 server.properties"""
+    props = {}
+    path = os.path.join(folder, 'server.properties')
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            props[key.strip()] = value.strip()
+    return props
+
+
+class RconClient:
+    """
+    持久連線的 RCON 客戶端
+
+    每個指令使用獨立 request id，可同時送出多個指令 (pipelining)；
+    每個指令後接一個哨兵封包，收到哨兵回應即代表多封包回應已全部到齊。
+    """
+
+    def __init__(self, host, port, password, timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._ids = itertools.count(1)
+        self._fragments = {}
+        self._waiters = {}
+        self._sentinels = {}
+        self._connect_lock = asyncio.Lock()
+        self.connect_count = 0
+
+    @property
+    def connected(self):
+        return (self._writer is not None and not self._writer.is_closing()
+                and self._reader_task is not None and not self._reader_task.done())
+
+    async def connect(self):
+        """建立連線並登入 (已連線時不做任何事)"""
+        async with self._connect_lock:
+            if self.connected:
+                return
+            await self._close_transport()
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                raise RconError(f"無法連線 RCON {self.host}:{self.port}：{e or '逾時'}")
+            self.connect_count += 1
+            try:
+                login_id = next(self._ids)
+                self._writer.write(encode_packet(login_id, TYPE_LOGIN, self.password))
+                await self._writer.drain()
+                # 登入回應可能先有一個空的 RESPONSE_VALUE，再來才是 AUTH_RESPONSE
+                while True:
+                    request_id, packet_type, _ = await asyncio.wait_for(read_packet(self._reader), self.timeout)
+                    if request_id == -1:
+                        raise RconAuthError("RCON 密碼錯誤")
+                    if request_id == login_id and packet_type == TYPE_COMMAND:
+                        break
+            except BaseException:
+                await self._close_transport()
+                raise
+            self._reader_task = asyncio.create_task(self._read_loop())
+            logger.info(f"RCON 已連線：{self.host}:{self.port}")
+
+    async def _read_loop(self):
+        try:
+            while True:
+                request_id, _, payload = await read_packet(self._reader)
+                if request_id in self._fragments:
+                    self._fragments[request_id].append(payload)
+                elif request_id in self._sentinels:
+                    command_id = self._sentinels.pop(request_id)
+                    fragments = self._fragments.pop(command_id, [])
+                    waiter = self._waiters.pop(command_id, None)
+                    if waiter is not None and not waiter.done():
+                        waiter.set_result(''.join(fragments))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, RconError) as e:
+            self._fail_pending(RconDisconnected(f"RCON 連線中斷：{e or type(e).__name__}"))
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+
+    def _fail_pending(self, error):
+        for waiter in self._waiters.values():
+            if not waiter.done():
+                waiter.set_exception(error)
+        self._waiters.clear()
+        self._fragments.clear()
+        self._sentinels.clear()
+
+    async def command(self, command, timeout=None):
+        """執行指令並回傳完整 (重組後) 的回應文字；timeout 未指定時使用連線的預設值"""
+        if not self.connected:
+            await self.connect()
+
+        command_id = next(self._ids)
+        sentinel_id = next(self._ids)
+        waiter = asyncio.get_running_loop().create_future()
+        self._fragments[command_id] = []
+        self._waiters[command_id] = waiter
+        self._sentinels[sentinel_id] = command_id
+        try:
+            self._writer.write(
+                encode_packet(command_id, TYPE_COMMAND, command)
+                + encode_packet(sentinel_id, TYPE_RESPONSE, '')
+            )
+            await self._writer.drain()
+            return await asyncio.wait_for(asyncio.shield(waiter), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise RconError(f"RCON 指令逾時：{command}")
+        except (ConnectionError, OSError) as e:
+            raise RconError(f"RCON 傳送失敗：{e}")
+        finally:
+            self._fragments.pop(command_id, None)
+            self._waiters.pop(command_id, None)
+            self._sentinels.pop(sentinel_id, None)
+
+    async def _close_transport(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self._writer = None
+        self._fail_pending(RconError("RCON 連線已關閉"))
+
+    async def close(self):
+        await self._close_transport()
+
+
+class RconPool:
+    """每個伺服器保留一條已登入的 RCON 連線"""
+
+    def __init__(self, host='127.0.0.1', timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.timeout = timeout
+        self._clients = {}
+
+    async def client_for(self, info):
+        """依伺服器資料夾中的 server.properties 取得 (或建立) 連線"""
+        client = self._clients.get(info.name)
+        if client is None:
+            try:
+                props = await asyncio.to_thread(read_server_properties, info.folder)
+            except OSError as e:
+                raise RconError(f"無法讀取 {info.name} 的 server.properties：{e}")
+            if props.get('enable-rcon', 'false').lower() != 'true':
+                raise RconError(f"{info.name} 未啟用 RCON (enable-rcon=false)")
+            client = RconClient(
+                self.host,
+                int(props.get('rcon.port', 25575)),
+                props.get('rcon.password', ''),
+                timeout=self.timeout
+            )
+            self._clients[info.name] = client
+        return client
+
+    async def command(self, info, command, timeout=None):
+        """對伺服器執行 RCON 指令；舊連線失效時自動重連一次"""
+        client = await self.client_for(info)
+        try:
+            return await client.command(command, timeout)
+        except RconAuthError:
+            # 密碼可能已修改，下次重新讀取設定
+            self._clients.pop(info.name, None)
+            await client.close()
+            raise
+        except RconError:
+            if client.connected:
+                raise
+            await client.connect()
+            return await client.command(command, timeout)
+
+    async def discard(self, name):
+        client = self._clients.pop(name, None)
+        if client is not None:
+            await client.close()
+
+    async def close(self):
+        for name in list(self._clients):
+            await self.discard(name)
+
+
+def get_rcon_pool(bot):
+    """取得 bot 共用的 RCON 連線池，不存在時建立"""
+    pool = getattr(bot, 'rcon_pool', None)
+    if pool is None:
+        host = getattr(bot, 'config', {}).get('server', {}).get('status_host') or '127.0.0.1'
+        pool = RconPool(host)
+        bot.rcon_pool = pool
+    return pool
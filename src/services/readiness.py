@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+from src.services.logtail import parse_line
+from src.services.slp import DEFAULT_HOST, query_status
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FILE = 'assets/startup_history.json'
+# 每個伺服器版本保留的啟動紀錄筆數
+HISTORY_SIZE = 20
+# 比過去中位數慢多少倍視為變慢
+REGRESSION_RATIO = 1.5
+
+READY_TIMEOUT = 600
+PROBE_INTERVAL = 2.0
+PROBE_TIMEOUT = 1.0
+
+# 啟動階段
+SPAWNED = 'spawned'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+TIMEOUT = 'timeout'
+
+
+class ReadyResult:
+    """啟動結果：stage 為最終階段，source 為判定就緒的來源 (log / slp)"""
+
+    def __init__(self, stage, elapsed, source=None, reported=None, returncode=None):
+        self.stage = stage
+        self.elapsed = elapsed
+        self.source = source
+        # 伺服器自行回報的載入秒數 (Done (x.xs)!)
+        self.reported = reported
+        self.returncode = returncode
+
+    @property
+    def ready(self):
+        return self.stage == READY
+
+    def __repr__(self):
+        return f"ReadyResult({self.stage!r}, {self.elapsed:.1f}s, source={self.source!r})"
+
+
+async def _watch_output(managed, on_loading):
+    """等待主控台出現 Done (…)!；收到第一行輸出時呼叫 on_loading"""
+    subscription = managed.console.subscribe()
+    try:
+        loading = False
+        while True:
+            await subscription.wait()
+            lines = subscription.drain()
+            if lines and not loading:
+                loading = True
+                await on_loading()
+            for line in lines:
+                event = parse_line(line.text)
+                if event is not None and event.kind == 'done':
+                    return float(event.data['seconds'])
+            if subscription.exhausted:
+                # 輸出已結束：等待程序結束後回傳 None 表示未就緒
+                await managed.exited.wait()
+                return None
+    finally:
+        subscription.close()
+
+
+async def _probe_port(host, port, interval, timeout):
+    """定期以 SLP 查詢端口直到伺服器回應"""
+    while True:
+        status = await query_status(host, port, timeout)
+        if status.online:
+            return status
+        await asyncio.sleep(interval)
+
+
+async def wait_until_ready(managed, host=DEFAULT_HOST, timeout=READY_TIMEOUT,
+                           probe_interval=PROBE_INTERVAL, on_stage=None):
+    """
+    等待伺服器就緒，以先到者為準：
+    主控台的 Done (…)! 訊息，或端口的 SLP 查詢成功。
+    程序在就緒前結束回傳 failed；超過 timeout 回傳 timeout。
+    on_stage(stage) 在進入 loading / ready 等階段時呼叫 (可為協程函式)
+    """
+    start = managed.started_at
+    stage = SPAWNED
+
+    async def advance(new_stage):
+        nonlocal stage
+        if stage == new_stage:
+            return
+        stage = new_stage
+        if on_stage is not None:
+            try:
+                result = on_stage(new_stage)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"啟動階段回呼錯誤：{e}", exc_info=True)
+
+    tasks = {
+        asyncio.ensure_future(_watch_output(managed, lambda: advance(LOADING))): 'log',
+        asyncio.ensure_future(managed.exited.wait()): 'exit',
+    }
+    if managed.spec.port is not None:
+        tasks[asyncio.ensure_future(
+            _probe_port(host, managed.spec.port, probe_interval, PROBE_TIMEOUT)
+        )] = 'slp'
+
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    elapsed = time.time() - start
+    if not done:
+        return ReadyResult(TIMEOUT, elapsed)
+    for task in done:
+        source = tasks[task]
+        if task.exception() is not None:
+            logger.error(f"偵測 {managed.name} 啟動狀態失敗：{task.exception()}")
+        elif source != 'exit' and task.result() is not None:
+            await advance(READY)
+            reported = task.result() if source == 'log' else None
+            return ReadyResult(READY, elapsed, source, reported)
+    return ReadyResult(FAILED, elapsed, returncode=managed.returncode)
+
+
+class StartupHistory:
+    """各伺服器版本的冷啟動耗時紀錄 (JSON 檔)"""
+
+    def __init__(self, path=HISTORY_FILE, size=HISTORY_SIZE):
+        self.path = path
+        self.size = size
+        self._data = None
+
+    @staticmethod
+    def key(name, version):
+        return f"{name}_{version}"
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except FileNotFoundError:
+                self._data = {}
+            except (OSError, ValueError) as e:
+                logger.error(f"讀取啟動紀錄失敗：{e}")
+                self._data = {}
+        return self._data
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def entries(self, name, version):
+        return list(self._load().get(self.key(name, version), []))
+
+    def median(self, name, version):
+        """過去紀錄的中位數秒數，無紀錄時回傳 None"""
+        seconds = [entry['seconds'] for entry in self.entries(name, version)]
+        return statistics.median(seconds) if seconds else None
+
+    def record(self, name, version, seconds, source=None):
+        """新增一筆紀錄並回傳新增前的中位數"""
+        baseline = self.median(name, version)
+        entries = self._load().setdefault(self.key(name, version), [])
+        entries.append({'seconds': round(seconds, 2), 'source': source, 'at': int(time.time())})
+        del entries[:-self.size]
+        try:
+            self._save()
+        except OSError as e:
+            logger.error(f"寫入啟動紀錄失敗：{e}")
+        return baseline
+
+    @staticmethod
+    def is_regression(seconds, baseline, ratio=REGRESSION_RATIO):
+        return baseline is not None and seconds > baseline * ratio
+
+
+def get_startup_history(bot):
+    """取得 bot 共用的啟動紀錄，不存在時建立"""
+    history = getattr(bot, 'startup_history', None)
+    if history is None:
+        history = StartupHistory()
+        bot.startup_history = history
+    return history
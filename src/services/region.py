@@ -0,0 +1,70 @@
+import mmap
+import os
+import struct
+from typing import NamedTuple
+
+# Anvil 區域檔：前 4 KiB 是 1024 個 chunk 的位置 (3 bytes sector 起點 + 1 byte sector 數)，
+# 接著 4 KiB 是各 chunk 最後寫入的時間戳 (秒)，之後以 4 KiB sector 存放壓縮過的 chunk 資料
+SECTOR_SIZE = 4096
+HEADER_SIZE = 2 * SECTOR_SIZE
+CHUNK_COUNT = 1024
+REGION_SUFFIXES = ('.mca',)
+
+_TABLE = struct.Struct(f'>{CHUNK_COUNT}I')
+
+
+class ChunkLocation(NamedTuple):
+    index: int
+    offset: int
+    length: int
+    timestamp: int
+
+    @property
+    def x(self):
+        """區域內的 chunk 座標 (0-31)"""
+        return self.index & 31
+
+    @property
+    def z(self):
+        return self.index >> 5
+
+
+class RegionHeader:
+    """區域檔的位置表與時間戳表，只需讀取檔案開頭 8 KiB"""
+
+    __slots__ = ('locations', 'timestamps')
+
+    def __init__(self, locations, timestamps):
+        self.locations = locations
+        self.timestamps = timestamps
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        return cls(_TABLE.unpack_from(buffer, 0), _TABLE.unpack_from(buffer, SECTOR_SIZE))
+
+    def chunks(self, size=None):
+        """已產生的 chunk，依在檔案中的位置排列；超出檔案大小 (size) 的部分截斷或略過"""
+        found = []
+        for index, entry in enumerate(self.locations):
+            sectors = entry & 0xFF
+            offset = (entry >> 8) * SECTOR_SIZE
+            if not sectors or offset < HEADER_SIZE:
+                continue
+            length = sectors * SECTOR_SIZE
+            if size is not None:
+                if offset >= size:
+                    continue
+                length = min(length, size - offset)
+            found.append(ChunkLocation(index, offset, length, self.timestamps[index]))
+        found.sort(key=lambda chunk: chunk.offset)
+        return found
+
+
+def read_header(f):
+    """以 mmap 讀取已開啟區域檔的標頭，回傳 (原始 8 KiB, RegionHeader)；檔案不足 8 KiB 時回傳 None"""
+    if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+        return None
+    with mmap.mmap(f.fileno(), HEADER_SIZE, access=mmap.ACCESS_READ) as view:
+        raw = view[:HEADER_SIZE]
+    return raw, RegionHeader.from_buffer(raw)
+
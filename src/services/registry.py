@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from src.services.server_index import ServerIndex
+from src.services.server_path import ServerInfo, default_parser, parse_server_info
+from src.services.server_store import ServerStore, journal_path, load_entries
+
+logger = logging.getLogger(__name__)
+
+SERVERS_FILE = 'assets/servers.json'
+
+# 解析器已移到 server_path.py，這裡保留名稱供既有程式匯入
+__all__ = ['SERVERS_FILE', 'ServerInfo', 'ServerRegistry', 'get_registry', 'parse_server_info']
+
+
+class ServerRegistry:
+    """
+    servers.json 的記憶體快取
+
+    只在檔案的 mtime 或大小改變時重新載入，
+    並維護 名稱 / 名稱+版本 / 端口 / 路徑 索引供各指令 O(1) 查詢。
+    自動偵測到的伺服器 (見 discovery.py) 會與檔案中的清單合併，檔案中的項目優先。
+    寫入一律經由 self.store (見 server_store.py)，載入時會重播尚未合併的日誌。
+    """
+
+    def __init__(self, path=SERVERS_FILE, parser=None):
+        self.path = Path(path)
+        self.parser = parser or default_parser()
+        self.store = ServerStore(self.path)
+        self._signature = None
+        self._servers = ()
+        self._by_name = {}
+        self._by_name_version = {}
+        self._by_port = {}
+        self._by_path = {}
+        self.index = ServerIndex()
+        self.errors = []
+        self.discovered = ()
+        self._lock = None
+
+    def _stat_signature(self):
+        signature = []
+        for path in (self.path, journal_path(self.path)):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+                continue
+            signature.append((st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def _load(self, signature):
+        """讀取檔案 (含日誌) 並重建所有索引 (可在執行緒中執行)"""
+        paths = list(load_entries(self.path))
+        # 同一個腳本可能以不同大小寫或分隔符號寫在檔案中，以正規化後的路徑去除重複
+        listed = {os.path.normcase(os.path.normpath(path)) for path in paths if path}
+        paths.extend(
+            path for path in self.discovered if os.path.normcase(os.path.normpath(path)) not in listed
+        )
+
+        servers, errors = [], []
+        by_name, by_name_version, by_port, by_path = {}, {}, {}, {}
+        for path in paths:
+            try:
+                info = self.parser.parse(path)
+            except ValueError as e:
+                errors.append((path, str(e)))
+                logger.error(f"解析伺服器 {path} 失敗：{e}")
+                continue
+            if path in by_path:
+                continue
+            servers.append(info)
+            by_path[path] = info
+            by_name.setdefault(info.name, []).append(info)
+            by_name_version.setdefault((info.name, info.version), info)
+            by_port.setdefault(info.port, []).append(info)
+        index = ServerIndex(servers)
+
+        # 一次性替換，查詢端不會看到半更新的索引
+        self._servers = tuple(servers)
+        self._by_name = by_name
+        self._by_name_version = by_name_version
+        self._by_port = by_port
+        self._by_path = by_path
+        self.index = index
+        self.errors = errors
+        self._signature = signature
+        logger.info(f"伺服器清單已載入：{len(servers)} 筆，{len(errors)} 筆解析失敗")
+
+    def refresh(self, force=False):
+        """同步檢查檔案是否變更，必要時重新載入；回傳是否有重新載入"""
+        signature = self._stat_signature()
+        if not force and signature == self._signature and self._signature is not None:
+            return False
+        self._load(signature)
+        return True
+
+    async def ensure_fresh(self, force=False):
+        """非同步版本的 refresh，讀檔與解析在執行緒中進行，不阻塞事件迴圈"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            signature = self._stat_signature()
+            if not force and signature == self._signature and self._signature is not None:
+                return False
+            await asyncio.to_thread(self._load, signature)
+            return True
+
+    def invalidate(self):
+        """標記快取失效，下次查詢時強制重新載入"""
+        self._signature = None
+
+    def set_discovered(self, paths):
+        """更新自動偵測到的啟動腳本清單，有變動時標記快取失效"""
+        paths = tuple(paths)
+        if paths != self.discovered:
+            self.discovered = paths
+            self.invalidate()
+
+    def all(self):
+        return self._servers
+
+    def get(self, name, version=None):
+        """依名稱 (與版本) 查詢；只給名稱時回傳該名稱的所有版本"""
+        if version is None:
+            return list(self._by_name.get(name, ()))
+        return self._by_name_version.get((name, version))
+
+    def by_port(self, port):
+        return list(self._by_port.get(int(port), ()))
+
+    def by_path(self, path):
+        return self._by_path.get(path)
+
+    def __contains__(self, path):
+        return path in self._by_path
+
+    def __len__(self):
+        return len(self._servers)
+
+    def __iter__(self):
+        return iter(self._servers)
+
+
+def get_registry(bot):
+    """取得 bot 共用的伺服器清單，不存在時建立"""
+    registry = getattr(bot, 'server_registry', None)
+    if registry is None:
+        registry = ServerRegistry()
+        bot.server_registry = registry
+    return registry
@@ -0,0 +1,222 @@
+import asyncio
+import collections
+import itertools
+import logging
+import time
+from src.services.activity import ActivityTracker
+from src.services.lifecycle import BackgroundService
+from src.services.rcon import get_rcon_pool
+from src.services.shutdown import server_stopper
+from src.services.slp import DEFAULT_HOST
+from src.services.supervisor import get_supervisor
+
+logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+# 啟動腳本沒有 -Xmx 時假設的 heap 大小
+DEFAULT_HEAP = 2 * GB
+CHECK_INTERVAL = 60
+
+
+class LaunchCancelled(Exception):
+    """排隊中的啟動請求已取消"""
+
+
+class LaunchTicket:
+    """一個啟動請求；granted 後才可以建立程序"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, info, heap, requester=None):
+        self.id = next(self._ids)
+        self.info = info
+        self.heap = heap
+        self.requester = requester
+        self.created_at = time.time()
+        self._future = asyncio.get_running_loop().create_future()
+
+    @property
+    def name(self):
+        return self.info.name
+
+    @property
+    def granted(self):
+        return self._future.done() and not self._future.cancelled() and self._future.exception() is None
+
+    @property
+    def waiting(self):
+        return not self._future.done()
+
+    async def wait(self):
+        """等待輪到此請求；被取消時拋出 LaunchCancelled"""
+        await asyncio.shield(self._future)
+
+    def __repr__(self):
+        return f"LaunchTicket({self.id}, {self.name!r})"
+
+
+class LaunchScheduler(BackgroundService):
+    """
+    主機層級的啟動排程
+
+    同時運行的伺服器數量與 heap 總和都有上限 (0 表示不限制)，
+    放不下的請求依先來後到排隊；隊首放不下時後面的請求也要等，避免大伺服器一直排不到。
+    可選擇在有人排隊時，停止無人超過 idle_evict 秒的伺服器以騰出資源。
+    """
+
+    def __init__(self, supervisor, max_running=0, memory_budget=0, default_heap=DEFAULT_HEAP,
+                 idle_evict=0, activity=None, stop_server=None, check_interval=CHECK_INTERVAL):
+        self.supervisor = supervisor
+        self.max_running = max_running
+        self.memory_budget = memory_budget
+        self.default_heap = default_heap
+        self.idle_evict = idle_evict
+        self.activity = activity or ActivityTracker(supervisor)
+        self.stop_server = stop_server or supervisor.stop
+        self.check_interval = check_interval
+        self.queue = collections.deque()
+        self._heaps = {}
+        # 已核准但程序尚未建立的請求
+        self._reserved = {}
+        self._evicting = set()
+
+    def heap_of(self, name):
+        return self._heaps.get(name, self.default_heap)
+
+    def usage(self):
+        """回傳 (佔用名額數, heap 總和)"""
+        names = set(self.supervisor.running()) | set(self._reserved)
+        return len(names), sum(self.heap_of(name) for name in names)
+
+    def _within(self, count, used, heap):
+        if self.max_running and count >= self.max_running:
+            return False
+        if self.memory_budget and used + heap > self.memory_budget:
+            return False
+        return True
+
+    def fits(self, heap):
+        return self._within(*self.usage(), heap)
+
+    def request(self, info, heap=None, requester=None):
+        """提出啟動請求；資源足夠且無人排隊時立即核准，否則排入佇列"""
+        heap = heap or self.default_heap
+        if self.memory_budget and heap > self.memory_budget:
+            raise ValueError(
+                f"{info.name} 的 heap ({heap / GB:.1f} GB) 超過主機預算 ({self.memory_budget / GB:.1f} GB)"
+            )
+        ticket = LaunchTicket(info, heap, requester)
+        if not self.queue and self.fits(heap):
+            self._grant(ticket)
+        else:
+            self.queue.append(ticket)
+            logger.info(f"{info.name} 排隊等待啟動 (第 {len(self.queue)} 位)")
+        return ticket
+
+    def _grant(self, ticket):
+        self._heaps[ticket.name] = ticket.heap
+        self._reserved[ticket.name] = ticket
+        ticket._future.set_result(True)
+
+    def pending(self, name):
+        """伺服器是否已在排隊或已核准但尚未啟動"""
+        return name in self._reserved or any(ticket.name == name for ticket in self.queue)
+
+    def position(self, ticket):
+        """在佇列中的位置 (1 起算)，不在佇列時回傳 None"""
+        for index, queued in enumerate(self.queue, 1):
+            if queued is ticket:
+                return index
+        return None
+
+    def cancel(self, ticket):
+        """取消排隊中的請求"""
+        if ticket not in self.queue:
+            return False
+        self.queue.remove(ticket)
+        ticket._future.set_exception(LaunchCancelled(f"{ticket.name} 的啟動請求已取消"))
+        # 取消隊首後，後面的請求可能已經放得下
+        self.pump()
+        return True
+
+    def started(self, ticket):
+        """程序已建立 (或啟動失敗)，釋放保留的名額，之後以實際運行狀態計算"""
+        if self._reserved.get(ticket.name) is ticket:
+            del self._reserved[ticket.name]
+        self.pump()
+
+    def release(self, name):
+        """伺服器停止時呼叫"""
+        self._evicting.discard(name)
+        self.pump()
+
+    def pump(self):
+        """依序核准佇列前端放得下的請求"""
+        while self.queue and self.fits(self.queue[0].heap):
+            self._grant(self.queue.popleft())
+
+    def eviction_candidates(self):
+        """為了讓隊首能啟動需要停止的閒置伺服器，放不下時回傳空清單"""
+        if not self.queue or not self.idle_evict:
+            return []
+        head = self.queue[0]
+        count, used = self.usage()
+        chosen = []
+        for name in self.activity.idle_servers(self.idle_evict):
+            if self._within(count, used, head.heap):
+                break
+            if name in self._evicting:
+                continue
+            chosen.append(name)
+            count -= 1
+            used -= self.heap_of(name)
+        return chosen if self._within(count, used, head.heap) else []
+
+    async def evict_idle(self):
+        """停止閒置伺服器以騰出資源給排隊中的請求，回傳停止的伺服器名稱"""
+        names = self.eviction_candidates()
+        for name in names:
+            logger.info(f"{name} 無人超過 {self.idle_evict / 60:.0f} 分鐘，停止以騰出資源")
+            self._evicting.add(name)
+        results = await asyncio.gather(*(self.stop_server(name) for name in names), return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"停止閒置伺服器 {name} 失敗：{result}")
+            self.release(name)
+        return names
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.activity.update()
+                if self.queue and self.idle_evict:
+                    await self.evict_idle()
+                self.pump()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"啟動排程檢查失敗：{e}", exc_info=True)
+
+
+def get_launch_scheduler(bot):
+    """取得 bot 共用的啟動排程，不存在時依設定建立"""
+    scheduler = getattr(bot, 'launch_scheduler', None)
+    if scheduler is None:
+        config = getattr(bot, 'config', {})
+        scheduler_cfg = config.get('scheduler', {})
+        supervisor = get_supervisor(bot)
+        scheduler = LaunchScheduler(
+            supervisor,
+            max_running=int(scheduler_cfg.get('max_running', 0)),
+            memory_budget=int(float(scheduler_cfg.get('memory_budget_gb', 0)) * GB),
+            default_heap=int(float(scheduler_cfg.get('default_heap_gb', DEFAULT_HEAP / GB)) * GB),
+            idle_evict=float(scheduler_cfg.get('idle_evict_minutes', 0)) * 60,
+            # 騰出資源時先存檔再關閉；重啟後接回的伺服器沒有主控台，改用 RCON
+            stop_server=server_stopper(supervisor, get_rcon_pool(bot)),
+            activity=ActivityTracker(
+                supervisor, host=config.get('server', {}).get('status_host') or DEFAULT_HOST
+            )
+        )
+        bot.launch_scheduler = scheduler
+    return scheduler
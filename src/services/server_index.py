@@ -0,0 +1,165 @@
+import difflib
+from bisect import bisect_left
+from typing import NamedTuple
+
+# 名稱比對等級 (數字越小越精確)
+NAME_EXACT = 0
+NAME_CASEFOLD = 1
+NAME_PREFIX = 2
+NAME_SUBSTRING = 3
+
+# 版本比對等級
+VERSION_EXACT = 0
+VERSION_PREFIX = 1
+
+
+class LookupResult(NamedTuple):
+    """查詢結果：matches 為最佳等級的候選，suggestions 為「你是不是要找」"""
+    matches: list
+    candidates: list
+    suggestions: list
+
+    @property
+    def unique(self):
+        return self.matches[0] if len(self.matches) == 1 else None
+
+
+def _version_tier(version, query):
+    if version == query:
+        return VERSION_EXACT
+    # 以「.」為界的前綴：1.21 可對應 1.21.4，但不對應 1.210
+    if version.startswith(query + '.'):
+        return VERSION_PREFIX
+    return None
+
+
+def _prefix_range(keys, prefix):
+    """回傳排序陣列中以 prefix 開頭的索引範圍"""
+    lo = bisect_left(keys, prefix)
+    hi = bisect_left(keys, prefix + '\U0010ffff', lo)
+    return lo, hi
+
+
+class ServerIndex:
+    """
+    伺服器名稱/版本查詢索引
+
+    名稱以排序陣列做前綴查詢、以後綴陣列做子字串查詢，
+    皆為 O(log n + k)，不必逐筆掃描整份清單。
+    """
+
+    def __init__(self, servers=()):
+        by_name = {}
+        for info in servers:
+            by_name.setdefault(info.name, []).append(info)
+        self._by_name = by_name
+
+        by_key = {}
+        for name in by_name:
+            by_key.setdefault(name.casefold(), []).append(name)
+        self._by_key = by_key
+
+        # 排序後的名稱鍵，供前綴查詢
+        self._keys = sorted(by_key)
+
+        # 後綴陣列：(後綴, 名稱鍵)，任何子字串都是某個後綴的前綴
+        suffixes = []
+        for key in self._keys:
+            for i in range(1, len(key)):
+                suffixes.append((key[i:], key))
+        suffixes.sort()
+        self._suffixes = suffixes
+        self._suffix_keys = [s for s, _ in suffixes]
+
+    def __len__(self):
+        return sum(len(v) for v in self._by_name.values())
+
+    def _name_candidates(self, query):
+        """依名稱比對等級回傳 {名稱: 等級}"""
+        tiers = {}
+        if query in self._by_name:
+            tiers[query] = NAME_EXACT
+
+        key = query.casefold()
+        for name in self._by_key.get(key, ()):
+            tiers.setdefault(name, NAME_CASEFOLD)
+
+        lo, hi = _prefix_range(self._keys, key)
+        for k in self._keys[lo:hi]:
+            for name in self._by_key[k]:
+                tiers.setdefault(name, NAME_PREFIX)
+
+        lo, hi = _prefix_range(self._suffix_keys, key)
+        for _, k in self._suffixes[lo:hi]:
+            for name in self._by_key[k]:
+                tiers.setdefault(name, NAME_SUBSTRING)
+        return tiers
+
+    def lookup(self, name, version=None, limit=5):
+        """
+        依名稱與版本查詢伺服器
+        排序依據：名稱等級 → 版本等級 → 名稱長度差 → 名稱 → 版本
+        """
+        candidates = []
+        for server_name, name_tier in self._name_candidates(name).items():
+            for info in self._by_name[server_name]:
+                if version is None:
+                    version_tier = VERSION_EXACT
+                else:
+                    version_tier = _version_tier(info.version, version)
+                    if version_tier is None:
+                        continue
+                rank = (name_tier, version_tier, len(server_name) - len(name), server_name, info.version)
+                candidates.append((rank, info))
+        candidates.sort(key=lambda c: c[0])
+
+        if candidates:
+            best = candidates[0][0][:2]
+            matches = [info for rank, info in candidates if rank[:2] == best]
+            return LookupResult(matches, [info for _, info in candidates], [])
+        return LookupResult([], [], self.suggest(name, version, limit))
+
+    def resolve(self, text, limit=5):
+        """解析使用者輸入的「名稱」或「名稱_版本」"""
+        if '_' in text:
+            name, version = text.rsplit('_', 1)
+            if version[:1].isdigit():
+                result = self.lookup(name, version, limit)
+                if result.matches:
+                    return result
+        return self.lookup(text, None, limit)
+
+    def suggest(self, name, version=None, limit=5):
+        """產生確定性的「你是不是要找」清單 (格式：名稱_版本)"""
+        # 名稱命中但版本不符：列出該名稱可用的版本
+        tiers = self._name_candidates(name)
+        if tiers:
+            best = min(tiers.values())
+            names = sorted(n for n, t in tiers.items() if t == best)
+            return [
+                f"{info.name}_{info.version}"
+                for n in names for info in self._by_name[n]
+            ][:limit]
+
+        # 名稱完全不符：逐步縮短前綴，從排序陣列中取出鄰近名稱
+        key = name.casefold()
+        pool = []
+        for length in range(len(key), 0, -1):
+            lo, hi = _prefix_range(self._keys, key[:length])
+            if hi > lo:
+                pool = self._keys[lo:min(hi, lo + limit * 10)]
+                break
+        if not pool:
+            lo = bisect_left(self._keys, key)
+            pool = self._keys[max(0, lo - limit):lo + limit]
+
+        ranked = sorted(
+            pool,
+            key=lambda k: (-difflib.SequenceMatcher(None, key, k).ratio(), k)
+        )
+        return [
+            f"{info.name}_{info.version}"
+            for k in ranked
+            for n in self._by_key[k]
+            for info in self._by_name[n]
+        ][:limit]
@@ -0,0 +1,119 @@
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+# 可辨識的版本格式；設定中也可直接寫正規表示式
+VERSION_PATTERNS = {
+    # 1.21、1.21.4
+    'release': r"\d+\.\d+(?:\.\d+)?",
+    # 1.21.4-pre1、1.21-rc2
+    'prerelease': r"\d+\.\d+(?:\.\d+)?-(?:pre|rc)\d+",
+    # 24w14a
+    'snapshot': r"\d{2}w\d{2}[a-z]",
+}
+DEFAULT_VERSIONS = ('release', 'prerelease', 'snapshot')
+CACHE_SIZE = 4096
+MAX_PORT = 65535
+
+
+class ServerInfo(NamedTuple):
+    """已解析的伺服器資訊 (不可變，欄位存於 tuple 中，沒有 __dict__)"""
+    name: str
+    version: str
+    port: int
+    core: str
+    folder: str
+    script: str
+    path: str
+
+
+def compile_folder_pattern(versions=DEFAULT_VERSIONS):
+    """
+    編譯資料夾名稱格式：名稱_版本_port_核心類型
+
+    versions 為 VERSION_PATTERNS 的名稱或自訂的正規表示式。
+    """
+    alternatives = []
+    for version in versions:
+        pattern = VERSION_PATTERNS.get(version, version)
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"無效的版本格式 {version!r}：{e}")
+        alternatives.append(f"(?:{pattern})")
+    if not alternatives:
+        raise ValueError("至少需要一種版本格式")
+    return re.compile(
+        rf"^(?P<name>.+?)_(?P<version>{'|'.join(alternatives)})_(?P<port>\d+)_(?P<core>.+)$"
+    )
+
+
+class ServerPathParser:
+    """
+    解析 .../名稱_版本_port_核心類型/啟動腳本 格式的路徑
+
+    格式在建立時編譯一次；解析結果不可變，依完整路徑快取 (LRU)，
+    伺服器清單重新載入或各指令重複解析同一路徑時不必再跑正規表示式。
+    """
+
+    def __init__(self, versions=DEFAULT_VERSIONS, cache_size=CACHE_SIZE):
+        self.versions = tuple(versions)
+        self.pattern = compile_folder_pattern(self.versions)
+        self._cached = lru_cache(maxsize=cache_size)(self._parse)
+
+    def match_folder(self, folder_name):
+        """資料夾名稱是否符合格式，回傳 re.Match 或 None"""
+        return self.pattern.match(folder_name)
+
+    def _parse(self, full_path):
+        path_obj = Path(full_path)
+        folder_name = path_obj.parent.name
+
+        match = self.pattern.match(folder_name)
+        if not match:
+            raise ValueError(f"路徑格式錯誤：{folder_name}，預期格式：名稱_版本_port_核心類型")
+        port = int(match.group("port"))
+        if not 0 < port <= MAX_PORT:
+            raise ValueError(f"端口超出範圍：{port}")
+
+        return ServerInfo(
+            name=match.group("name"),
+            version=match.group("version"),
+            port=port,
+            core=match.group("core"),
+            folder=str(path_obj.parent),
+            script=path_obj.name,
+            path=full_path
+        )
+
+    def parse(self, full_path):
+        """
+        解析路徑格式：.../名稱_版本_port_核心類型/StartServer.bat
+        範例：skywind_empire2_1.21.4_25560_fabric
+        """
+        return self._cached(str(full_path))
+
+    def cache_info(self):
+        return self._cached.cache_info()
+
+
+_default_parser = ServerPathParser()
+
+
+def default_parser():
+    return _default_parser
+
+
+def configure_parser(versions=None):
+    """依設定 (server.versions) 建立並設為預設的解析器，未設定時使用所有內建格式"""
+    global _default_parser
+    versions = tuple(versions or DEFAULT_VERSIONS)
+    if versions != _default_parser.versions:
+        _default_parser = ServerPathParser(versions)
+    return _default_parser
+
+
+def parse_server_info(full_path):
+    """以預設解析器解析伺服器路徑"""
+    return _default_parser.parse(full_path)
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = '.journal'
+# 日誌累積到此筆數時合併回 servers.json，每次新增/移除的寫入量與清單大小無關
+COMPACT_AFTER = 64
+OP_ADD = 'add'
+OP_REMOVE = 'remove'
+
+
+class ServerStoreError(Exception):
+    """servers.json 格式錯誤或無法寫入"""
+
+
+def journal_path(path):
+    return f"{path}{JOURNAL_SUFFIX}"
+
+
+def read_journal(path):
+    """
+    讀取日誌中的操作 [(op, path), ...]
+
+    每行一筆 JSON；寫到一半就當機留下的不完整行 (或損毀行) 直接略過。
+    """
+    ops = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().split('\n')
+    except FileNotFoundError:
+        return ops
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            op, server_path = record['op'], record['path']
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"略過無法解析的日誌記錄：{line[:80]}")
+            continue
+        if op in (OP_ADD, OP_REMOVE) and isinstance(server_path, str):
+            ops.append((op, server_path))
+    return ops
+
+
+def apply_ops(entries, ops):
+    """依序套用操作到 {路徑: 項目} (保持原順序)；重複套用結果不變，回傳實際生效的操作"""
+    applied = []
+    for op, path in ops:
+        if op == OP_ADD and path not in entries:
+            entries[path] = {'path': path}
+            applied.append((op, path))
+        elif op == OP_REMOVE and path in entries:
+            del entries[path]
+            applied.append((op, path))
+    return applied
+
+
+def load_entries(path):
+    """讀取 servers.json 並重播日誌，回傳 {路徑: 項目}"""
+    entries = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+    except ValueError as e:
+        raise ServerStoreError(f"{path} 格式錯誤：{e}")
+    for entry in data.get('servers', []):
+        if isinstance(entry, dict):
+            entries.setdefault(entry.get('path', ''), entry)
+    apply_ops(entries, read_journal(journal_path(path)))
+    return entries
+
+
+def _fsync_dir(folder):
+    """讓改名本身也寫入磁碟 (Windows 無法開啟資料夾，略過)"""
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path, data):
+    """寫入暫存檔、fsync 後改名取代，讀取端只會看到舊檔或完整的新檔"""
+    folder = os.path.dirname(os.path.abspath(path))
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(folder)
+
+
+class ServerStore:
+    """
+    servers.json 的寫入端
+
+    所有寫入經由同一個 asyncio.Lock 依序進行；新增/移除只在日誌 (servers.json.journal)
+    追加一行並 fsync，累積 COMPACT_AFTER 筆後才以暫存檔 + 改名的方式整份改寫並清空日誌。
+    讀取端 (ServerRegistry) 載入時會重播日誌，啟動時呼叫 recover() 合併上次留下的日誌。
+    """
+
+    def __init__(self, path, compact_after=COMPACT_AFTER):
+        self.path = str(path)
+        self.journal = journal_path(self.path)
+        self.compact_after = compact_after
+        self._entries = None
+        self._signature = None
+        self._pending = 0
+        self._lock = None
+
+    @property
+    def lock(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _stat_signature(self):
+        signature = []
+        for path in (self.path, self.journal):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _current(self):
+        """目前的清單；檔案被手動修改過才重新讀取"""
+        signature = self._stat_signature()
+        if self._entries is None or signature != self._signature:
+            self._entries = load_entries(self.path)
+            self._pending = len(read_journal(self.journal))
+            self._signature = signature
+        return self._entries
+
+    def _append(self, ops):
+        """一次寫入多筆日誌記錄並 fsync"""
+        data = ''.join(
+            json.dumps({'op': op, 'path': path}, ensure_ascii=False) + '\n' for op, path in ops
+        )
+        with open(self.journal, 'a', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact(self):
+        entries = self._current()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except ValueError as e:
+            raise ServerStoreError(f"{self.path} 格式錯誤：{e}")
+        # 保留 servers 以外的欄位
+        data['servers'] = list(entries.values())
+        atomic_write_json(self.path, data)
+        # servers.json 已包含所有操作，此時當機重播日誌也不會改變結果
+        with open(self.journal, 'w', encoding='utf-8') as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = 0
+        self._signature = self._stat_signature()
+
+    def _apply(self, ops):
+        entries = self._current()
+        applied = apply_ops(entries, ops)
+        if applied:
+            try:
+                self._append(applied)
+            except BaseException:
+                self._entries = None  # 寫入失敗時記憶體中的清單可能已不一致
+                raise
+            self._pending += len(applied)
+            self._signature = self._stat_signature()
+            if self._pending >= self.compact_after:
+                try:
+                    self._compact()
+                except OSError as e:
+                    # 操作已寫入日誌，合併失敗不影響結果，下次再試
+                    logger.warning(f"合併伺服器清單日誌失敗：{e}")
+        return applied
+
+    async def apply(self, ops):
+        """套用一批操作 (單次寫入)，回傳實際生效的操作"""
+        async with self.lock:
+            return await asyncio.to_thread(self._apply, list(ops))
+
+    async def add(self, *paths):
+        """新增伺服器路徑，回傳實際新增的路徑 (已存在的略過)"""
+        return [path for _, path in await self.apply((OP_ADD, path) for path in paths)]
+
+    async def remove(self, *paths):
+        """移除伺服器路徑，回傳實際移除的路徑"""
+        return [path for _, path in await self.apply((OP_REMOVE, path) for path in paths)]
+
+    async def compact(self):
+        async with self.lock:
+            await asyncio.to_thread(self._compact)
+
+    async def recover(self):
+        """啟動時將上次留下的日誌合併回 servers.json，回傳重播的筆數"""
+        async with self.lock:
+            def run():
+                self._current()
+                pending = self._pending
+                if pending:
+                    self._compact()
+                    logger.info(f"已將 {pending} 筆伺服器清單日誌合併回 {self.path}")
+                return pending
+            return await asyncio.to_thread(run)
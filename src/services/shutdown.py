@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from src.services.rcon import RconDisconnected, RconError
+from src.services.server_path import ServerInfo
+from src.services.supervisor import (
+    STOP_COMMANDS, StopResult, escalate_stop, find_listening_pid, process_tree, runs_in_folder
+)
+
+logger = logging.getLogger(__name__)
+
+# save-all flush 等到存檔完成才回應，大型世界遠超過一般 RCON 指令的逾時
+FLUSH_TIMEOUT = 120
+
+
+async def rcon_stop(rcon_pool, info, commands=STOP_COMMANDS, flush_timeout=FLUSH_TIMEOUT):
+    """
+    透過 RCON 依序送出關閉指令；save-all flush 會等到存檔完成才回應
+    存檔逾時仍會送出 stop (伺服器關閉時本身也會存檔)，不直接進入終止階段
+    """
+    client = await rcon_pool.client_for(info)
+    try:
+        for command in commands:
+            flush = command.startswith('save-all')
+            try:
+                await client.command(command, flush_timeout if flush else None)
+            except RconDisconnected:
+                raise
+            except RconError as e:
+                if not flush:
+                    raise
+                logger.warning(f"{info.name} 存檔未在 {flush_timeout} 秒內完成，仍送出 stop：{e}")
+    except RconDisconnected:
+        pass  # stop 之後伺服器可能在回應前就中斷連線
+    finally:
+        await rcon_pool.discard(info.name)
+
+
+async def graceful_stop(info, supervisor, rcon_pool=None, idle=None, **timeouts):
+    """
+    關閉伺服器並回傳 StopResult
+    由本機器人啟動的伺服器優先使用 stdin，失敗時改用 RCON (重啟後接回的伺服器沒有主控台，直接使用 RCON)；
+    休眠中 (端口由 idle 的監聽佔用) 的伺服器只關閉監聽；
+    其他伺服器以 RCON 關閉，並依監聽端口找出程序樹以便必要時強制結束；
+    監聽端口的程序不在伺服器資料夾內時 (其他程式或共用端口的另一個伺服器) 不會強制結束
+    """
+    managed = supervisor.get(info.name)
+    if managed is not None and managed.is_running:
+        method = 'stdin' if managed.has_console else 'rcon'
+
+        async def request_stop():
+            nonlocal method
+            if managed.has_console:
+                try:
+                    for command in STOP_COMMANDS:
+                        await managed.send_line(command)
+                    return
+                except (RuntimeError, ConnectionError, OSError) as e:
+                    if rcon_pool is None:
+                        raise
+                    logger.warning(f"{info.name} 主控台輸入失敗，改用 RCON：{e}")
+                    method = 'rcon'
+            elif rcon_pool is None:
+                raise RuntimeError(f"{info.name} 沒有主控台輸入，也無法使用 RCON")
+            await rcon_stop(rcon_pool, info)
+
+        result = await supervisor.stop(info.name, request_stop=request_stop, **timeouts)
+        result.method = method
+        return result
+
+    if idle is not None and await idle.close_listener(info.port):
+        # 端口在機器人自己的程序中，伺服器本來就沒有在運行
+        return StopResult('not_running')
+
+    pid = await asyncio.to_thread(find_listening_pid, info.port)
+    procs = await asyncio.to_thread(process_tree, pid) if pid is not None else []
+    # 失敗時回報的階段：找不到程序視為未運行，程序不屬於此伺服器則無法關閉
+    failed = 'not_running'
+    if procs and not await asyncio.to_thread(runs_in_folder, procs[0], info.folder):
+        logger.warning(f"端口 {info.port} 由 PID {pid} 使用，但該程序不在 {info.folder} 中，不會強制結束")
+        procs = []
+        failed = 'foreign'
+    if rcon_pool is None and not procs:
+        return StopResult(failed)
+
+    request_stop = (lambda: rcon_stop(rcon_pool, info)) if rcon_pool is not None else None
+    if not procs:
+        # 找不到 (或無法確認) 程序：只能送出指令，無法升級強制結束
+        try:
+            await request_stop()
+        except Exception as e:
+            logger.warning(f"{info.name} RCON 關閉失敗：{e}")
+            return StopResult(failed, method='rcon')
+        return StopResult('stop', method='rcon')
+
+    return await escalate_stop(procs, request_stop, method='rcon', **timeouts)
+
+
+def stop_target(managed):
+    """由啟動資訊組出 graceful_stop 需要的伺服器資訊 (名稱、端口，以及讀取 server.properties 的資料夾)"""
+    spec = managed.spec
+    return ServerInfo(
+        name=spec.name, version=spec.version, port=spec.port, core='', folder=spec.cwd, script='', path=''
+    )
+
+
+def server_stopper(supervisor, rcon_pool=None):
+    """
+    回傳 stop_server(name, **timeouts)：以 graceful_stop 關閉受管理的伺服器
+
+    供重新啟動、閒置自動停止與騰出資源使用，取代只會走 stdin 的 supervisor.stop。
+    """
+    async def stop_server(name, **timeouts):
+        managed = supervisor.get(name)
+        if managed is None or not managed.is_running:
+            return StopResult('not_running')
+        return await graceful_stop(stop_target(managed), supervisor, rcon_pool, **timeouts)
+
+    return stop_server
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import re
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_TIMEOUT = 3.0
+
+# 1.7 以後的狀態查詢不在意協定版本，-1 代表「未知」
+HANDSHAKE_PROTOCOL = -1
+STATE_STATUS = 1
+STATE_LOGIN = 2
+MAX_PACKET = 2 * 1024 * 1024
+
+FORMAT_CODES = re.compile(r"§.")
+
+
+def encode_varint(value):
+    """編碼 VarInt (32 位元，負數以二補數表示)"""
+    value &= 0xFFFFFFFF
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def decode_varint(data, offset=0):
+    """從 bytes 解碼 VarInt，回傳 (數值, 新位置)"""
+    result = 0
+    for i in range(5):
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            break
+    else:
+        raise ValueError("VarInt 過長")
+    if result & 0x80000000:
+        result -= 1 << 32
+    return result, offset
+
+
+async def read_varint(reader):
+    result = 0
+    for i in range(5):
+        byte = (await reader.readexactly(1))[0]
+        result |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            return result
+    raise ValueError("VarInt 過長")
+
+
+def encode_string(text):
+    data = text.encode('utf-8')
+    return encode_varint(len(data)) + data
+
+
+def make_packet(packet_id, payload=b''):
+    body = encode_varint(packet_id) + payload
+    return encode_varint(len(body)) + body
+
+
+def parse_handshake(payload):
+    """解析 Handshake 封包內容，回傳 (協定版本, 位址, 端口, 下一個狀態)"""
+    protocol, offset = decode_varint(payload)
+    host_len, offset = decode_varint(payload, offset)
+    host = payload[offset:offset + host_len].decode('utf-8', errors='replace')
+    offset += host_len
+    port = struct.unpack('>H', payload[offset:offset + 2])[0]
+    next_state, _ = decode_varint(payload, offset + 2)
+    return protocol, host, port, next_state
+
+
+async def read_packet(reader):
+    """讀取一個封包，回傳 (封包 ID, 內容)"""
+    length = await read_varint(reader)
+    if length <= 0 or length > MAX_PACKET:
+        raise ValueError(f"封包長度異常：{length}")
+    body = await reader.readexactly(length)
+    packet_id, offset = decode_varint(body)
+    return packet_id, body[offset:]
+
+
+def flatten_motd(description):
+    """將聊天元件格式的 MOTD 轉為純文字"""
+    if isinstance(description, str):
+        text = description
+    elif isinstance(description, dict):
+        text = description.get('text', '') + ''.join(
+            flatten_motd(part) for part in description.get('extra', [])
+        )
+    elif isinstance(description, list):
+        text = ''.join(flatten_motd(part) for part in description)
+    else:
+        text = ''
+    return FORMAT_CODES.sub('', text)
+
+
+class ServerStatus:
+    """SLP 查詢結果"""
+
+    def __init__(self, host, port, online=False, motd='', players_online=0, players_max=0,
+                 version='', protocol=None, latency_ms=None, error=None):
+        self.host = host
+        self.port = port
+        self.online = online
+        self.motd = motd
+        self.players_online = players_online
+        self.players_max = players_max
+        self.version = version
+        self.protocol = protocol
+        self.latency_ms = latency_ms
+        self.error = error
+
+    @classmethod
+    def from_response(cls, host, port, data, latency_ms):
+        players = data.get('players', {})
+        version = data.get('version', {})
+        return cls(
+            host, port,
+            online=True,
+            motd=flatten_motd(data.get('description', '')).strip(),
+            players_online=int(players.get('online', 0)),
+            players_max=int(players.get('max', 0)),
+            version=version.get('name', ''),
+            protocol=version.get('protocol'),
+            latency_ms=latency_ms
+        )
+
+    def __repr__(self):
+        if not self.online:
+            return f"ServerStatus({self.host}:{self.port}, offline, error={self.error!r})"
+        return (f"ServerStatus({self.host}:{self.port}, {self.players_online}/{self.players_max}, "
+                f"{self.latency_ms:.1f}ms)")
+
+
+async def _query(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        handshake = (
+            encode_varint(HANDSHAKE_PROTOCOL)
+            + encode_string(host)
+            + struct.pack('>H', port)
+            + encode_varint(STATE_STATUS)
+        )
+        writer.write(make_packet(0x00, handshake) + make_packet(0x00))
+        await writer.drain()
+
+        packet_id, payload = await read_packet(reader)
+        if packet_id != 0x00:
+            raise ValueError(f"非預期的封包 ID：{packet_id}")
+        length, offset = decode_varint(payload)
+        data = json.loads(payload[offset:offset + length].decode('utf-8'))
+
+        # Ping/Pong 量測延遲
+        token = int(time.time() * 1000) & 0x7FFFFFFFFFFFFFFF
+        start = time.perf_counter()
+        writer.write(make_packet(0x01, struct.pack('>q', token)))
+        await writer.drain()
+        packet_id, payload = await read_packet(reader)
+        latency_ms = (time.perf_counter() - start) * 1000
+        if packet_id != 0x01 or struct.unpack('>q', payload[:8])[0] != token:
+            raise ValueError("Pong 內容不符")
+        return data, latency_ms
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+async def query_status(host, port, timeout=DEFAULT_TIMEOUT):
+    """查詢單一伺服器狀態，失敗時回傳 online=False 而非拋出例外"""
+    try:
+        data, latency_ms = await asyncio.wait_for(_query(host, port), timeout)
+        return ServerStatus.from_response(host, port, data, latency_ms)
+    except asyncio.TimeoutError:
+        return ServerStatus(host, port, error='逾時')
+    except (OSError, ValueError, asyncio.IncompleteReadError, json.JSONDecodeError) as e:
+        return ServerStatus(host, port, error=str(e) or type(e).__name__)
+
+
+async def query_many(ports, host=DEFAULT_HOST, timeout=DEFAULT_TIMEOUT):
+    """平行查詢多個端口，每個查詢各自計時；回傳 {端口: ServerStatus}"""
+    ports = list(dict.fromkeys(ports))
+    results = await asyncio.gather(*(query_status(host, port, timeout) for port in ports))
+    return dict(zip(ports, results))
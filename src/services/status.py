@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from src.services.lifecycle import BackgroundService
+from src.services.registry import get_registry
+from src.services.slp import DEFAULT_HOST, DEFAULT_TIMEOUT, query_many, query_status
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 300
+DEFAULT_COOLDOWN = 30
+
+# !list 顯示的伺服器狀態
+RUNNING = 'running'
+STARTING = 'starting'
+SLEEPING = 'sleeping'
+STOPPED = 'stopped'
+
+
+class StatusSnapshot:
+    """某一時間點所有伺服器的狀態"""
+
+    def __init__(self, statuses, taken_at=None, duration=0.0):
+        self.statuses = dict(statuses)
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self.duration = duration
+
+    @property
+    def age(self):
+        return time.time() - self.taken_at
+
+    def get(self, port):
+        return self.statuses.get(port)
+
+    def covers(self, ports):
+        return all(port in self.statuses for port in ports)
+
+
+def server_state(info, snapshot, supervisor=None, sleeping_ports=()):
+    """
+    依 SLP 快照判斷伺服器狀態，回傳 (狀態, SLP 結果或 None)
+
+    休眠監聽 (idle) 也會回應狀態查詢，sleeping_ports 中端口的查詢結果不代表伺服器在運行。
+    """
+    if info.port in sleeping_ports:
+        return SLEEPING, None
+    slp = snapshot.get(info.port)
+    if slp is not None and slp.online:
+        return RUNNING, slp
+    if supervisor is not None and supervisor.is_running(info.name):
+        return STARTING, None
+    return STOPPED, None
+
+
+class StatusCollector(BackgroundService):
+    """
+    背景狀態收集器
+
+    每 interval 秒以 SLP 查詢所有已註冊端口並更新共用快照，!list 直接讀取快照。
+    同時間的多個刷新請求共用同一次查詢 (single-flight)。
+    """
+
+    def __init__(self, registry, host=DEFAULT_HOST, interval=DEFAULT_INTERVAL,
+                 cooldown=DEFAULT_COOLDOWN, timeout=DEFAULT_TIMEOUT):
+        self.registry = registry
+        self.host = host
+        self.interval = interval
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self.snapshot = None
+        self.probe_count = 0
+        self._inflight = None
+        self._last_forced = 0.0
+
+    async def _collect(self):
+        await self.registry.ensure_fresh()
+        ports = [info.port for info in self.registry]
+        start = time.perf_counter()
+        statuses = await query_many(ports, host=self.host, timeout=self.timeout)
+        self.probe_count += 1
+        self.snapshot = StatusSnapshot(statuses, duration=time.perf_counter() - start)
+        return self.snapshot
+
+    async def refresh(self):
+        """刷新快照；已有進行中的查詢時直接等待該次結果"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._collect())
+        # shield：個別呼叫者被取消時不影響其他等待同一次查詢的人
+        return await asyncio.shield(self._inflight)
+
+    async def get(self, ports=None):
+        """取得快照；尚無快照、已過期或缺少指定端口時才刷新"""
+        snapshot = self.snapshot
+        if (snapshot is None or snapshot.age > self.interval
+                or (ports is not None and not snapshot.covers(ports))):
+            snapshot = await self.refresh()
+        return snapshot
+
+    def cooldown_remaining(self):
+        return max(0.0, self._last_forced + self.cooldown - time.monotonic())
+
+    async def force_refresh(self):
+        """強制刷新 (受冷卻時間限制)；回傳 (快照, 剩餘冷卻秒數)"""
+        remaining = self.cooldown_remaining()
+        if remaining > 0:
+            return await self.get(), remaining
+        self._last_forced = time.monotonic()
+        return await self.refresh(), 0.0
+
+    async def refresh_port(self, port):
+        """只重新查詢單一端口並更新快照 (例如伺服器程序剛結束)"""
+        status = await query_status(self.host, port, self.timeout)
+        if self.snapshot is not None:
+            self.snapshot.statuses[port] = status
+        return status
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"狀態收集失敗：{e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+
+def get_status_collector(bot):
+    """取得 bot 共用的狀態收集器，不存在時依設定建立"""
+    collector = getattr(bot, 'status_collector', None)
+    if collector is None:
+        config = getattr(bot, 'config', {})
+        status_cfg = config.get('status', {})
+        collector = StatusCollector(
+            get_registry(bot),
+            host=config.get('server', {}).get('status_host') or DEFAULT_HOST,
+            interval=float(status_cfg.get('refresh_interval', DEFAULT_INTERVAL)),
+            cooldown=float(status_cfg.get('fresh_cooldown', DEFAULT_COOLDOWN)),
+            timeout=float(status_cfg.get('timeout', DEFAULT_TIMEOUT))
+        )
+        bot.status_collector = collector
+    return collector
@@ -0,0 +1,575 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+import psutil
+from src.services.console import BUFFER_LINES, ConsoleBuffer, pump_stream
+from src.services.server_store import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+IS_WINDOWS = sys.platform == 'win32'
+
+# 優雅關閉時送到主控台的指令
+STOP_COMMANDS = ('save-all flush', 'stop')
+
+# 優雅關閉各階段的等待秒數
+STOP_TIMEOUT = 60
+TERM_TIMEOUT = 15
+KILL_TIMEOUT = 5
+
+# 運行中伺服器的程序資訊，機器人重啟後據此接回仍在運行的伺服器
+STATE_FILE = 'assets/supervisor_state.json'
+# 比對程序建立時間的容許誤差 (系統時間校正會讓換算出的建立時間略有偏移)
+CREATE_TIME_TOLERANCE = 1.0
+# 接回的程序不是本程序的子程序，無法 wait()，改以輪詢偵測結束
+ADOPT_POLL_INTERVAL = 1.0
+
+
+def build_command(script_path, platform=sys.platform):
+    """依啟動腳本副檔名決定執行方式"""
+    path = Path(script_path)
+    suffix = path.suffix.lower()
+    if suffix in ('.bat', '.cmd'):
+        if platform != 'win32':
+            raise ValueError(f"無法在 {platform} 上執行批次檔：{path.name}")
+        return ['cmd.exe', '/c', str(path)]
+    if suffix == '.sh':
+        return ['/bin/sh', str(path)]
+    if suffix == '.jar':
+        return ['java', '-jar', str(path), 'nogui']
+    if suffix == '.py':
+        return [sys.executable, str(path)]
+    raise ValueError(f"不支援的啟動腳本類型：{path.name}")
+
+
+class LaunchSpec:
+    """啟動一個伺服器所需的資訊"""
+
+    def __init__(self, name, argv, cwd, port=None, version=None, env=None):
+        self.name = name
+        self.argv = list(argv)
+        self.cwd = str(cwd)
+        self.port = port
+        self.version = version
+        self.env = env
+
+    @classmethod
+    def from_server_info(cls, info, platform=sys.platform):
+        script = os.path.join(info.folder, info.script)
+        return cls(
+            name=info.name,
+            argv=build_command(script, platform),
+            cwd=info.folder,
+            port=info.port,
+            version=info.version
+        )
+
+    def __repr__(self):
+        return f"LaunchSpec(name={self.name!r}, argv={self.argv!r})"
+
+
+class ManagedProcess:
+    """由 supervisor 管理中的伺服器程序"""
+
+    def __init__(self, spec, proc, console_lines=BUFFER_LINES):
+        self.spec = spec
+        self.proc = proc
+        self.pid = proc.pid
+        self.started_at = time.time()
+        self.returncode = None
+        self.exited = asyncio.Event()
+        # 主控台輸出 (stdout / stderr) 的環狀緩衝區
+        self.console = ConsoleBuffer(console_lines)
+        self._pump_task = None
+        # 寫入狀態檔的程序識別資訊 (見 process_record)
+        self.record = None
+
+    # 是否連接主控台 (stdin / stdout)
+    has_console = True
+
+    @property
+    def name(self):
+        return self.spec.name
+
+    @property
+    def is_running(self):
+        return not self.exited.is_set()
+
+    @property
+    def uptime(self):
+        return time.time() - self.started_at
+
+    async def wait(self, timeout=None):
+        """等待程序結束，逾時回傳 None"""
+        try:
+            await asyncio.wait_for(self.exited.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.returncode
+
+    async def send_line(self, line):
+        """寫入一行到伺服器主控台 (stdin)"""
+        stdin = self.proc.stdin
+        if stdin is None or stdin.is_closing():
+            raise RuntimeError(f"{self.name} 的主控台輸入已關閉")
+        stdin.write((line.rstrip('\n') + '\n').encode('utf-8'))
+        await stdin.drain()
+
+    async def _wait_exit(self):
+        """等待程序結束，回傳結束代碼"""
+        return await self.proc.wait()
+
+    async def _pump_output(self):
+        """讀取 stdout 與 stderr 直到管線關閉 (包含仍持有管線的子孫程序)"""
+        streams = [(self.proc.stdout, 'stdout'), (self.proc.stderr, 'stderr')]
+        try:
+            await asyncio.gather(*(
+                pump_stream(stream, self.console, label)
+                for stream, label in streams if stream is not None
+            ))
+        except Exception as e:
+            logger.error(f"讀取 {self.name} 主控台輸出失敗：{e}", exc_info=True)
+        finally:
+            self.console.close()
+
+
+def _alive(proc):
+    """程序是否仍在運行 (已結束但尚未被回收的殭屍程序視為已結束)"""
+    try:
+        return proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+    except psutil.AccessDenied:
+        return True
+
+
+class AdoptedProcess(ManagedProcess):
+    """
+    機器人重啟前啟動、依狀態檔接回的伺服器程序
+
+    proc 為 psutil.Process；不是本程序的子程序，沒有 stdin / stdout 管線，
+    也無法取得結束代碼，結束時 returncode 為 None。
+    關閉時 send_line 失敗，會改用 RCON (graceful_stop) 或直接進入終止階段。
+    """
+
+    has_console = False
+
+    def __init__(self, spec, proc, record, console_lines=BUFFER_LINES,
+                 poll_interval=ADOPT_POLL_INTERVAL):
+        super().__init__(spec, proc, console_lines)
+        self.record = record
+        self.started_at = record.get('started_at') or proc.create_time()
+        self.poll_interval = poll_interval
+
+    async def send_line(self, line):
+        raise RuntimeError(f"{self.name} 於機器人重啟前啟動，主控台輸入無法使用")
+
+    async def _wait_exit(self):
+        while _alive(self.proc):
+            await asyncio.sleep(self.poll_interval)
+        return None
+
+
+def process_record(managed, proc=None):
+    """
+    建立狀態檔中的一筆記錄
+
+    PID 可能被重複使用，因此一併記錄建立時間與命令列，接回時三者都要對得上。
+    程序已結束時回傳 None。
+    """
+    try:
+        proc = proc or psutil.Process(managed.pid)
+        with proc.oneshot():
+            create_time = proc.create_time()
+            cmdline = proc.cmdline()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+    spec = managed.spec
+    return {
+        'name': spec.name,
+        'pid': managed.pid,
+        'create_time': create_time,
+        'cmdline': cmdline,
+        'cwd': spec.cwd,
+        'port': spec.port,
+        'version': spec.version,
+        'argv': spec.argv,
+        'started_at': managed.started_at,
+    }
+
+
+def read_state(path):
+    """讀取狀態檔中的記錄，檔案不存在或損毀時回傳空清單"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    except ValueError as e:
+        logger.warning(f"狀態檔 {path} 格式錯誤，略過：{e}")
+        return []
+    records = data.get('servers', []) if isinstance(data, dict) else []
+    return [
+        record for record in records
+        if isinstance(record, dict) and isinstance(record.get('pid'), int) and record.get('name')
+    ]
+
+
+def _same_process(record, proc, tolerance=CREATE_TIME_TOLERANCE):
+    """
+    proc 是否就是記錄中的程序
+
+    建立時間需在容許誤差內；命令列需相同，或工作目錄相同
+    (包裝殼以 exec 換成 Java 後命令列會改變，但工作目錄仍是伺服器資料夾)。
+    """
+    create_time = proc.info.get('create_time')
+    if create_time is None or abs(create_time - record.get('create_time', 0)) > tolerance:
+        return False
+    try:
+        with proc.oneshot():
+            if proc.cmdline() == record.get('cmdline'):
+                return True
+            return os.path.normcase(proc.cwd()) == os.path.normcase(record.get('cwd', ''))
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+
+def reconcile_state(records, tolerance=CREATE_TIME_TOLERANCE):
+    """
+    以一次程序列表比對所有記錄，回傳仍在運行的 [(記錄, psutil.Process), ...]
+
+    只對 PID 相符的程序再讀取命令列，不必逐筆查詢每個 PID。
+    """
+    wanted = {record['pid']: record for record in records}
+    matches = []
+    for proc in psutil.process_iter(['create_time']):
+        record = wanted.get(proc.pid)
+        if record is not None and _same_process(record, proc, tolerance) and _alive(proc):
+            matches.append((record, proc))
+    return matches
+
+
+class StopResult:
+    """關閉結果：stage 為實際使用的階段，duration 為耗時秒數"""
+
+    def __init__(self, stage, duration=0.0, method=None):
+        self.stage = stage
+        self.duration = duration
+        self.method = method
+
+    @property
+    def graceful(self):
+        return self.stage == 'stop'
+
+    def __repr__(self):
+        return f"StopResult({self.stage!r}, {self.duration:.2f}s, method={self.method!r})"
+
+
+def process_tree(pid):
+    """取得 pid 與其所有子孫程序 (psutil.Process 清單)"""
+    try:
+        parent = psutil.Process(pid)
+    except psutil.NoSuchProcess:
+        return []
+    try:
+        children = parent.children(recursive=True)
+    except psutil.Error:
+        children = []
+    return [parent] + children
+
+
+def find_listening_pid(port):
+    """
+    找出在指定 TCP 端口監聽的程序 (找不到或權限不足時回傳 None)
+
+    機器人自己 (例如休眠監聽) 佔用的端口不算，避免關閉時結束到機器人本身。
+    """
+    try:
+        connections = psutil.net_connections(kind='tcp')
+    except (psutil.AccessDenied, OSError):
+        return None
+    own_pid = os.getpid()
+    for conn in connections:
+        if conn.status == psutil.CONN_LISTEN and conn.laddr and conn.laddr.port == port \
+                and conn.pid and conn.pid != own_pid:
+            return conn.pid
+    return None
+
+
+def runs_in_folder(proc, folder):
+    """
+    程序是否屬於指定的伺服器資料夾：工作目錄或命令列中的絕對路徑位於資料夾內
+    無法讀取 (權限不足或已結束) 時回傳 False
+    """
+    root = os.path.normcase(os.path.abspath(folder))
+
+    def inside(path):
+        path = os.path.normcase(os.path.abspath(path))
+        return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+    try:
+        with proc.oneshot():
+            if inside(proc.cwd()):
+                return True
+            return any(inside(arg) for arg in proc.cmdline() if os.path.isabs(arg))
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+
+def _signal_all(procs, kill):
+    for proc in procs:
+        try:
+            proc.kill() if kill else proc.terminate()
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.AccessDenied as e:
+            logger.warning(f"無權限結束程序 {proc.pid}：{e}")
+
+
+async def _wait_all(procs, timeout, managed=None):
+    """
+    等待程序全部結束，回傳仍存活的程序
+    直接子程序交由 asyncio 的 wait() 回收，其餘以 psutil 輪詢，避免搶先回收子程序
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    leader = [p for p in procs if managed is not None and p.pid == managed.pid]
+    others = [p for p in procs if p not in leader]
+
+    if leader:
+        await managed.wait(timeout)
+    alive = []
+    if others:
+        remaining = max(0.0, deadline - loop.time())
+        _, alive = await asyncio.to_thread(psutil.wait_procs, others, remaining)
+    if leader and managed.is_running:
+        alive = leader + alive
+    return alive
+
+
+async def escalate_stop(procs, request_stop=None, managed=None, stop_timeout=STOP_TIMEOUT,
+                        term_timeout=TERM_TIMEOUT, kill_timeout=KILL_TIMEOUT, method=None):
+    """
+    依序嘗試：request_stop (stop 指令) → terminate 整個程序樹 → kill
+    procs 應在送出 stop 前取得，包裝殼 (cmd.exe / sh) 先結束時仍能追蹤到 Java 子程序
+    """
+    start = time.perf_counter()
+
+    def result(stage):
+        return StopResult(stage, time.perf_counter() - start, method)
+
+    alive = list(procs)
+    if request_stop is not None:
+        try:
+            await request_stop()
+            alive = await _wait_all(alive, stop_timeout, managed)
+            if not alive:
+                return result('stop')
+            logger.warning(f"{len(alive)} 個程序未在 {stop_timeout} 秒內關閉，送出終止訊號")
+        except Exception as e:
+            logger.warning(f"無法送出關閉指令：{e}")
+
+    await asyncio.to_thread(_signal_all, alive, False)
+    alive = await _wait_all(alive, term_timeout, managed)
+    if not alive:
+        return result('term')
+
+    logger.warning(f"{len(alive)} 個程序未回應終止訊號，強制結束")
+    await asyncio.to_thread(_signal_all, alive, True)
+    await _wait_all(alive, kill_timeout, managed)
+    return result('kill')
+
+
+class ProcessSupervisor:
+    """
+    非同步伺服器程序管理
+
+    以 asyncio.create_subprocess_exec 啟動伺服器，
+    每個程序都有一個等待 wait() 的監看任務，結束時立即通知。
+    stdout / stderr 經由管線持續讀入每個程序的主控台緩衝區。
+
+    指定 state_path 時，每次啟動與結束都會把運行中的程序寫入狀態檔；
+    機器人重啟後呼叫 adopt() 接回仍在運行的伺服器。
+    """
+
+    def __init__(self, console_lines=BUFFER_LINES, state_path=None,
+                 adopt_poll_interval=ADOPT_POLL_INTERVAL):
+        self.console_lines = console_lines
+        self.state_path = state_path
+        self.adopt_poll_interval = adopt_poll_interval
+        self._processes = {}
+        self._watchers = {}
+        self._exit_listeners = []
+        self._state_lock = None
+
+    def add_exit_listener(self, callback):
+        """註冊程序結束時的回呼 (可為協程函式)"""
+        self._exit_listeners.append(callback)
+
+    def remove_exit_listener(self, callback):
+        if callback in self._exit_listeners:
+            self._exit_listeners.remove(callback)
+
+    def get(self, name):
+        return self._processes.get(name)
+
+    def is_running(self, name):
+        managed = self._processes.get(name)
+        return managed is not None and managed.is_running
+
+    def running(self):
+        """回傳目前運行中的程序 {名稱: ManagedProcess}"""
+        return {name: m for name, m in self._processes.items() if m.is_running}
+
+    async def _save_state(self):
+        """將運行中的程序寫入狀態檔 (失敗只記錄警告，不影響程序管理)"""
+        if self.state_path is None:
+            return
+        if self._state_lock is None:
+            self._state_lock = asyncio.Lock()
+        async with self._state_lock:
+            records = [m.record for m in self.running().values() if m.record is not None]
+            try:
+                await asyncio.to_thread(atomic_write_json, self.state_path, {'servers': records})
+            except OSError as e:
+                logger.warning(f"寫入程序狀態檔失敗：{e}")
+
+    async def adopt(self):
+        """
+        依狀態檔接回機器人重啟前啟動、仍在運行的伺服器，回傳接回的程序清單
+
+        已結束或 PID 已被其他程序重複使用的記錄會從狀態檔移除。
+        """
+        if self.state_path is None:
+            return []
+        records = [
+            record for record in await asyncio.to_thread(read_state, self.state_path)
+            if not self.is_running(record['name'])
+        ]
+        matches = await asyncio.to_thread(reconcile_state, records) if records else []
+        adopted = []
+        for record, proc in matches:
+            spec = LaunchSpec(
+                name=record['name'],
+                argv=record.get('argv') or record.get('cmdline') or [],
+                cwd=record.get('cwd', ''),
+                port=record.get('port'),
+                version=record.get('version')
+            )
+            managed = AdoptedProcess(spec, proc, record, self.console_lines, self.adopt_poll_interval)
+            self._processes[spec.name] = managed
+            self._watchers[spec.name] = asyncio.create_task(self._watch(managed))
+            adopted.append(managed)
+            logger.info(f"已接回運行中的伺服器 {spec.name} (PID {managed.pid})")
+        stale = len(records) - len(adopted)
+        if stale:
+            logger.info(f"狀態檔中有 {stale} 個伺服器已不在運行")
+        await self._save_state()
+        return adopted
+
+    async def start(self, spec):
+        """啟動伺服器程序並開始監看"""
+        if self.is_running(spec.name):
+            raise RuntimeError(f"{spec.name} 已在運行中")
+
+        kwargs = {}
+        if IS_WINDOWS:
+            # 輸出改由管線讀取，不再開啟獨立主控台視窗；新的程序群組以便送出 CTRL_BREAK
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            # 新的 session 即新的程序群組，關閉時可一併處理子程序
+            kwargs['start_new_session'] = True
+
+        proc = await asyncio.create_subprocess_exec(
+            *spec.argv,
+            cwd=spec.cwd,
+            env=spec.env,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **kwargs
+        )
+        managed = ManagedProcess(spec, proc, self.console_lines)
+        # 一定要持續讀取管線，否則緩衝區滿了會讓伺服器寫入時卡住
+        managed._pump_task = asyncio.create_task(managed._pump_output())
+        self._processes[spec.name] = managed
+        self._watchers[spec.name] = asyncio.create_task(self._watch(managed))
+        logger.info(f"伺服器 {spec.name} 已啟動 (PID {proc.pid})")
+        if self.state_path is not None:
+            managed.record = await asyncio.to_thread(process_record, managed)
+            await self._save_state()
+        return managed
+
+    async def _watch(self, managed):
+        """等待程序結束並通知所有監聽者"""
+        try:
+            managed.returncode = await managed._wait_exit()
+        finally:
+            managed.exited.set()
+            if self._watchers.get(managed.name) is asyncio.current_task():
+                del self._watchers[managed.name]
+        await self._save_state()
+
+        logger.info(f"伺服器 {managed.name} 已停止 (結束代碼 {managed.returncode})")
+        for callback in list(self._exit_listeners):
+            try:
+                result = callback(managed)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"程序結束回呼錯誤：{e}", exc_info=True)
+
+    async def stop(self, name, commands=STOP_COMMANDS, request_stop=None, **timeouts):
+        """
+        優雅關閉伺服器：透過 stdin 送出 save-all flush 與 stop → terminate 程序樹 → kill
+        request_stop 可取代預設的 stdin 指令 (例如改用 RCON)
+        """
+        managed = self._processes.get(name)
+        if managed is None or not managed.is_running:
+            return StopResult('not_running')
+
+        procs = await asyncio.to_thread(process_tree, managed.pid)
+
+        async def send_commands():
+            for command in commands:
+                await managed.send_line(command)
+
+        return await escalate_stop(
+            procs,
+            request_stop or send_commands,
+            managed=managed,
+            method='stdin' if request_stop is None else None,
+            **timeouts
+        )
+
+    async def restart(self, name, stop=None, **timeouts):
+        """
+        以快取的啟動資訊重新啟動伺服器，回傳 (StopResult, ManagedProcess)
+        stop 可取代預設的 self.stop (例如 shutdown.server_stopper，會改用 RCON)
+        """
+        managed = self._processes.get(name)
+        if managed is None:
+            raise KeyError(name)
+        result = await (stop or self.stop)(name, **timeouts)
+        return result, await self.start(managed.spec)
+
+    async def shutdown(self, **timeouts):
+        """關閉所有運行中的伺服器"""
+        names = list(self.running())
+        if names:
+            await asyncio.gather(*(self.stop(name, **timeouts) for name in names))
+
+
+def get_supervisor(bot):
+    """取得 bot 共用的程序管理器，不存在時建立"""
+    supervisor = getattr(bot, 'supervisor', None)
+    if supervisor is None:
+        supervisor = ProcessSupervisor()
+        bot.supervisor = supervisor
+    return supervisor
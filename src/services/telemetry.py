@@ -0,0 +1,175 @@
+import asyncio
+import collections
+import logging
+import time
+from typing import NamedTuple
+import psutil
+from src.services.lifecycle import BackgroundService
+from src.services.supervisor import IS_WINDOWS, get_supervisor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 5.0
+# 預設保留 720 筆 (每 5 秒一筆，約 1 小時)
+DEFAULT_HISTORY = 720
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class Sample(NamedTuple):
+    """某一時間點整個程序樹的資源用量"""
+    time: float
+    cpu_percent: float
+    rss: int
+    threads: int
+    handles: int
+    read_bytes: int
+    write_bytes: int
+    processes: int
+
+
+def sparkline(values, width=None):
+    """將數值畫成一行迷你圖；width 指定時先平均取樣到該寬度"""
+    values = list(values)
+    if not values:
+        return ''
+    if width is not None and len(values) > width:
+        step = len(values) / width
+        values = [
+            sum(chunk) / len(chunk)
+            for chunk in (values[int(i * step):int((i + 1) * step)] for i in range(width))
+        ]
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    return ''.join(SPARK_CHARS[int((v - low) / span * (len(SPARK_CHARS) - 1))] for v in values)
+
+
+class ProcessTreeTracker:
+    """
+    追蹤一個伺服器的程序樹
+
+    保留 psutil.Process 物件，cpu_percent() 才能以上次呼叫為基準計算；
+    每次取樣時重新列出子程序，包裝殼啟動的 Java 子程序也會被納入。
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._procs = {}
+
+    def sample(self):
+        """取樣一次，程序已不存在時回傳 None"""
+        try:
+            root = self._procs.get(self.pid) or psutil.Process(self.pid)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+        try:
+            tree = [root] + root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return None
+        except psutil.AccessDenied:
+            tree = [root]
+
+        procs = {}
+        cpu = 0.0
+        rss = threads = handles = read_bytes = write_bytes = 0
+        for proc in tree:
+            proc = self._procs.get(proc.pid, proc)
+            try:
+                with proc.oneshot():
+                    cpu += proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                    threads += proc.num_threads()
+                    handles += proc.num_handles() if IS_WINDOWS else proc.num_fds()
+                    try:
+                        io = proc.io_counters()
+                        read_bytes += io.read_bytes
+                        write_bytes += io.write_bytes
+                    except (AttributeError, psutil.AccessDenied):
+                        pass
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            except psutil.AccessDenied:
+                pass
+            procs[proc.pid] = proc
+        self._procs = procs
+        return Sample(time.time(), cpu, rss, threads, handles, read_bytes, write_bytes, len(procs))
+
+
+class TelemetrySampler(BackgroundService):
+    """
+    定時取樣所有受管理伺服器的資源用量
+
+    每個週期只在一個工作執行緒中批次取樣全部伺服器，
+    每個伺服器的歷史以固定長度的 deque 保存。
+    """
+
+    def __init__(self, supervisor, interval=DEFAULT_INTERVAL, history=DEFAULT_HISTORY):
+        self.supervisor = supervisor
+        self.interval = interval
+        self.history_size = history
+        self._trackers = {}
+        self._history = {}
+
+    def history(self, name):
+        return list(self._history.get(name, ()))
+
+    def latest(self, name):
+        samples = self._history.get(name)
+        return samples[-1] if samples else None
+
+    def _sample_all(self, targets):
+        """批次取樣 (在執行緒中執行)；targets 為 [(名稱, pid)]"""
+        results = []
+        for name, pid in targets:
+            tracker = self._trackers.get(name)
+            if tracker is None or tracker.pid != pid:
+                tracker = ProcessTreeTracker(pid)
+                self._trackers[name] = tracker
+            try:
+                results.append((name, pid, tracker.sample()))
+            except psutil.Error as e:
+                logger.warning(f"取樣 {name} 失敗：{e}")
+        return results
+
+    async def sample(self):
+        """取樣一次所有運行中的伺服器"""
+        running = self.supervisor.running()
+        for name in list(self._trackers):
+            if name not in running:
+                del self._trackers[name]
+
+        targets = [(name, managed.pid) for name, managed in running.items()]
+        fresh = {name for name, pid in targets
+                 if name not in self._trackers or self._trackers[name].pid != pid}
+        results = await asyncio.to_thread(self._sample_all, targets)
+        for name, pid, sample in results:
+            if name in fresh:
+                # 新的程序：重新開始記錄
+                self._history[name] = collections.deque(maxlen=self.history_size)
+            if sample is not None:
+                self._history[name].append(sample)
+        return len(results)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sample()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"資源取樣失敗：{e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+
+def get_telemetry(bot):
+    """取得 bot 共用的資源取樣器，不存在時依設定建立"""
+    sampler = getattr(bot, 'telemetry', None)
+    if sampler is None:
+        telemetry_cfg = getattr(bot, 'config', {}).get('telemetry', {})
+        sampler = TelemetrySampler(
+            get_supervisor(bot),
+            interval=float(telemetry_cfg.get('interval', DEFAULT_INTERVAL)),
+            history=int(telemetry_cfg.get('history', DEFAULT_HISTORY))
+        )
+        bot.telemetry = sampler
+    return sampler
@@ -0,0 +1,281 @@
+import asyncio
+import collections
+import inspect
+import logging
+import re
+import time
+from src.services.lifecycle import BackgroundService
+from src.services.rcon import RconError, get_rcon_pool
+from src.services.registry import get_registry
+from src.services.slp import FORMAT_CODES
+from src.services.supervisor import get_supervisor
+
+logger = logging.getLogger(__name__)
+
+TARGET_TPS = 20.0
+DEFAULT_INTERVAL = 30
+DEFAULT_WINDOW = 300
+# 低於 alert_below 發出警告，回升到 recover_above 以上才解除 (遲滯，避免反覆通知)
+ALERT_BELOW = 15.0
+RECOVER_ABOVE = 18.0
+# 所有探測指令都不支援時，隔多久再重試
+UNSUPPORTED_RETRY = 1800
+# RCON 無法連線 (未啟用或尚在啟動) 時，隔多久再重試
+RCON_RETRY = 300
+
+
+def _first_number(text):
+    return float(text.lstrip('*'))
+
+
+def parse_paper_tps(text):
+    """Paper / Spigot：TPS from last 1m, 5m, 15m: 20.0, 19.8, 19.9"""
+    match = re.search(r"TPS from last 1m, 5m, 15m: ([*\d.]+)", text)
+    return (_first_number(match.group(1)), None) if match else None
+
+
+def parse_spark_tps(text):
+    """spark：TPS from last 5s, 10s, 1m, 5m, 15m: 20.0, ...；可能附帶 MSPT"""
+    match = re.search(r"TPS from last 5s, 10s, 1m, 5m, 15m:\s*([*\d.]+)", text)
+    if not match:
+        return None
+    mspt = re.search(r"Tick durations.*?:\s*[\d.]+/([\d.]+)", text, re.S)
+    return _first_number(match.group(1)), float(mspt.group(1)) if mspt else None
+
+
+def parse_forge_tps(text):
+    """Forge / NeoForge：Overall: Mean tick time: 12.345 ms. Mean TPS: 20.000"""
+    match = re.search(r"Overall\s*:\s*Mean tick time: ([\d.]+) ms\. Mean TPS: ([\d.]+)", text)
+    return (float(match.group(2)), float(match.group(1))) if match else None
+
+
+def parse_tick_query(text):
+    """原版 1.20.3+：Average time per tick: 3.2ms (Target: 50.0ms)"""
+    match = re.search(r"Average time per tick: ([\d.]+)\s*ms", text)
+    if not match:
+        return None
+    mspt = float(match.group(1))
+    target = re.search(r"Target tick rate: ([\d.]+)", text)
+    target_tps = float(target.group(1)) if target else TARGET_TPS
+    return min(target_tps, 1000.0 / mspt) if mspt > 0 else target_tps, mspt
+
+
+# 依序嘗試的 RCON 指令與解析函式；第一個成功的會被記住
+PROBES = (
+    ('tps', parse_paper_tps),
+    ('spark tps', parse_spark_tps),
+    ('forge tps', parse_forge_tps),
+    ('neoforge tps', parse_forge_tps),
+    ('tick query', parse_tick_query),
+)
+
+
+class RollingWindow:
+    """保留最近 seconds 秒內的 (時間, 數值)"""
+
+    def __init__(self, seconds=DEFAULT_WINDOW):
+        self.seconds = seconds
+        self._items = collections.deque()
+
+    def _expire(self, now):
+        while self._items and self._items[0][0] < now - self.seconds:
+            self._items.popleft()
+
+    def add(self, value, now=None):
+        now = time.time() if now is None else now
+        self._items.append((now, value))
+        self._expire(now)
+
+    def values(self, now=None):
+        self._expire(time.time() if now is None else now)
+        return [value for _, value in self._items]
+
+    def mean(self, now=None):
+        values = self.values(now)
+        return sum(values) / len(values) if values else None
+
+    def total(self, now=None):
+        return sum(self.values(now))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ServerTps:
+    """單一伺服器的 TPS 狀態"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.tps = RollingWindow(window)
+        self.mspt = RollingWindow(window)
+        # 記錄檔中 Can't keep up! 回報的落後 tick 數
+        self.lag_ticks = RollingWindow(window)
+        self.lag_seen = False
+        self.probe = None
+        self.unsupported_until = 0.0
+        self.alerting = False
+        # 最近一次評估的伺服器資訊，停止監控時用來通知解除警告
+        self.info = None
+
+    def log_estimate(self, now=None):
+        """以視窗內記錄檔回報的落後 tick 數估算 TPS；從未出現落後時回傳 None"""
+        if not self.lag_seen:
+            return None
+        skipped = self.lag_ticks.total(now)
+        return max(0.0, TARGET_TPS * (1 - skipped / (TARGET_TPS * self.lag_ticks.seconds)))
+
+    def estimated_tps(self, now=None):
+        """目前的 TPS：取最近一次 RCON 數值與記錄檔估算中較低者"""
+        values = self.tps.values(now)
+        candidates = [values[-1]] if values else []
+        estimate = self.log_estimate(now)
+        if estimate is not None:
+            candidates.append(estimate)
+        return min(candidates) if candidates else None
+
+
+class TpsMonitor(BackgroundService):
+    """
+    TPS / tick 延遲監控
+
+    資料來源：記錄檔的 Can't keep up! 事件 (LogWatcher)，以及定期的 RCON 探測。
+    低於門檻時通知一次，回升到恢復門檻以上才解除，避免在門檻附近反覆通知。
+    """
+
+    def __init__(self, supervisor, registry, rcon_pool, interval=DEFAULT_INTERVAL,
+                 window=DEFAULT_WINDOW, alert_below=ALERT_BELOW, recover_above=RECOVER_ABOVE):
+        self.supervisor = supervisor
+        self.registry = registry
+        self.rcon_pool = rcon_pool
+        self.interval = interval
+        self.window = window
+        self.alert_below = alert_below
+        self.recover_above = recover_above
+        self.servers = {}
+        self._alert_listeners = []
+
+    def add_alert_listener(self, callback):
+        """
+        註冊警告回呼 callback(info, state, recovered) (可為協程函式)
+        recovered 為 False (低於門檻)、True (已恢復) 或 None (警告中停止監控，例如伺服器已停止)
+        """
+        self._alert_listeners.append(callback)
+
+    def remove_alert_listener(self, callback):
+        if callback in self._alert_listeners:
+            self._alert_listeners.remove(callback)
+
+    def state(self, name):
+        state = self.servers.get(name)
+        if state is None:
+            state = ServerTps(self.window)
+            self.servers[name] = state
+        return state
+
+    async def forget(self, name):
+        """伺服器停止或不再監控時清除狀態；仍在警告中時先通知解除，警告不會沒有下文"""
+        state = self.servers.pop(name, None)
+        if state is not None and state.alerting and state.info is not None:
+            state.alerting = False
+            await self._notify(state.info, state, None)
+
+    async def on_log_event(self, info, event):
+        """LogWatcher 的 lag 事件回呼"""
+        if event.kind != 'lag':
+            return
+        state = self.state(info.name)
+        state.lag_seen = True
+        state.lag_ticks.add(int(event.data['ticks']))
+        await self.evaluate(info, state)
+
+    async def probe(self, info):
+        """以 RCON 查詢一次 TPS；伺服器不支援時回傳 None"""
+        state = self.state(info.name)
+        if time.time() < state.unsupported_until:
+            return None
+        probes = [p for p in PROBES if p[0] == state.probe] if state.probe else PROBES
+        for command, parser in probes:
+            try:
+                response = await self.rcon_pool.command(info, command)
+            except RconError as e:
+                logger.debug(f"{info.name} RCON 探測失敗：{e}")
+                state.unsupported_until = time.time() + RCON_RETRY
+                return None
+            parsed = parser(FORMAT_CODES.sub('', response))
+            if parsed is not None:
+                state.probe = command
+                tps, mspt = parsed
+                state.tps.add(tps)
+                if mspt is not None:
+                    state.mspt.add(mspt)
+                return tps
+        state.probe = None
+        state.unsupported_until = time.time() + UNSUPPORTED_RETRY
+        return None
+
+    async def evaluate(self, info, state):
+        """依目前 TPS 更新警告狀態 (遲滯)"""
+        state.info = info
+        tps = state.estimated_tps()
+        if tps is None:
+            return
+        if not state.alerting and tps < self.alert_below:
+            state.alerting = True
+            await self._notify(info, state, False)
+        elif state.alerting and tps >= self.recover_above:
+            state.alerting = False
+            await self._notify(info, state, True)
+
+    async def _notify(self, info, state, recovered):
+        for callback in list(self._alert_listeners):
+            try:
+                result = callback(info, state, recovered)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"TPS 警告回呼錯誤：{e}", exc_info=True)
+
+    async def poll(self):
+        """探測所有運行中的伺服器"""
+        await self.registry.ensure_fresh()
+        running = self.supervisor.running()
+        for name, state in list(self.servers.items()):
+            if name in running:
+                continue
+            # 非本機器人啟動的伺服器只靠記錄檔：依目前視窗評估 (落後記錄過期即為恢復)，
+            # 視窗內沒有資料時才清除
+            if state.info is not None:
+                await self.evaluate(state.info, state)
+            if not state.lag_ticks.values():
+                await self.forget(name)
+        infos = [info for info in self.registry if info.name in running]
+        await asyncio.gather(*(self.probe(info) for info in infos))
+        for info in infos:
+            await self.evaluate(info, self.state(info.name))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"TPS 探測失敗：{e}", exc_info=True)
+
+
+def get_tps_monitor(bot):
+    """取得 bot 共用的 TPS 監控，不存在時依設定建立"""
+    monitor = getattr(bot, 'tps_monitor', None)
+    if monitor is None:
+        tps_cfg = getattr(bot, 'config', {}).get('tps', {})
+        monitor = TpsMonitor(
+            get_supervisor(bot),
+            get_registry(bot),
+            get_rcon_pool(bot),
+            interval=float(tps_cfg.get('probe_interval', DEFAULT_INTERVAL)),
+            window=float(tps_cfg.get('window', DEFAULT_WINDOW)),
+            alert_below=float(tps_cfg.get('alert_below', ALERT_BELOW)),
+            recover_above=float(tps_cfg.get('recover_above', RECOVER_ABOVE))
+        )
+        bot.tps_monitor = monitor
+    return monitor
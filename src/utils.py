@@ -3,6 +3,7 @@ import json
 from dotenv import load_dotenv
 import logging
 from pathlib import Path
+from src.services.registry import get_registry
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,33 @@ def get_nested_value(data, keys):
     return current
 
 
+def format_bytes(value):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}" if unit != 'B' else f"{value:.0f} B"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+async def resolve_server(bot, ctx, text):
+    """將使用者輸入的「名稱」或「名稱_版本」解析為單一伺服器，失敗時回覆錯誤並回傳 None"""
+    registry = get_registry(bot)
+    await registry.ensure_fresh()
+    result = registry.index.resolve(text)
+    if result.unique is not None:
+        return result.unique
+    if result.matches:
+        await ctx.send("❌ 找到多個匹配伺服器，請明確指定：\n" + "\n".join(
+            f"• {info.name}_{info.version}" for info in result.matches[:10]
+        ))
+    else:
+        message = "❌ 找不到符合的伺服器"
+        if result.suggestions:
+            message += "\n💡 你是不是要找：\n" + "\n".join(f"• {s}" for s in result.suggestions)
+        await ctx.send(message)
+    return None
+
+
 def load_config():
     """載入設定檔，優先使用環境變數"""
     load_dotenv()
@@ -57,12 +85,77 @@ def load_config():
                 "username": os.getenv("ALIST_USERNAME", 
                                     file_config.get("network", {}).get("alist", {}).get("username", "")),
                 "password": os.getenv("ALIST_PASSWORD", 
-                                    file_config.get("network", {}).get("alist", {}).get("password", ""))
+                                    file_config.get("network", {}).get("alist", {}).get("password", "")),
+                # 上傳備份用的 API 位址 (例如同機的 http://127.0.0.1:5244)，未設定時使用 url 與 http_port
+                "api_url": os.getenv("ALIST_API_URL", 
+                                   file_config.get("network", {}).get("alist", {}).get("api_url", ""))
             }
         },
         "server": {
             "base_path": os.getenv("SERVER_BASE_PATH", 
-                                 file_config.get("server", {}).get("base_path", ""))
+                                 file_config.get("server", {}).get("base_path", "")),
+            "status_host": os.getenv("SERVER_STATUS_HOST", 
+                                   file_config.get("server", {}).get("status_host", "127.0.0.1")),
+            # 自動偵測 base_path 底下伺服器資料夾的間隔 (秒，0 為只在啟動時掃描一次) 與深度
+            "discovery_interval": float(os.getenv("SERVER_DISCOVERY_INTERVAL", 
+                                                file_config.get("server", {}).get("discovery_interval", 300))),
+            "discovery_depth": int(file_config.get("server", {}).get("discovery_depth", 4)),
+            # 資料夾名稱可接受的版本格式：release (1.21.4)、prerelease (1.21.4-pre1)、snapshot (24w14a) 或正規表示式
+            "versions": file_config.get("server", {}).get("versions", ["release", "prerelease", "snapshot"])
+        },
+        "status": {
+            "refresh_interval": int(os.getenv("STATUS_REFRESH_INTERVAL", 
+                                            file_config.get("status", {}).get("refresh_interval", 300))),
+            "fresh_cooldown": int(file_config.get("status", {}).get("fresh_cooldown", 30)),
+            "timeout": float(file_config.get("status", {}).get("timeout", 3))
+        },
+        "telemetry": {
+            "interval": float(os.getenv("TELEMETRY_INTERVAL", 
+                                      file_config.get("telemetry", {}).get("interval", 5))),
+            "history": int(file_config.get("telemetry", {}).get("history", 720))
+        },
+        "scheduler": {
+            "max_running": int(os.getenv("SCHEDULER_MAX_RUNNING", 
+                                       file_config.get("scheduler", {}).get("max_running", 0))),
+            "memory_budget_gb": float(os.getenv("SCHEDULER_MEMORY_BUDGET_GB", 
+                                              file_config.get("scheduler", {}).get("memory_budget_gb", 0))),
+            "default_heap_gb": float(file_config.get("scheduler", {}).get("default_heap_gb", 2)),
+            "idle_evict_minutes": float(file_config.get("scheduler", {}).get("idle_evict_minutes", 0))
+        },
+        "idle": {
+            "auto_stop_minutes": float(os.getenv("IDLE_AUTO_STOP_MINUTES", 
+                                               file_config.get("idle", {}).get("auto_stop_minutes", 0))),
+            "wake_on_join": str(os.getenv("IDLE_WAKE_ON_JOIN", 
+                                        file_config.get("idle", {}).get("wake_on_join", False))).lower() in ("1", "true", "yes"),
+            "listen_host": file_config.get("idle", {}).get("listen_host", ""),
+            "sleeping_motd": file_config.get("idle", {}).get("sleeping_motd", "")
+        },
+        "backup": {
+            "root": os.getenv("BACKUP_ROOT", file_config.get("backup", {}).get("root", "backups")),
+            "workers": int(file_config.get("backup", {}).get("workers", 0)),
+            "keep_last": int(file_config.get("backup", {}).get("keep_last", 10)),
+            "keep_daily": int(file_config.get("backup", {}).get("keep_daily", 7)),
+            "archive_root": os.getenv("ARCHIVE_ROOT", file_config.get("backup", {}).get("archive_root", "archives")),
+            "compress_level": int(file_config.get("backup", {}).get("compress_level", 6)),
+            "compress_workers": int(file_config.get("backup", {}).get("compress_workers", 0))
+        },
+        "tps": {
+            "alert_channel": int(os.getenv("TPS_ALERT_CHANNEL", 
+                                         file_config.get("tps", {}).get("alert_channel", 0)) or 0),
+            "probe_interval": float(file_config.get("tps", {}).get("probe_interval", 30)),
+            "window": float(file_config.get("tps", {}).get("window", 300)),
+            "alert_below": float(file_config.get("tps", {}).get("alert_below", 15)),
+            "recover_above": float(file_config.get("tps", {}).get("recover_above", 18))
+        },
+        "notifications": {
+            "sinks": [
+                s.strip() for s in os.getenv("NOTIFY_SINKS", "").split(",") if s.strip()
+            ] or file_config.get("notifications", {}).get("sinks", ["desktop"]),
+            "webhook_url": os.getenv("NOTIFY_WEBHOOK_URL", 
+                                   file_config.get("notifications", {}).get("webhook_url", "")),
+            "log_file": file_config.get("notifications", {}).get("log_file", "notifications.log"),
+            "coalesce_seconds": file_config.get("notifications", {}).get("coalesce_seconds", 2),
+            "rate_limit": file_config.get("notifications", {}).get("rate_limit", {"count": 5, "per": 60})
         },
         "command_colors": file_config.get("command_colors", {})
     }
@@ -0,0 +1,131 @@
+import base64
+import json
+import posixpath
+import time
+from urllib.parse import unquote
+from aiohttp import web
+
+
+def make_token(serial, lifetime):
+    """產生帶有 exp 的假 JWT"""
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+    return f"{encode({'alg': 'HS256'})}.{encode({'exp': time.time() + lifetime, 'n': serial})}.sig"
+
+
+class FakeAlistServer:
+    """本機模擬的 Alist API (登入、fs/list、fs/get、fs/mkdir、fs/put)，檔案存在記憶體中"""
+
+    def __init__(self, username="admin", password="secret", token_lifetime=3600):
+        self.username = username
+        self.password = password
+        self.token_lifetime = token_lifetime
+        self.files = {}
+        self.dirs = {'/'}
+        self.logins = 0
+        self.valid_tokens = set()
+        # 接下來的上傳要失敗幾次 (模擬連線中斷)
+        self.fail_puts = 0
+        self.puts = []
+        self.peer_ports = set()
+        self.runner = None
+        self.port = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_post('/api/auth/login', self.login)
+        app.router.add_post('/api/fs/list', self.fs_list)
+        app.router.add_post('/api/fs/get', self.fs_get)
+        app.router.add_post('/api/fs/mkdir', self.fs_mkdir)
+        app.router.add_put('/api/fs/put', self.fs_put)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def expire_tokens(self):
+        self.valid_tokens.clear()
+
+    @staticmethod
+    def reply(data=None, code=200, message="success"):
+        return web.json_response({'code': code, 'message': message, 'data': data})
+
+    def authorized(self, request):
+        self.peer_ports.add(request.transport.get_extra_info('peername')[1])
+        return request.headers.get('Authorization') in self.valid_tokens
+
+    async def login(self, request):
+        body = await request.json()
+        if body.get('username') != self.username or body.get('password') != self.password:
+            return self.reply(code=400, message="password is incorrect")
+        self.logins += 1
+        token = make_token(self.logins, self.token_lifetime)
+        self.valid_tokens.add(token)
+        return self.reply({'token': token})
+
+    async def fs_list(self, request):
+        if not self.authorized(request):
+            return self.reply(code=401, message="token is expired")
+        path = (await request.json())['path'].rstrip('/') or '/'
+        if path not in self.dirs:
+            return self.reply(code=500, message="object not found")
+        content = [
+            {'name': posixpath.basename(name), 'size': len(data), 'is_dir': False}
+            for name, data in self.files.items() if posixpath.dirname(name) == path
+        ] + [
+            {'name': posixpath.basename(name), 'size': 0, 'is_dir': True}
+            for name in self.dirs if name != '/' and posixpath.dirname(name) == path
+        ]
+        return self.reply({'content': content, 'total': len(content)})
+
+    async def fs_get(self, request):
+        if not self.authorized(request):
+            return self.reply(code=401, message="token is expired")
+        path = (await request.json())['path']
+        if path in self.files:
+            return self.reply({'name': posixpath.basename(path), 'size': len(self.files[path]), 'is_dir': False})
+        if path in self.dirs:
+            return self.reply({'name': posixpath.basename(path), 'size': 0, 'is_dir': True})
+        return self.reply(code=500, message="object not found")
+
+    async def fs_mkdir(self, request):
+        if not self.authorized(request):
+            return self.reply(code=401, message="token is expired")
+        path = (await request.json())['path'].rstrip('/')
+        while path and path != '/':
+            self.dirs.add(path)
+            path = posixpath.dirname(path)
+        return self.reply()
+
+    async def fs_put(self, request):
+        if not self.authorized(request):
+            await request.read()
+            return self.reply(code=401, message="token is expired")
+        path = unquote(request.headers['File-Path'])
+        if posixpath.dirname(path) not in self.dirs:
+            return self.reply(code=500, message="parent not found")
+        self.puts.append(path)
+        if self.fail_puts:
+            self.fail_puts -= 1
+            await request.content.read(1024)
+            return self.reply(code=500, message="upload interrupted")
+        data = await request.read()
+        if len(data) != int(request.headers['Content-Length']):
+            return self.reply(code=500, message="size mismatch")
+        self.files[path] = data
+        return self.reply()
@@ -0,0 +1,79 @@
+import asyncio
+import struct
+from src.services.rcon import TYPE_COMMAND, TYPE_LOGIN, TYPE_RESPONSE, encode_packet, read_packet
+
+FRAGMENT_SIZE = 4096
+
+
+class FakeRconServer:
+    """
+    本機模擬的 Minecraft RCON 伺服器，回應超過 4096 位元組時會拆成多個封包
+    delays 指定指令回應前的等待秒數 (例如大型世界的 save-all flush)
+    """
+
+    def __init__(self, password="secret", handlers=None, delays=None):
+        self.password = password
+        self.handlers = handlers or {}
+        self.delays = delays or {}
+        self.commands = []
+        self.connections = 0
+        self.server = None
+        self.port = None
+        self._writers = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        self.drop_connections()
+        await self.server.wait_closed()
+
+    def drop_connections(self):
+        """中斷所有連線 (模擬伺服器重啟)"""
+        for writer in list(self._writers):
+            writer.close()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def respond(self, command):
+        handler = self.handlers.get(command.split(' ', 1)[0])
+        if handler is None:
+            return f"Unknown command: {command}"
+        return handler(command) if callable(handler) else handler
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+        authed = False
+        try:
+            while True:
+                request_id, packet_type, payload = await read_packet(reader)
+                if packet_type == TYPE_LOGIN:
+                    authed = payload == self.password
+                    writer.write(encode_packet(request_id if authed else -1, TYPE_COMMAND, ''))
+                elif not authed:
+                    writer.write(encode_packet(-1, TYPE_COMMAND, ''))
+                elif packet_type == TYPE_COMMAND:
+                    self.commands.append(payload)
+                    await asyncio.sleep(self.delays.get(payload.split(' ', 1)[0], 0))
+                    body = self.respond(payload)
+                    chunks = [body[i:i + FRAGMENT_SIZE] for i in range(0, len(body), FRAGMENT_SIZE)] or ['']
+                    for chunk in chunks:
+                        writer.write(encode_packet(request_id, TYPE_RESPONSE, chunk))
+                        await writer.drain()
+                else:
+                    # 與原版伺服器相同：未知類型回覆 Unknown request
+                    writer.write(encode_packet(request_id, TYPE_RESPONSE, f"Unknown request {packet_type:x}"))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
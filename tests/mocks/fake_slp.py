@@ -0,0 +1,69 @@
+import asyncio
+import json
+import struct
+from src.services.slp import decode_varint, encode_string, make_packet, read_packet
+
+
+class FakeSLPServer:
+    """本機模擬的 Minecraft 伺服器，只實作狀態查詢 (Server List Ping)"""
+
+    def __init__(self, motd="A Minecraft Server", online=0, max_players=20,
+                 version="1.21.4", protocol=769, delay=0.0):
+        self.status = {
+            "version": {"name": version, "protocol": protocol},
+            "players": {"max": max_players, "online": online, "sample": []},
+            "description": {"text": motd},
+        }
+        self.delay = delay
+        self.handshakes = []
+        self.server = None
+        self.port = None
+        self._handlers = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            packet_id, payload = await read_packet(reader)
+            protocol, offset = decode_varint(payload)
+            host_len, offset = decode_varint(payload, offset)
+            host = payload[offset:offset + host_len].decode('utf-8')
+            offset += host_len
+            port = struct.unpack('>H', payload[offset:offset + 2])[0]
+            next_state, _ = decode_varint(payload, offset + 2)
+            self.handshakes.append((protocol, host, port, next_state))
+
+            await read_packet(reader)  # 狀態請求
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            body = encode_string(json.dumps(self.status))
+            writer.write(make_packet(0x00, body))
+            await writer.drain()
+
+            packet_id, payload = await read_packet(reader)
+            if packet_id == 0x01:
+                writer.write(make_packet(0x01, payload))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import random
+import time
+import pytest
+from src.services.alist import (
+    PARTS_MANIFEST, AlistClient, AlistError, UploadProgress, alist_base_url, para_path, token_expiry, upload_file
+)
+from src.services.archive import latest_archive
+from tests.mocks.fake_alist import FakeAlistServer, make_token
+
+
+def test_paths_and_token_expiry():
+    """測試 PARA 路徑、API 位址與 JWT 到期時間解析"""
+    assert para_path('project', 'sky_1.21.4_25565_fabric', 'backups') == "/1_project/sky_1.21.4_25565_fabric/backups"
+    assert para_path('achieve', 'sky') == "/4_achieve/sky"
+    assert alist_base_url({'url': "http://example.com", 'http_port': 5244}) == "http://example.com:5244"
+    assert alist_base_url({'url': "http://example.com:8080"}) == "http://example.com:8080"
+    assert alist_base_url({'url': "http://example.com", 'api_url': "http://127.0.0.1:5244"}) == "http://127.0.0.1:5244"
+
+    token = make_token(1, lifetime=100)
+    assert 90 < token_expiry(token) - time.time() <= 100
+    assert token_expiry("not-a-jwt", now=0, ttl=10) == 10
+
+
+@pytest.mark.asyncio
+async def test_token_is_cached_and_refreshed():
+    """測試 token 快取重複使用，失效 (401) 時重新登入並重試"""
+    async with FakeAlistServer() as server:
+        async with AlistClient(server.url, "admin", "secret") as client:
+            await client.mkdir("/1_project/sky/backups")
+            assert {entry['name'] for entry in await client.list("/1_project")} == {"sky"}
+            assert (await client.get("/1_project/sky"))['is_dir']
+            assert await client.get("/1_project/missing") is None
+            assert server.logins == 1
+
+            server.expire_tokens()
+            assert await client.list("/1_project/sky/backups") == []
+            assert server.logins == 2
+            # 所有請求共用同一條 keep-alive 連線
+            assert len(server.peer_ports) == 1
+
+        async with AlistClient(server.url, "admin", "wrong") as client:
+            with pytest.raises(AlistError):
+                await client.list("/")
+
+
+@pytest.mark.asyncio
+async def test_token_near_expiry_logs_in_again():
+    """測試 token 快到期時先重新登入"""
+    async with FakeAlistServer(token_lifetime=60) as server:
+        async with AlistClient(server.url, "admin", "secret") as client:
+            await client.list("/")
+            await client.list("/")
+            assert server.logins == 2
+
+
+@pytest.mark.asyncio
+async def test_small_file_is_uploaded_in_one_request(tmp_path):
+    """測試小檔案直接串流上傳"""
+    path = tmp_path / "sky_20250101-120000.tar.gz"
+    path.write_bytes(b"archive" * 1000)
+    async with FakeAlistServer() as server:
+        async with AlistClient(server.url, "admin", "secret") as client:
+            remote = await upload_file(client, str(path), "/1_project/sky/backups", part_size=1 << 20)
+    assert remote == "/1_project/sky/backups/sky_20250101-120000.tar.gz"
+    assert server.files[remote] == path.read_bytes()
+
+
+@pytest.mark.asyncio
+async def test_multipart_upload_retries_and_resumes(tmp_path):
+    """測試分段上傳：失敗的分段重試，中斷後再次上傳會略過已完成的分段"""
+    data = random.Random(5487).randbytes(250_000)
+    path = tmp_path / "sky_20250101-120000.tar.gz"
+    path.write_bytes(data)
+    parts_dir = "/4_achieve/sky/sky_20250101-120000.tar.gz.parts"
+
+    async with FakeAlistServer() as server:
+        async with AlistClient(server.url, "admin", "secret") as client:
+            # 重試次數用盡，上傳失敗且不寫入 parts.json
+            server.fail_puts = 100
+            with pytest.raises(AlistError):
+                await upload_file(client, str(path), "/4_achieve/sky", part_size=100_000, retries=2,
+                                  retry_delay=0)
+            assert f"{parts_dir}/{PARTS_MANIFEST}" not in server.files
+
+            # 只有第一段失敗一次，重試後成功
+            server.fail_puts = 1
+            server.puts.clear()
+            progress = UploadProgress(len(data))
+            remote = await upload_file(client, str(path), "/4_achieve/sky", part_size=100_000, retry_delay=0,
+                                       progress=progress)
+            assert remote == parts_dir
+            assert len(server.puts) == 5  # 3 段 + 1 次重試 + parts.json
+            assert progress.sent == len(data) and progress.skipped == 0
+
+            manifest = json.loads(server.files[f"{parts_dir}/{PARTS_MANIFEST}"])
+            assert [part['size'] for part in manifest['parts']] == [100_000, 100_000, 50_000]
+            joined = b"".join(server.files[f"{parts_dir}/{part['name']}"] for part in manifest['parts'])
+            assert joined == data
+            assert manifest['parts'][2]['sha256'] == hashlib.sha256(data[200_000:]).hexdigest()
+
+            # 遺失一段後再次上傳，只重傳該段
+            del server.files[f"{parts_dir}/part-00001"]
+            server.puts.clear()
+            progress = UploadProgress(len(data))
+            await upload_file(client, str(path), "/4_achieve/sky", part_size=100_000, retry_delay=0,
+                              progress=progress)
+            assert server.puts == [f"{parts_dir}/part-00001", f"{parts_dir}/{PARTS_MANIFEST}"]
+            assert progress.sent == 100_000 and progress.skipped == 150_000
+            assert json.loads(server.files[f"{parts_dir}/{PARTS_MANIFEST}"]) == manifest
+
+
+def test_latest_archive_matches_server_folder(tmp_path):
+    """測試只找出該伺服器資料夾的最新封存檔"""
+    assert latest_archive(str(tmp_path / "missing"), "sky") is None
+    for name in ["sky_20250101-120000.tar.gz", "sky_20250102-120000.tar.gz",
+                 "sky_20250103-120000.tar.gz.part", "sky_old_20250104-120000.tar.gz"]:
+        (tmp_path / name).write_bytes(b"")
+    assert latest_archive(str(tmp_path), "/srv/sky/") == str(tmp_path / "sky_20250102-120000.tar.gz")
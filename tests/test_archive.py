@@ -0,0 +1,94 @@
+import asyncio
+import gzip
+import io
+import json
+import os
+import random
+import tarfile
+import pytest
+from src.services.archive import (
+    MANIFEST_NAME, ArchiveStats, ProgressThrottle, archive_name, archive_stream, archive_to_file,
+    verify_archive, write_archive
+)
+
+
+def make_folder(tmp_path):
+    folder = tmp_path / "sky_1.21.4_25565_fabric"
+    (folder / "world" / "region").mkdir(parents=True)
+    rng = random.Random(5487)
+    (folder / "world" / "region" / "r.0.0.mca").write_bytes(rng.randbytes(300_000))
+    (folder / "world" / "level.dat").write_bytes(b"level" * 1000)
+    (folder / "world" / "session.lock").write_bytes(b"lock")
+    (folder / "server.properties").write_text("server-port=25565\n", encoding="utf-8")
+    return folder
+
+
+def test_parallel_blocks_form_a_valid_archive(tmp_path):
+    """測試平行壓縮的多個 gzip 區塊可用一般工具解開，且附有 manifest"""
+    folder = make_folder(tmp_path)
+    out = io.BytesIO()
+    stats = ArchiveStats()
+    manifest = write_archive(str(folder), out.write, stats, workers=4, block_size=64 * 1024)
+
+    assert set(manifest['files']) == {"world/region/r.0.0.mca", "world/level.dat", "server.properties"}
+    assert stats.files == 3 and stats.bytes_in == 300_000 + 5000 + 18
+    assert stats.bytes_out == len(out.getvalue())
+
+    data = gzip.decompress(out.getvalue())
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        names = tar.getnames()
+        assert names[-1] == MANIFEST_NAME
+        assert tar.extractfile("world/level.dat").read() == b"level" * 1000
+
+
+@pytest.mark.asyncio
+async def test_archive_to_file_and_verify(tmp_path):
+    """測試寫入檔案後以 manifest 驗證，內容被竄改時回報"""
+    folder = make_folder(tmp_path)
+    path = str(tmp_path / "out" / archive_name(str(folder), now=0))
+    assert os.path.basename(path).startswith("sky_1.21.4_25565_fabric_")
+
+    await archive_to_file(str(folder), path, workers=2)
+    assert not os.path.exists(f"{path}.part")
+    assert verify_archive(path) == []
+
+    # 換掉其中一個檔案的內容但保留原本的 manifest
+    tampered = str(tmp_path / "tampered.tar.gz")
+    with tarfile.open(path, 'r:gz') as src, tarfile.open(tampered, 'w:gz') as dst:
+        for member in src:
+            data = src.extractfile(member).read()
+            if member.name == "world/level.dat":
+                data = b"x" * len(data)
+            dst.addfile(member, io.BytesIO(data))
+    assert verify_archive(tampered) == ["內容不符：world/level.dat"]
+
+
+@pytest.mark.asyncio
+async def test_stream_matches_file_and_can_stop_early(tmp_path):
+    """測試串流輸出與寫入檔案內容相同，消費端提前停止時封存中止"""
+    folder = make_folder(tmp_path)
+    chunks = [chunk async for chunk in archive_stream(str(folder), workers=2)]
+    with tarfile.open(fileobj=io.BytesIO(b"".join(chunks)), mode='r:gz') as tar:
+        manifest = json.loads(tar.extractfile(MANIFEST_NAME).read())
+    assert len(manifest['files']) == 3
+
+    stream = archive_stream(str(folder), workers=2, queue_size=1)
+    await stream.__anext__()
+    await asyncio.wait_for(stream.aclose(), 5)
+
+
+@pytest.mark.asyncio
+async def test_progress_is_throttled():
+    """測試進度只在有變化時、依間隔回報"""
+    stats = ArchiveStats()
+    updates = []
+
+    async def update(current):
+        updates.append(current.bytes_in)
+
+    throttle = ProgressThrottle(stats, update, interval=0.02)
+    throttle.start()
+    stats.bytes_in = 10
+    await asyncio.sleep(0.1)
+    await throttle.stop()
+    assert updates == [10]
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import struct
+import pytest
+from src.services.backup import BackupEngine, BackupError, BackupStore, saves_paused, store_file
+from src.services.console import ConsoleBuffer
+from src.services.region import SECTOR_SIZE
+from src.services.registry import ServerInfo
+
+
+def make_region(chunks):
+    """建立區域檔：chunks 為 [(sector 起點, sector 數, 填充位元組)]，填充位元組同時當作時間戳"""
+    header = bytearray(2 * SECTOR_SIZE)
+    body = {}
+    for index, (offset, count, fill) in enumerate(chunks):
+        struct.pack_into('>I', header, index * 4, (offset << 8) | count)
+        struct.pack_into('>I', header, SECTOR_SIZE + index * 4, fill)
+        body[offset] = bytes([fill]) * (count * SECTOR_SIZE)
+    size = max(offset + count for offset, count, _ in chunks) * SECTOR_SIZE
+    data = bytearray(size)
+    data[:len(header)] = header
+    for offset, content in body.items():
+        data[offset * SECTOR_SIZE:offset * SECTOR_SIZE + len(content)] = content
+    return bytes(data)
+
+
+def make_server(tmp_path):
+    folder = tmp_path / "sky_1.21.4_25565_fabric"
+    region = folder / "world" / "region"
+    region.mkdir(parents=True)
+    (folder / "server.properties").write_text("level-name=world\n", encoding="utf-8")
+    (region / "r.0.0.mca").write_bytes(make_region([(2, 1, 1), (3, 2, 2)]))
+    (folder / "world" / "level.dat").write_bytes(b"level" * 100)
+    (folder / "world" / "session.lock").write_bytes(b"lock")
+    return ServerInfo("sky", "1.21.4", 25565, "fabric", str(folder), "start.sh", str(folder / "start.sh"))
+
+
+def test_changed_chunk_is_the_only_one_read(tmp_path):
+    """測試只讀取時間戳改變的 chunk，其餘沿用上一個快照的片段"""
+    path = tmp_path / "r.0.0.mca"
+    objects = str(tmp_path / "objects")
+    path.write_bytes(make_region([(2, 1, 1), (3, 2, 2)]))
+    first, read = store_file(str(path), objects)
+    assert read == 5 * SECTOR_SIZE
+    assert [piece[2] for piece in first['pieces']] == [0, 2 * SECTOR_SIZE, 3 * SECTOR_SIZE]
+
+    path.write_bytes(make_region([(2, 1, 1), (3, 2, 9)]))
+    second, read = store_file(str(path), objects, first)
+    assert read == 2 * SECTOR_SIZE + 2 * SECTOR_SIZE  # 標頭 + 改變的 chunk
+    assert second['pieces'][1] == first['pieces'][1] and second['pieces'][2] != first['pieces'][2]
+    assert sum(len(files) for _, _, files in os.walk(objects)) == 5
+
+
+def test_unused_sectors_are_not_stored(tmp_path):
+    """測試未被位置表引用的 sector 不儲存，還原時補 0"""
+    data = bytearray(make_region([(2, 1, 1), (4, 1, 2)]))
+    data[3 * SECTOR_SIZE:4 * SECTOR_SIZE] = b"\xee" * SECTOR_SIZE  # 已釋放的舊 chunk
+    path = tmp_path / "r.0.0.mca"
+    path.write_bytes(bytes(data))
+    store = BackupStore(str(tmp_path / "store"))
+    entry, read = store_file(str(path), store.objects)
+    assert read == 4 * SECTOR_SIZE
+
+    entry['size'] = len(data)
+    store.restore_file(entry, str(tmp_path / "restored.mca"))
+    restored = (tmp_path / "restored.mca").read_bytes()
+    assert len(restored) == len(data)
+    assert restored[3 * SECTOR_SIZE:4 * SECTOR_SIZE] == bytes(SECTOR_SIZE)
+    assert restored[4 * SECTOR_SIZE:] == bytes(data[4 * SECTOR_SIZE:])
+
+
+@pytest.mark.asyncio
+async def test_incremental_snapshot_and_restore(tmp_path):
+    """測試增量快照只處理變動的檔案，並可還原"""
+    info = make_server(tmp_path)
+    engine = BackupEngine(str(tmp_path / "backups"), workers=2)
+    try:
+        first = await engine.snapshot(info)
+        assert set(first['files']) == {"world/region/r.0.0.mca", "world/level.dat"}
+        assert first['changed'] == 2
+
+        second = await engine.snapshot(info)
+        assert second['changed'] == 0
+
+        region = os.path.join(info.folder, "world", "region", "r.0.0.mca")
+        original = open(region, 'rb').read()
+        with open(region, 'wb') as f:
+            f.write(make_region([(2, 1, 1), (3, 2, 7)]))
+        with open(os.path.join(info.folder, "world", "new.dat"), "wb") as f:
+            f.write(b"new")
+        third = await engine.snapshot(info)
+        assert third['changed'] == 2
+        assert third['read'] == 2 * SECTOR_SIZE + 2 * SECTOR_SIZE + 3
+
+        restored = await engine.restore(info, first['id'])
+        assert restored == 1
+        assert open(region, 'rb').read() == original
+        assert not os.path.exists(os.path.join(info.folder, "world", "new.dat"))
+
+        with pytest.raises(BackupError):
+            await engine.restore(info, "missing")
+    finally:
+        engine.close()
+
+
+def test_retention_and_garbage_collection(tmp_path):
+    """測試保留規則：最新 N 個加上每天最後一個，並回收沒有引用的片段"""
+    store = BackupStore(str(tmp_path))
+    objects = str(tmp_path / "objects")
+    ids = ["20250101-080000", "20250101-200000", "20250102-080000", "20250103-080000", "20250103-090000"]
+    for index, snapshot_id in enumerate(ids):
+        data = tmp_path / f"data{index}"
+        data.write_bytes(bytes([index]) * 10)
+        entry, _ = store_file(str(data), objects)
+        store.save({'id': snapshot_id, 'files': {'f': dict(entry, size=10, mtime_ns=0)}})
+
+    assert store.retained(keep_last=2, keep_daily=2) == {"20250103-080000", "20250103-090000", "20250102-080000"}
+    removed, freed = store.prune(keep_last=2, keep_daily=2)
+    assert removed == ["20250101-080000", "20250101-200000"]
+    assert freed == 20
+
+
+class FakeManaged:
+    """會在收到 save-all flush 時輸出存檔訊息的主控台"""
+
+    def __init__(self):
+        self.console = ConsoleBuffer()
+        self.sent = []
+        self.is_running = True
+
+    async def send_line(self, line):
+        self.sent.append(line)
+        if line == 'save-all flush':
+            asyncio.get_running_loop().call_soon(
+                self.console.append, "[12:00:00] [Server thread/INFO]: Saved the game", 'stdout'
+            )
+
+
+@pytest.mark.asyncio
+async def test_saves_paused_over_console(tmp_path):
+    """測試備份前後的存檔指令順序"""
+    info = make_server(tmp_path)
+    managed = FakeManaged()
+    async with saves_paused(info, managed, timeout=1):
+        assert managed.sent == ['save-off', 'save-all flush']
+    assert managed.sent == ['save-off', 'save-all flush', 'save-on']
+
+    managed.send_line = lambda line: managed.sent.append(line) or asyncio.sleep(0)
+    managed.sent.clear()
+    with pytest.raises(BackupError):
+        async with saves_paused(info, managed, timeout=0.05):
+            pass
+    assert managed.sent[-1] == 'save-on'
@@ -0,0 +1,112 @@
+import asyncio
+import re
+import sys
+import pytest
+from src.commands.console import MAX_FILTER_LENGTH, compile_filter
+from src.services.console import ConsoleBatcher, ConsoleBuffer, pump_stream
+from src.services.supervisor import LaunchSpec, ProcessSupervisor
+
+
+def test_buffer_is_bounded():
+    """測試緩衝區與單行長度都有上限"""
+    buffer = ConsoleBuffer(maxlen=10, max_line=50)
+    for i in range(1000):
+        buffer.append(f"line {i}")
+    buffer.append("x" * 10000)
+
+    assert len(buffer) == 10
+    assert buffer.tail(1)[0].text == "x" * 50 + "…"
+    assert [l.text for l in buffer.tail(2, re.compile("line"))] == ["line 998", "line 999"]
+
+
+def test_slow_subscriber_drops_oldest():
+    """測試訂閱者消費太慢時丟棄最舊的行"""
+    buffer = ConsoleBuffer()
+    subscription = buffer.subscribe(pattern=re.compile("ERROR"), maxlen=5)
+    for i in range(100):
+        buffer.append(f"[INFO] {i}")
+        buffer.append(f"[ERROR] {i}")
+
+    lines = subscription.drain()
+    assert [l.text for l in lines] == [f"[ERROR] {i}" for i in range(95, 100)]
+    assert subscription.dropped == 95
+
+
+@pytest.mark.asyncio
+async def test_pump_splits_lines_across_chunks():
+    """測試跨區塊的行被正確切開"""
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"hello\r\nwor")
+    reader.feed_data(b"ld\n" + "中文".encode("utf-8") + b"\npartial")
+    reader.feed_eof()
+    buffer = ConsoleBuffer()
+
+    await pump_stream(reader, buffer, "stdout", chunk_size=4)
+    assert [l.text for l in buffer.tail()] == ["hello", "world", "中文", "partial"]
+
+
+@pytest.mark.asyncio
+async def test_batcher_respects_discord_limit():
+    """測試大量輸出被合併為少量且不超過 2000 字的訊息"""
+    buffer = ConsoleBuffer()
+    subscription = buffer.subscribe()
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    task = asyncio.create_task(ConsoleBatcher(subscription, send, interval=0.2, max_messages=100).run())
+    for i in range(500):
+        buffer.append(f"[Server thread/INFO]: line {i:04d}")
+    await asyncio.sleep(0.5)
+    buffer.close()
+    await asyncio.wait_for(task, 5)
+
+    assert 5 <= len(sent) <= 20
+    assert all(len(message) <= 2000 for message in sent)
+    text = "".join(sent)
+    assert "line 0000" in text and "line 0499" in text
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_on_interval():
+    """測試少量輸出在時間到時送出"""
+    buffer = ConsoleBuffer()
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    task = asyncio.create_task(ConsoleBatcher(buffer.subscribe(), send, interval=0.1).run())
+    buffer.append("Done (3.2s)!")
+    await asyncio.sleep(0.3)
+    assert sent == ["```\nDone (3.2s)!\n```"]
+    buffer.close()
+    await asyncio.wait_for(task, 5)
+
+
+@pytest.mark.asyncio
+async def test_supervisor_captures_output(tmp_path):
+    """測試 supervisor 擷取 stdout 與 stderr"""
+    script = tmp_path / "talk.py"
+    script.write_text("import sys\nprint('out line')\nprint('err line', file=sys.stderr)\n", encoding="utf-8")
+    supervisor = ProcessSupervisor(console_lines=100)
+    managed = await supervisor.start(LaunchSpec("talk", [sys.executable, str(script)], tmp_path))
+    await managed.wait(5)
+    await asyncio.wait_for(managed._pump_task, 5)
+    assert managed.console.closed
+
+    lines = {(l.stream, l.text) for l in managed.console.tail()}
+    assert lines == {("stdout", "out line"), ("stderr", "err line")}
+
+
+def test_compile_filter_limits():
+    """測試過濾條件：預設條件、長度上限與巢狀重複"""
+    assert compile_filter([]) is None
+    assert compile_filter(["--errors"]).search("[Server thread/WARN]: x")
+    assert compile_filter(["Done", "(\\d+)"]).pattern == "Done (\\d+)"
+    with pytest.raises(re.error):
+        compile_filter(["a" * (MAX_FILTER_LENGTH + 1)])
+    for evil in ("(a+)+$", "(x*)*", "(\\w+\\s?)+$", "(a{2,})+"):
+        with pytest.raises(re.error):
+            compile_filter([evil])
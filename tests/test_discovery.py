@@ -0,0 +1,116 @@
+import json
+import os
+import pytest
+from src.services.discovery import DiscoveryService, ServerDiscovery, ScanStats, discovery_roots
+from src.services.registry import ServerRegistry
+
+
+def make_server(parent, folder, script="StartServer.bat"):
+    path = parent / folder
+    path.mkdir(parents=True)
+    if script:
+        (path / script).write_text("java -jar server.jar", encoding="utf-8")
+    return path
+
+
+def age(path, seconds=60):
+    """把資料夾的 mtime 往前調，模擬掃描後才發生的變動"""
+    for root, dirs, _ in os.walk(path):
+        for name in dirs + ['.']:
+            target = os.path.join(root, name)
+            st = os.stat(target)
+            os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 1_000_000_000))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    base = tmp_path / "mc"
+    sky = make_server(base / "1_project", "skyworld_1.21.4_25560_fabric")
+    (sky / "world" / "region").mkdir(parents=True)
+    make_server(base / "1_project", "creative_1.21_25561_paper", script="start.sh")
+    make_server(base / "4_achieve", "old_1.20.1_25570_vanilla", script=None)
+    (base / "2_repo" / "notes").mkdir(parents=True)
+    age(base)
+    return base
+
+
+def test_scan_finds_servers_and_scripts(tree):
+    """測試找出符合命名格式的資料夾與啟動腳本，且不進入伺服器資料夾"""
+    discovery = ServerDiscovery([str(tree)], platform='linux')
+    stats = ScanStats()
+    found = discovery.scan(stats)
+    assert found == [
+        str(tree / "1_project" / "creative_1.21_25561_paper" / "start.sh"),
+        str(tree / "1_project" / "skyworld_1.21.4_25560_fabric" / "StartServer.bat"),
+    ]
+    # base、1_project、2_repo、notes、4_achieve 與三個伺服器資料夾；不含 world
+    assert stats.visited == 8 and stats.listed == 8
+
+
+def test_rescan_only_lists_changed_directories(tree):
+    """測試第二次掃描只重新列出 mtime 改變的資料夾"""
+    discovery = ServerDiscovery([str(tree)], platform='linux', racy_window=0)
+    first = discovery.scan()
+
+    stats = ScanStats()
+    assert discovery.scan(stats) == first
+    assert stats.visited == 8 and stats.listed == 0
+
+    # 新增伺服器只影響 2_repo，補上啟動腳本只影響該伺服器資料夾
+    make_server(tree / "2_repo", "test_24w14a_25580_fabric", script=None)
+    (tree / "4_achieve" / "old_1.20.1_25570_vanilla" / "run.sh").write_text("", encoding="utf-8")
+    stats = ScanStats()
+    found = discovery.scan(stats)
+    assert str(tree / "4_achieve" / "old_1.20.1_25570_vanilla" / "run.sh") in found
+    assert stats.listed == 3  # 2_repo、新資料夾、old_1.20.1
+
+
+def test_recent_changes_are_relisted(tree):
+    """測試 mtime 太接近掃描時間的資料夾下次仍會重新列出"""
+    discovery = ServerDiscovery([str(tree)], platform='linux')
+    make_server(tree / "2_repo", "fresh_1.21.4_25590_fabric")
+    discovery.scan()
+    stats = ScanStats()
+    discovery.scan(stats)
+    assert stats.listed == 2  # 2_repo 與剛建立的伺服器資料夾
+
+
+def test_script_preference_depends_on_platform(tmp_path):
+    """測試同時有 .bat 與 .sh 時依平台選擇"""
+    folder = make_server(tmp_path, "both_1.21.4_25560_fabric", script="startServer.bat")
+    (folder / "start.sh").write_text("", encoding="utf-8")
+    assert ServerDiscovery([str(tmp_path)], platform='win32').scan() == [str(folder / "startServer.bat")]
+    assert ServerDiscovery([str(tmp_path)], platform='linux').scan() == [str(folder / "start.sh")]
+
+
+def test_discovery_roots():
+    assert discovery_roots({'base_path': ""}) == []
+    assert discovery_roots({'base_path': f"/a{os.pathsep} /b"}) == ["/a", "/b"]
+    assert discovery_roots({'base_path': ["/a", ""]}) == ["/a"]
+
+
+@pytest.mark.asyncio
+async def test_service_merges_into_registry(tree, tmp_path):
+    """測試偵測結果與 servers.json 合併，同一個腳本不重複"""
+    servers_file = tmp_path / "servers.json"
+    sky_script = str(tree / "1_project" / "skyworld_1.21.4_25560_fabric" / "StartServer.bat")
+    servers_file.write_text(json.dumps({"servers": [
+        {"path": sky_script},
+        {"path": "/elsewhere/manual_1.21.4_25600_fabric/StartServer.bat"},
+    ]}), encoding="utf-8")
+    registry = ServerRegistry(servers_file)
+    service = DiscoveryService(registry, [str(tree)], interval=0)
+
+    added, removed = await service.refresh()
+    assert len(added) == 2 and removed == []
+    assert sorted(info.name for info in registry) == ["creative", "manual", "skyworld"]
+
+    assert await service.refresh() == ([], [])
+
+    creative = tree / "1_project" / "creative_1.21_25561_paper"
+    (creative / "start.sh").unlink()
+    creative.rmdir()
+    added, removed = await service.refresh()
+    assert added == [] and removed == [str(creative / "start.sh")]
+    await registry.ensure_fresh()
+    assert registry.get("creative") == []
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import socket
+import struct
+import time
+import pytest
+from src.services.activity import ActivityTracker
+from src.services.idle import SLEEPING_MOTD, WAKING_MESSAGE, IdleManager
+from src.services.registry import ServerRegistry
+from src.services.shutdown import graceful_stop
+from src.services.slp import (
+    STATE_LOGIN, decode_varint, encode_string, encode_varint, make_packet, query_status, read_packet
+)
+from src.services.supervisor import find_listening_pid
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('', 0))
+        return sock.getsockname()[1]
+
+
+class FakeSupervisor:
+    """只記錄運行中名稱的 supervisor"""
+
+    def __init__(self):
+        self.names = set()
+        self.stopped = []
+
+    def running(self):
+        return {name: None for name in self.names}
+
+    def is_running(self, name):
+        return name in self.names
+
+    def get(self, name):
+        return None
+
+    async def stop(self, name):
+        self.stopped.append(name)
+        self.names.discard(name)
+
+
+def make_registry(tmp_path, folders):
+    paths = []
+    for folder_name in folders:
+        folder = tmp_path / folder_name
+        folder.mkdir()
+        (folder / "start.sh").write_text("java -jar server.jar nogui\n", encoding="utf-8")
+        paths.append({"path": str(folder / "start.sh")})
+    servers = tmp_path / "servers.json"
+    servers.write_text(json.dumps({"servers": paths}), encoding="utf-8")
+    registry = ServerRegistry(servers)
+    registry.refresh()
+    return registry
+
+
+async def login(port):
+    """模擬玩家登入，回傳斷線原因"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    handshake = encode_varint(769) + encode_string('127.0.0.1') + struct.pack('>H', port) + encode_varint(STATE_LOGIN)
+    writer.write(make_packet(0x00, handshake) + make_packet(0x00, encode_string("Steve")))
+    await writer.drain()
+    packet_id, payload = await read_packet(reader)
+    writer.close()
+    length, offset = decode_varint(payload)
+    return packet_id, json.loads(payload[offset:offset + length])
+
+
+@pytest.mark.asyncio
+async def test_sleeping_listener_answers_ping_and_wakes(tmp_path):
+    """測試休眠端口回應狀態查詢，登入時回覆斷線訊息並喚醒"""
+    port = free_port()
+    registry = make_registry(tmp_path, [f"sky_1.21.4_{port}_fabric"])
+    supervisor = FakeSupervisor()
+    woken = []
+
+    async def wake_server(info):
+        woken.append(info.name)
+        supervisor.names.add(info.name)
+
+    manager = IdleManager(supervisor, registry, wake_server=wake_server, wake_on_join=True, host='127.0.0.1')
+    await manager.sync()
+    try:
+        assert manager.sleeping() == ["sky"]
+        status = await query_status('127.0.0.1', port)
+        assert status.online and status.motd == SLEEPING_MOTD and status.players_online == 0
+
+        packet_id, reason = await login(port)
+        assert packet_id == 0x00 and reason["text"] == WAKING_MESSAGE
+        for _ in range(100):
+            if woken and not manager._waking:
+                break
+            await asyncio.sleep(0.01)
+        assert woken == ["sky"]
+        # 伺服器已運行，端口交還給伺服器
+        assert manager.sleeping() == []
+    finally:
+        await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_release_holds_port_during_start(tmp_path):
+    """測試啟動流程期間不會重新監聽，結束後才恢復"""
+    port = free_port()
+    registry = make_registry(tmp_path, [f"sky_1.21.4_{port}_fabric"])
+    manager = IdleManager(FakeSupervisor(), registry, wake_server=lambda info: None,
+                          wake_on_join=True, host='127.0.0.1')
+    await manager.sync()
+    info = registry.get("sky", "1.21.4")
+    try:
+        await manager.release(info)
+        await manager.sync()
+        assert manager.sleeping() == []
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', port))
+
+        manager.resume("sky")
+        await manager.sync()
+        assert manager.sleeping() == ["sky"]
+    finally:
+        await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_shared_port_is_not_proxied(tmp_path):
+    """測試同一端口有多個伺服器時不監聽"""
+    port = free_port()
+    registry = make_registry(tmp_path, [f"a_1.21.4_{port}_fabric", f"b_1.21.4_{port}_fabric"])
+    manager = IdleManager(FakeSupervisor(), registry, wake_server=lambda info: None,
+                          wake_on_join=True, host='127.0.0.1')
+    await manager.sync()
+    assert manager.sleeping() == []
+
+
+@pytest.mark.asyncio
+async def test_auto_stop_idle_servers(tmp_path):
+    """測試無人超過門檻的伺服器被停止，有玩家的不受影響"""
+    supervisor = FakeSupervisor()
+    supervisor.names.update({"busy", "idle", "fresh"})
+    activity = ActivityTracker(supervisor)
+    now = time.time()
+    activity.record("busy", 2, now=now - 3600)
+    activity.record("idle", 0, now=now - 1900)
+    activity.record("fresh", 0, now=now - 60)
+
+    manager = IdleManager(supervisor, make_registry(tmp_path, []), activity=activity, auto_stop_after=1800)
+    assert await manager.auto_stop() == ["idle"]
+    assert supervisor.stopped == ["idle"]
+    assert activity.idle_for("idle") == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_sleeping_server_closes_listener(tmp_path):
+    """測試關閉休眠中的伺服器只關閉監聽，不會找到並結束機器人自己的程序"""
+    port = free_port()
+    registry = make_registry(tmp_path, [f"sky_1.21.4_{port}_fabric"])
+    manager = IdleManager(FakeSupervisor(), registry, wake_server=lambda info: None,
+                          wake_on_join=True, host='127.0.0.1')
+    await manager.sync()
+    info = registry.get("sky", "1.21.4")
+    try:
+        assert manager.sleeping() == ["sky"]
+        assert find_listening_pid(port) is None
+
+        result = await graceful_stop(info, manager.supervisor, idle=manager)
+        assert result.stage == "not_running"
+        assert manager.sleeping() == []
+    finally:
+        await manager.stop()
@@ -0,0 +1,125 @@
+import asyncio
+import discord
+import pytest
+from discord.ext import commands
+from src.cog_base import ManagedCog
+from src.services.lifecycle import BackgroundService, ManagedTasks, handover
+
+
+class Poller(BackgroundService):
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.ticks = 0
+        self.stopped = 0
+
+    def should_run(self):
+        return self.enabled
+
+    async def _run(self):
+        while True:
+            self.ticks += 1
+            await asyncio.sleep(0.01)
+
+    async def _on_stop(self):
+        self.stopped += 1
+
+
+@pytest.mark.asyncio
+async def test_background_service_start_is_idempotent():
+    """測試重複 start 只會有一個任務，stop 後可再次啟動"""
+    poller = Poller()
+    poller.start()
+    task = poller._task
+    poller.start()
+    assert poller._task is task and poller.running
+
+    await poller.stop()
+    assert task.cancelled() and not poller.running and poller.stopped == 1
+
+    poller.start()
+    assert poller.running
+    await poller.stop()
+
+    disabled = Poller(enabled=False)
+    disabled.start()
+    assert not disabled.running
+
+
+def test_background_service_requires_run():
+    """測試忘記實作 _run 的子類別在建立時就失敗"""
+    class Broken(BackgroundService):
+        pass
+
+    with pytest.raises(TypeError):
+        Broken()
+
+
+@pytest.mark.asyncio
+async def test_managed_tasks_replace_and_cancel():
+    """測試同一 key 的任務會取代舊的，結束後自動移除，cancel_all 取消全部"""
+    tasks = ManagedTasks()
+    first = tasks.spawn(asyncio.sleep(10), key="a")
+    second = tasks.spawn(asyncio.sleep(10), key="a")
+    await asyncio.sleep(0)
+    assert first.cancelled() and tasks.get("a") is second
+
+    done = tasks.spawn(asyncio.sleep(0))
+    await done
+    await asyncio.sleep(0)
+    assert len(tasks) == 1
+
+    await tasks.cancel_all()
+    assert second.cancelled() and len(tasks) == 0
+
+
+class Listeners:
+    def __init__(self):
+        self.callbacks = []
+
+    def add(self, callback):
+        self.callbacks.append(callback)
+
+    def remove(self, callback):
+        self.callbacks.remove(callback)
+
+
+class DemoCog(ManagedCog):
+    def __init__(self, bot, poller, listeners):
+        super().__init__(bot)
+        self.poller = self.manage(poller)
+        self.listen(listeners.add, listeners.remove, self.on_event)
+        self.state.setdefault('loads', 0)
+
+    async def cog_load(self):
+        await super().cog_load()
+        self.state['loads'] += 1
+        self.tasks.spawn(asyncio.sleep(10), key="watch")
+
+    async def on_event(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_cog_reload_does_not_leak_tasks():
+    """測試模組卸載時停止服務、移除回呼、取消任務，重新載入後狀態保留且只有一份輪詢"""
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.none())
+    poller, listeners = Poller(), Listeners()
+
+    first = DemoCog(bot, poller, listeners)
+    await bot.add_cog(first)
+    watch = first.tasks.get("watch")
+    assert poller.running and len(listeners.callbacks) == 1
+
+    # 模擬 reload_extension：移除舊實例後載入新實例
+    await bot.remove_cog(first.qualified_name)
+    assert not poller.running and listeners.callbacks == [] and watch.cancelled()
+
+    second = DemoCog(bot, poller, listeners)
+    await bot.add_cog(second)
+    assert second.state is first.state and second.state['loads'] == 2
+    assert poller.running and len(listeners.callbacks) == 1
+    tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    assert len(tasks) == 2  # 一個輪詢 + 一個 watch
+
+    await bot.remove_cog(second.qualified_name)
+    assert handover(bot, "DemoCog") is first.state
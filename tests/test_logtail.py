@@ -0,0 +1,105 @@
+import json
+import os
+import pytest
+from src.services.logtail import LogTailer, LogWatcher, parse_line
+from src.services.registry import ServerRegistry
+
+
+@pytest.mark.parametrize("line, kind, data", [
+    ("[12:00:01] [Server thread/INFO]: Done (12.345s)! For help, type \"help\"", "done", {"seconds": "12.345"}),
+    ("[12:00:02] [Server thread/WARN]: Can't keep up! Is the server overloaded? Running 5023ms or 100 ticks behind",
+     "lag", {"ms": "5023", "ticks": "100"}),
+    ("[12:00:03] [Server thread/INFO]: Steve joined the game", "join", {"player": "Steve"}),
+    ("[12:00:04 INFO]: Alex left the game", "leave", {"player": "Alex"}),
+    ("[12:00:05] [Server thread/INFO]: [Not Secure] <Steve> hello world", "chat", {"player": "Steve", "text": "hello world"}),
+    ("[12:00:06] [Server thread/INFO]: Steve was slain by Zombie", "death", {"player": "Steve", "cause": "was slain by Zombie"}),
+    ("[18Oct2026 12:00:07.123] [Server thread/ERROR] [minecraft/MinecraftServer]: "
+     "This crash report has been saved to: ./crash-reports/crash.txt", "crash", {"report": "./crash-reports/crash.txt"}),
+    ("[12:00:08] [Server thread/INFO]: Preparing spawn area: 50%", "line", {}),
+])
+def test_parse_line(line, kind, data):
+    """測試各種事件的解析"""
+    event = parse_line(line)
+    assert event.kind == kind
+    assert event.data == data
+
+
+def test_parse_continuation_line():
+    """測試堆疊追蹤等非記錄行"""
+    assert parse_line("\tat net.minecraft.server.Main.main(Main.java:1)") is None
+
+
+def test_tailer_reads_incrementally(tmp_path):
+    """測試只讀取新增內容，並保留未完成的行"""
+    log = tmp_path / "latest.log"
+    log.write_bytes(b"old line\n")
+    tailer = LogTailer(log)
+    assert tailer.poll() == []  # 預設從檔尾開始
+
+    with open(log, "ab") as f:
+        f.write(b"first\nsecond\r\npart")
+    assert tailer.poll() == ["first", "second"]
+    with open(log, "ab") as f:
+        f.write(b"ial\n")
+    assert tailer.poll() == ["partial"]
+    assert tailer.offset == log.stat().st_size
+
+
+def test_tailer_detects_truncation_and_rotation(tmp_path):
+    """測試截斷與置換檔案後從頭讀取"""
+    log = tmp_path / "latest.log"
+    log.write_bytes(b"[00:00:00] boot A\n" + b"x" * 100 + b"\n")
+    tailer = LogTailer(log, from_end=False)
+    assert len(tailer.poll()) == 2
+
+    log.write_bytes(b"short\n")
+    assert tailer.poll() == ["short"]
+
+    os.replace(log, tmp_path / "2026-10-18-1.log")
+    log.write_bytes(b"[00:00:01] boot B\n" + b"y" * 200 + b"\n")
+    assert tailer.poll()[0] == "[00:00:01] boot B"
+    assert tailer.rotations == 2
+
+
+def test_tailer_memory_is_bounded(tmp_path):
+    """測試大型檔案分次讀取，超長行被切斷"""
+    log = tmp_path / "latest.log"
+    with open(log, "wb") as f:
+        for i in range(20000):
+            f.write(b"[12:00:00] [Server thread/INFO]: line %d\n" % i)
+        f.write(b"z" * 100000)
+    tailer = LogTailer(log, from_end=False, max_line=1000)
+
+    lines, polls = [], 0
+    while True:
+        chunk = tailer.poll(max_bytes=64 * 1024)
+        if not chunk:
+            break
+        lines.extend(chunk)
+        polls += 1
+    assert polls > 5
+    assert lines[19999].endswith("line 19999")
+    assert all(len(line) <= 64 * 1024 + 1000 for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_watcher_dispatches_events(tmp_path):
+    """測試追蹤器依事件類型分派給訂閱者"""
+    folder = tmp_path / "skyworld_1.21.4_25565_fabric"
+    (folder / "logs").mkdir(parents=True)
+    log = folder / "logs" / "latest.log"
+    log.write_text("", encoding="utf-8")
+    servers = tmp_path / "servers.json"
+    servers.write_text(json.dumps({"servers": [{"path": str(folder / "start.sh")}]}), encoding="utf-8")
+
+    watcher = LogWatcher(ServerRegistry(servers))
+    received = []
+    watcher.subscribe(lambda info, event: received.append((info.name, event.kind)), kinds={"join", "done"})
+    await watcher.poll()
+
+    with open(log, "a", encoding="utf-8") as f:
+        f.write("[12:00:00] [Server thread/INFO]: Done (3.0s)!\n")
+        f.write("[12:00:01] [Server thread/INFO]: Steve joined the game\n")
+        f.write("[12:00:02] [Server thread/INFO]: <Steve> hi\n")
+    assert await watcher.poll() == 3
+    assert received == [("skyworld", "done"), ("skyworld", "join")]
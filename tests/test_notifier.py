@@ -0,0 +1,101 @@
+import asyncio
+import time
+import pytest
+from src.services.notifier import MemorySink, Notifier, RateLimiter, build_notifier
+
+
+class SlowSink(MemorySink):
+    """模擬很慢的通知後端"""
+    name = 'slow'
+
+    def send(self, title, message):
+        time.sleep(0.5)
+        super().send(title, message)
+
+
+@pytest.mark.asyncio
+async def test_notify_does_not_block():
+    """測試 notify 不受輸出端速度影響"""
+    sink = SlowSink()
+    notifier = Notifier([sink], coalesce_seconds=0.01)
+
+    start = time.perf_counter()
+    for i in range(100):
+        notifier.notify('伺服器關閉', f's{i} 已停止運行')
+    assert time.perf_counter() - start < 0.05
+
+    await notifier.close()
+    assert len(sink.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_burst_is_coalesced():
+    """測試同類通知合併為一則"""
+    sink = MemorySink()
+    notifier = Notifier([sink], coalesce_seconds=0.05)
+    for i in range(5):
+        notifier.notify('伺服器關閉', f's{i} 已停止運行')
+    notifier.notify('伺服器啟動通知', 'x 已成功啟動')
+
+    await asyncio.sleep(0.2)
+    await notifier.close()
+
+    titles = sorted(title for title, _ in sink.sent)
+    assert titles == ['伺服器啟動通知', '伺服器關閉 (5 則)']
+    merged = dict(sink.sent)['伺服器關閉 (5 則)']
+    assert 's0 已停止運行' in merged and 's4 已停止運行' in merged
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_per_channel():
+    """測試依頻道限速，超出的通知延後合併而非遺失"""
+    sink = MemorySink()
+    notifier = Notifier([sink], coalesce_seconds=0.01, rate_count=1, rate_per=0.3)
+
+    notifier.notify('A', 'first', channel='server')
+    await asyncio.sleep(0.1)
+    notifier.notify('A', 'second', channel='server')
+    notifier.notify('B', 'other channel', channel='alert')
+    await asyncio.sleep(0.1)
+    assert ('A', 'second') not in sink.sent
+    assert ('B', 'other channel') in sink.sent
+
+    await asyncio.sleep(0.4)
+    assert ('A', 'second') in sink.sent
+    await notifier.close()
+
+
+@pytest.mark.asyncio
+async def test_sink_channels_and_errors():
+    """測試輸出端頻道過濾，且單一輸出端錯誤不影響其他輸出端"""
+    class BrokenSink(MemorySink):
+        def send(self, title, message):
+            raise RuntimeError("boom")
+
+    alerts = MemorySink(channels={'alert'})
+    everything = MemorySink()
+    notifier = Notifier([BrokenSink(), alerts, everything], coalesce_seconds=0)
+    notifier.notify('A', 'server msg')
+    notifier.notify('B', 'alert msg', channel='alert')
+    await notifier.flush()
+
+    assert alerts.sent == [('B', 'alert msg')]
+    assert sorted(everything.sent) == [('A', 'server msg'), ('B', 'alert msg')]
+    await notifier.close()
+
+
+def test_rate_limiter():
+    """測試 token bucket"""
+    now = [0.0]
+    limiter = RateLimiter(2, 10, clock=lambda: now[0])
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert limiter.wait_time() == pytest.approx(5)
+    now[0] = 5
+    assert limiter.try_acquire()
+
+
+def test_build_notifier():
+    """測試依設定建立輸出端"""
+    notifier = build_notifier({"notifications": {"sinks": ["log", "webhook", "unknown"]}})
+    assert [s.name for s in notifier.sinks] == ['log']
@@ -0,0 +1,88 @@
+import json
+import socket
+import time
+import psutil
+from src.services.preflight import configured_heap, parse_xmx, run_preflight
+from src.services.registry import ServerRegistry
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('', 0))
+        return sock.getsockname()[1]
+
+
+def make_registry(tmp_path, folders, script="start.sh", content="java -Xmx2G -jar server.jar nogui\n"):
+    paths = []
+    for folder_name in folders:
+        folder = tmp_path / folder_name
+        folder.mkdir(exist_ok=True)
+        (folder / script).write_text(content, encoding="utf-8")
+        paths.append({"path": str(folder / script)})
+    servers = tmp_path / "servers.json"
+    servers.write_text(json.dumps({"servers": paths}), encoding="utf-8")
+    registry = ServerRegistry(servers)
+    registry.refresh()
+    return registry
+
+
+def test_parse_xmx():
+    """測試 -Xmx 單位換算，多個設定時以最後一個為準"""
+    assert parse_xmx("java -Xms1G -Xmx4G -jar server.jar") == 4 * 1024 ** 3
+    assert parse_xmx("java -Xmx512m -Xmx1024M -jar server.jar") == 1024 * 1024 ** 2
+    assert parse_xmx("java -jar server.jar") is None
+
+
+def test_heap_from_user_jvm_args(tmp_path):
+    """測試 Forge 的 user_jvm_args.txt"""
+    registry = make_registry(tmp_path, ["forge_1.20.1_25565_forge"], content="java @user_jvm_args.txt\n")
+    info = registry.all()[0]
+    (tmp_path / "forge_1.20.1_25565_forge" / "user_jvm_args.txt").write_text("-Xmx6G\n", encoding="utf-8")
+    assert configured_heap(info) == 6 * 1024 ** 3
+
+
+def test_all_checks_pass_quickly(tmp_path):
+    """測試正常情況下檢查通過，且在毫秒等級完成"""
+    port = free_port()
+    registry = make_registry(tmp_path, [f"sky_1.21.4_{port}_fabric"], content="java -Xmx1M -jar server.jar\n")
+    start = time.perf_counter()
+    result = run_preflight(registry.all()[0], registry)
+    assert time.perf_counter() - start < 0.5
+    assert result.ok and result.warnings == []
+    assert result.heap == 1024 ** 2
+
+
+def test_port_conflict_and_duplicate(tmp_path):
+    """測試端口已被佔用，以及清單中有重複端口"""
+    with socket.socket() as listener:
+        listener.bind(('', 0))
+        listener.listen()
+        port = listener.getsockname()[1]
+        registry = make_registry(tmp_path, [f"sky_1.21.4_{port}_fabric", f"skycopy_1.21.4_{port}_fabric"])
+        result = run_preflight(registry.get("sky", "1.21.4"), registry)
+
+    assert not result.ok
+    assert any(f"端口 {port} 已被佔用" in error for error in result.errors)
+    assert any("skycopy_1.21.4" in warning for warning in result.warnings)
+
+
+def test_insufficient_memory(tmp_path):
+    """測試 -Xmx 超過可用記憶體"""
+    huge = psutil.virtual_memory().total // 1024 ** 3 + 64
+    registry = make_registry(tmp_path, [f"big_1.21.4_{free_port()}_paper"],
+                             content=f"java -Xmx{huge}G -jar paper.jar\n")
+    result = run_preflight(registry.all()[0], registry)
+    assert not result.ok
+    assert "可用記憶體不足" in result.errors[0]
+
+
+def test_properties_port_mismatch(tmp_path):
+    """測試 server.properties 與資料夾端口不一致時提示"""
+    port = free_port()
+    registry = make_registry(tmp_path, [f"sky_1.21.4_{port}_fabric"])
+    (tmp_path / f"sky_1.21.4_{port}_fabric" / "server.properties").write_text(
+        "server-port=25565\n", encoding="utf-8"
+    )
+    result = run_preflight(registry.all()[0], registry)
+    assert result.ok
+    assert any("server-port=25565" in warning for warning in result.warnings)
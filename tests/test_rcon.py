@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from src.services.rcon import RconAuthError, RconClient, RconError, RconPool, read_server_properties
+from src.services.registry import parse_server_info
+from src.services.shutdown import rcon_stop
+from tests.mocks.fake_rcon import FakeRconServer
+
+
+@pytest.mark.asyncio
+async def test_command_and_connection_reuse():
+    """測試指令執行並重複使用同一條連線"""
+    async with FakeRconServer(handlers={"list": "There are 0 of a max of 20 players online: "}) as server:
+        client = RconClient('127.0.0.1', server.port, 'secret')
+        for _ in range(5):
+            assert (await client.command("list")).startswith("There are 0")
+        await client.close()
+
+    assert server.connections == 1
+    assert server.commands == ["list"] * 5
+
+
+@pytest.mark.asyncio
+async def test_wrong_password():
+    """測試密碼錯誤"""
+    async with FakeRconServer() as server:
+        client = RconClient('127.0.0.1', server.port, 'wrong')
+        with pytest.raises(RconAuthError):
+            await client.command("list")
+
+
+@pytest.mark.asyncio
+async def test_fragmented_response_is_reassembled():
+    """測試超過 4096 位元組的回應被正確重組"""
+    long_text = "".join(f"line {i}\n" for i in range(2000))
+    async with FakeRconServer(handlers={"help": long_text}) as server:
+        client = RconClient('127.0.0.1', server.port, 'secret')
+        assert await client.command("help") == long_text
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_pipelined_commands():
+    """測試同時送出多個指令時各自取得正確回應"""
+    handlers = {"echo": lambda cmd: cmd.split(' ', 1)[1] * 1500}
+    async with FakeRconServer(handlers=handlers) as server:
+        client = RconClient('127.0.0.1', server.port, 'secret')
+        results = await asyncio.gather(*(client.command(f"echo {c}") for c in "abcdefgh"))
+        await client.close()
+
+    assert results == [c * 1500 for c in "abcdefgh"]
+    assert server.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_reconnects_after_server_restart(tmp_path):
+    """測試連線中斷後自動重連"""
+    async with FakeRconServer(handlers={"say": ""}) as server:
+        folder = tmp_path / "sky_1.21.4_25560_fabric"
+        folder.mkdir()
+        (folder / "server.properties").write_text(
+            f"enable-rcon=true\nrcon.port={server.port}\nrcon.password=secret\n", encoding='utf-8'
+        )
+        info = parse_server_info(str(folder / "StartServer.bat"))
+        pool = RconPool()
+
+        await pool.command(info, "say hi")
+        server.drop_connections()
+        await asyncio.sleep(0.05)
+        await pool.command(info, "say again")
+        await pool.close()
+
+    assert server.connections == 2
+    assert server.commands == ["say hi", "say again"]
+
+
+@pytest.mark.asyncio
+async def test_pool_rcon_disabled(tmp_path):
+    """測試未啟用 RCON 的伺服器"""
+    folder = tmp_path / "sky_1.21.4_25560_fabric"
+    folder.mkdir()
+    (folder / "server.properties").write_text("enable-rcon=false\n", encoding='utf-8')
+    with pytest.raises(RconError):
+        await RconPool().command(parse_server_info(str(folder / "StartServer.bat")), "list")
+
+
+def test_read_server_properties(tmp_path):
+    """測試 server.properties 解析"""
+    (tmp_path / "server.properties").write_text(
+        "#Minecraft server properties\nmotd=A=B\nrcon.port=25575\n", encoding='utf-8'
+    )
+    assert read_server_properties(tmp_path) == {"motd": "A=B", "rcon.port": "25575"}
+
+
+@pytest.mark.asyncio
+async def test_rcon_stop_waits_for_slow_flush(tmp_path):
+    """測試 save-all flush 使用較長的逾時；存檔逾時仍會送出 stop"""
+    handlers = {"save-all": "Saved the game", "stop": "Stopping the server"}
+    async with FakeRconServer(handlers=handlers, delays={"save-all": 0.3}) as server:
+        folder = tmp_path / "sky_1.21.4_25560_fabric"
+        folder.mkdir()
+        (folder / "server.properties").write_text(
+            f"enable-rcon=true\nrcon.port={server.port}\nrcon.password=secret\n", encoding='utf-8'
+        )
+        info = parse_server_info(str(folder / "StartServer.bat"))
+
+        # 一般指令逾時 0.1 秒，存檔仍能等到完成
+        await rcon_stop(RconPool(timeout=0.1), info, flush_timeout=2)
+        assert server.commands == ["save-all flush", "stop"]
+
+        # 存檔逾時：不拋出錯誤，照樣送出 stop
+        server.commands.clear()
+        await rcon_stop(RconPool(timeout=1), info, flush_timeout=0.1)
+        assert server.commands == ["save-all flush", "stop"]
@@ -0,0 +1,88 @@
+import sys
+import textwrap
+import pytest
+from src.services.readiness import FAILED, LOADING, READY, TIMEOUT, StartupHistory, wait_until_ready
+from src.services.supervisor import LaunchSpec, ProcessSupervisor
+from tests.mocks.fake_slp import FakeSLPServer
+
+# 模擬伺服器載入：先輸出載入訊息，再輸出 Done，之後等待 stop
+LOADING_SERVER = textwrap.dedent("""
+    import sys, time
+    print("[12:00:00] [Server thread/INFO]: Preparing level \\"world\\"", flush=True)
+    time.sleep(0.3)
+    print("[12:00:01] [Server thread/INFO]: Done (0.3s)! For help, type \\"help\\"", flush=True)
+    for line in sys.stdin:
+        if line.strip() == "stop":
+            break
+""")
+
+SILENT_SERVER = textwrap.dedent("""
+    import sys
+    for line in sys.stdin:
+        if line.strip() == "stop":
+            break
+""")
+
+
+async def start(tmp_path, name, source, port=None):
+    script = tmp_path / f"{name}.py"
+    script.write_text(source, encoding="utf-8")
+    supervisor = ProcessSupervisor()
+    managed = await supervisor.start(LaunchSpec(name, [sys.executable, str(script)], tmp_path, port=port))
+    return supervisor, managed
+
+
+@pytest.mark.asyncio
+async def test_ready_from_done_line(tmp_path):
+    """測試主控台出現 Done 時判定就緒，並依序經過各階段"""
+    supervisor, managed = await start(tmp_path, "loader", LOADING_SERVER)
+    stages = []
+    result = await wait_until_ready(managed, timeout=10, on_stage=stages.append)
+
+    assert result.stage == READY and result.source == "log"
+    assert result.reported == 0.3
+    assert stages == [LOADING, READY]
+    await supervisor.shutdown(stop_timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_ready_from_slp_probe(tmp_path):
+    """測試沒有 Done 訊息時以 SLP 查詢判定就緒"""
+    async with FakeSLPServer() as server:
+        supervisor, managed = await start(tmp_path, "silent", SILENT_SERVER, port=server.port)
+        result = await wait_until_ready(managed, timeout=10, probe_interval=0.1)
+        assert result.stage == READY and result.source == "slp"
+        await supervisor.shutdown(stop_timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_exit_before_ready(tmp_path):
+    """測試程序在就緒前結束"""
+    _, managed = await start(tmp_path, "crash", "import sys; print('boom'); sys.exit(2)")
+    result = await wait_until_ready(managed, timeout=10)
+    assert result.stage == FAILED and result.returncode == 2
+
+
+@pytest.mark.asyncio
+async def test_timeout(tmp_path):
+    """測試逾時仍未就緒"""
+    supervisor, managed = await start(tmp_path, "silent", SILENT_SERVER)
+    result = await wait_until_ready(managed, timeout=0.3)
+    assert result.stage == TIMEOUT
+    await supervisor.shutdown(stop_timeout=5)
+
+
+def test_startup_history(tmp_path):
+    """測試啟動紀錄保留筆數與變慢判斷"""
+    path = tmp_path / "history.json"
+    history = StartupHistory(str(path), size=3)
+    assert history.record("sky", "1.21.4", 30) is None
+    for seconds in (32, 34, 36):
+        history.record("sky", "1.21.4", seconds, "log")
+
+    reloaded = StartupHistory(str(path), size=3)
+    assert [e["seconds"] for e in reloaded.entries("sky", "1.21.4")] == [32, 34, 36]
+    baseline = reloaded.median("sky", "1.21.4")
+    assert baseline == 34
+    assert StartupHistory.is_regression(60, baseline)
+    assert not StartupHistory.is_regression(40, baseline)
@@ -0,0 +1,35 @@
+import struct
+from src.services.region import CHUNK_COUNT, HEADER_SIZE, SECTOR_SIZE, RegionHeader, read_header
+
+
+def test_header_parsing(tmp_path):
+    """測試位置表與時間戳解析，chunk 依檔案位置排序並截斷在檔案結尾"""
+    header = bytearray(HEADER_SIZE)
+    struct.pack_into('>I', header, 0, (5 << 8) | 2)            # (0, 0)
+    struct.pack_into('>I', header, 33 * 4, (2 << 8) | 1)       # (1, 1)
+    struct.pack_into('>I', header, 1023 * 4, (7 << 8) | 4)     # 延伸超過檔案結尾
+    struct.pack_into('>I', header, SECTOR_SIZE, 1700000000)
+    path = tmp_path / "r.0.0.mca"
+    path.write_bytes(bytes(header) + bytes(6 * SECTOR_SIZE))
+
+    with open(path, 'rb') as f:
+        raw, parsed = read_header(f)
+    assert raw == bytes(header)
+    assert len(parsed.locations) == len(parsed.timestamps) == CHUNK_COUNT
+
+    chunks = parsed.chunks(size=8 * SECTOR_SIZE)
+    assert [(c.x, c.z, c.offset, c.length) for c in chunks] == [
+        (1, 1, 2 * SECTOR_SIZE, SECTOR_SIZE),
+        (0, 0, 5 * SECTOR_SIZE, 2 * SECTOR_SIZE),
+        (31, 31, 7 * SECTOR_SIZE, SECTOR_SIZE),
+    ]
+    assert chunks[1].timestamp == 1700000000
+
+
+def test_short_file_has_no_header(tmp_path):
+    """測試空的或不完整的區域檔"""
+    path = tmp_path / "r.0.0.mca"
+    path.write_bytes(b"")
+    with open(path, 'rb') as f:
+        assert read_header(f) is None
+    assert RegionHeader.from_buffer(bytes(HEADER_SIZE)).chunks() == []
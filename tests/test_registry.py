@@ -0,0 +1,79 @@
+import json
+import os
+import pytest
+from src.services.registry import ServerRegistry, parse_server_info
+
+
+def write_servers(path, server_paths):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"servers": [{"path": p} for p in server_paths]}, f)
+
+
+@pytest.fixture
+def servers_file(tmp_path):
+    path = tmp_path / "servers.json"
+    write_servers(path, [
+        "/mc/skyworld_1.21.4_25560_fabric/StartServer.bat",
+        "/mc/skyworld_1.20_25561_vanilla/StartServer.bat",
+        "/mc/creative_1.21.4_25562_paper/start.sh",
+        "/mc/壞掉的資料夾/StartServer.bat",
+    ])
+    return path
+
+
+def test_parse_server_info():
+    """測試路徑解析"""
+    info = parse_server_info("/mc/生存伺服器_1.20_25561_fabric/StartServer.bat")
+    assert info.name == "生存伺服器"
+    assert info.version == "1.20"
+    assert info.port == 25561
+    assert info.core == "fabric"
+    assert info.script == "StartServer.bat"
+
+    with pytest.raises(ValueError):
+        parse_server_info("/mc/no_version/StartServer.bat")
+
+
+def test_registry_indexes(servers_file):
+    """測試各索引查詢"""
+    registry = ServerRegistry(servers_file)
+    assert registry.refresh() is True
+
+    assert len(registry) == 3
+    assert len(registry.errors) == 1
+    assert [s.version for s in registry.get("skyworld")] == ["1.21.4", "1.20"]
+    assert registry.get("skyworld", "1.20").port == 25561
+    assert registry.get("skyworld", "9.9") is None
+    assert registry.by_port(25562)[0].name == "creative"
+    assert "/mc/creative_1.21.4_25562_paper/start.sh" in registry
+
+
+def test_registry_reloads_only_on_change(servers_file):
+    """測試只在檔案變更時重新載入"""
+    registry = ServerRegistry(servers_file)
+    assert registry.refresh() is True
+    assert registry.refresh() is False
+
+    write_servers(servers_file, ["/mc/new_1.21_25570_fabric/StartServer.bat"])
+    st = os.stat(servers_file)
+    os.utime(servers_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert registry.refresh() is True
+    assert [s.name for s in registry] == ["new"]
+
+
+def test_registry_missing_file(tmp_path):
+    """測試檔案不存在時回傳空清單"""
+    registry = ServerRegistry(tmp_path / "missing.json")
+    registry.refresh()
+    assert len(registry) == 0
+
+
+@pytest.mark.asyncio
+async def test_registry_ensure_fresh(servers_file):
+    """測試非同步載入"""
+    registry = ServerRegistry(servers_file)
+    assert await registry.ensure_fresh() is True
+    assert await registry.ensure_fresh() is False
+    registry.invalidate()
+    assert await registry.ensure_fresh() is True
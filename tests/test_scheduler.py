@@ -0,0 +1,112 @@
+import asyncio
+import time
+import pytest
+from src.services.activity import ActivityTracker
+from src.services.registry import ServerInfo
+from src.services.scheduler import GB, LaunchCancelled, LaunchScheduler
+
+
+class FakeSupervisor:
+    """只記錄運行中名稱的 supervisor"""
+
+    def __init__(self):
+        self.names = set()
+        self.stopped = []
+
+    def running(self):
+        return {name: None for name in self.names}
+
+    def is_running(self, name):
+        return name in self.names
+
+    async def stop(self, name):
+        self.stopped.append(name)
+        self.names.discard(name)
+
+
+def info(name):
+    return ServerInfo(name, "1.21.4", 25565, "fabric", f"/mc/{name}", "start.sh", f"/mc/{name}/start.sh")
+
+
+def launch(scheduler, supervisor, ticket):
+    """模擬 StartServer：核准後建立程序"""
+    supervisor.names.add(ticket.name)
+    scheduler.started(ticket)
+
+
+@pytest.mark.asyncio
+async def test_fifo_queue_with_running_cap():
+    """測試超過同時運行上限時依序排隊"""
+    supervisor = FakeSupervisor()
+    scheduler = LaunchScheduler(supervisor, max_running=2)
+
+    tickets = [scheduler.request(info(name)) for name in "abcd"]
+    assert [t.granted for t in tickets] == [True, True, False, False]
+    for ticket in tickets[:2]:
+        launch(scheduler, supervisor, ticket)
+    assert scheduler.position(tickets[2]) == 1 and scheduler.position(tickets[3]) == 2
+
+    supervisor.names.discard("a")
+    scheduler.release("a")
+    await asyncio.wait_for(tickets[2].wait(), 1)
+    assert tickets[2].granted and not tickets[3].granted
+    assert scheduler.position(tickets[3]) == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_budget_blocks_queue_head():
+    """測試 heap 預算；隊首放不下時後面較小的請求也要等 (不插隊)"""
+    supervisor = FakeSupervisor()
+    scheduler = LaunchScheduler(supervisor, memory_budget=8 * GB)
+
+    big = scheduler.request(info("big"), 6 * GB)
+    launch(scheduler, supervisor, big)
+    huge = scheduler.request(info("huge"), 4 * GB)
+    small = scheduler.request(info("small"), 1 * GB)
+    assert not huge.granted and not small.granted
+
+    with pytest.raises(ValueError):
+        scheduler.request(info("giant"), 16 * GB)
+
+    supervisor.names.discard("big")
+    scheduler.release("big")
+    assert huge.granted and small.granted
+
+
+@pytest.mark.asyncio
+async def test_cancel():
+    """測試取消排隊中的請求"""
+    supervisor = FakeSupervisor()
+    scheduler = LaunchScheduler(supervisor, max_running=1)
+    launch(scheduler, supervisor, scheduler.request(info("a")))
+    waiting = scheduler.request(info("b"))
+    assert scheduler.pending("b")
+
+    task = asyncio.create_task(waiting.wait())
+    await asyncio.sleep(0)
+    assert scheduler.cancel(waiting)
+    with pytest.raises(LaunchCancelled):
+        await task
+    assert not scheduler.pending("b") and not scheduler.cancel(waiting)
+
+
+@pytest.mark.asyncio
+async def test_idle_eviction_frees_capacity():
+    """測試有人排隊時停止閒置最久的伺服器"""
+    supervisor = FakeSupervisor()
+    activity = ActivityTracker(supervisor)
+    scheduler = LaunchScheduler(supervisor, max_running=2, idle_evict=600, activity=activity)
+    for name in ("busy", "idle"):
+        launch(scheduler, supervisor, scheduler.request(info(name)))
+    now = time.time()
+    activity.record("busy", 3, now=now - 3600)
+    activity.record("idle", 0, now=now - 300)
+
+    waiting = scheduler.request(info("next"))
+    assert scheduler.eviction_candidates() == []  # 尚未閒置滿 10 分鐘
+
+    activity.forget("idle")
+    activity.record("idle", 0, now=now - 900)
+    assert await scheduler.evict_idle() == ["idle"]
+    assert supervisor.stopped == ["idle"]
+    assert waiting.granted
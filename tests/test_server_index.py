@@ -0,0 +1,74 @@
+from src.services.registry import parse_server_info
+from src.services.server_index import ServerIndex
+
+
+def make_index(*folders):
+    return ServerIndex([parse_server_info(f"/mc/{f}/StartServer.bat") for f in folders])
+
+
+def test_exact_beats_prefix_and_substring():
+    """測試精確比對優先於前綴與子字串"""
+    index = make_index(
+        "sky_1.21.4_25560_fabric",
+        "skyworld_1.21.4_25561_fabric",
+        "bigsky_1.21.4_25562_fabric",
+    )
+    result = index.lookup("sky", "1.21.4")
+    assert [s.name for s in result.matches] == ["sky"]
+    assert [s.name for s in result.candidates] == ["sky", "skyworld", "bigsky"]
+
+
+def test_prefix_and_substring_match():
+    """測試前綴與子字串比對"""
+    index = make_index("skyworld_1.21.4_25561_fabric", "bigcreative_1.20.1_25562_paper")
+    assert index.lookup("skyw", "1.21.4").unique.name == "skyworld"
+    assert index.lookup("SKYW", "1.21.4").unique.name == "skyworld"
+    assert index.lookup("creat", "1.20.1").unique.name == "bigcreative"
+
+
+def test_version_prefix():
+    """測試版本前綴只在「.」邊界成立，且精確版本優先"""
+    index = make_index(
+        "sky_1.21_25560_fabric",
+        "sky_1.21.4_25561_fabric",
+        "sky_1.210_25562_fabric",
+    )
+    assert index.lookup("sky", "1.21").unique.version == "1.21"
+
+    index = make_index("sky_1.21.4_25561_fabric", "sky_1.210_25562_fabric")
+    assert index.lookup("sky", "1.21").unique.version == "1.21.4"
+
+
+def test_ambiguous_matches_are_sorted():
+    """測試模稜兩可時回傳穩定排序的候選"""
+    index = make_index("sky_b_1.20.1_25561_fabric", "sky_a_1.20.1_25560_fabric")
+    result = index.lookup("sky", "1.20.1")
+    assert result.unique is None
+    assert [s.name for s in result.matches] == ["sky_a", "sky_b"]
+
+
+def test_suggestions():
+    """測試「你是不是要找」建議"""
+    index = make_index(
+        "skyworld_1.21.4_25561_fabric",
+        "skyworld_1.20.1_25562_fabric",
+        "creative_1.21.4_25563_paper",
+    )
+    # 名稱正確但版本不存在
+    result = index.lookup("skyworld", "1.19")
+    assert result.matches == []
+    assert result.suggestions == ["skyworld_1.21.4", "skyworld_1.20.1"]
+
+    # 名稱拼錯
+    result = index.lookup("skywrld", "1.21.4")
+    assert result.suggestions[0] == "skyworld_1.21.4"
+    assert result.suggestions == index.lookup("skywrld", "1.21.4").suggestions
+
+
+def test_resolve_name_or_name_version():
+    """測試同時接受「名稱」與「名稱_版本」輸入"""
+    index = make_index("skywind_empire2_1.21.4_25560_fabric", "skywind_empire2_1.20.1_25561_fabric")
+    assert index.resolve("skywind_empire2_1.20.1").unique.port == 25561
+    assert index.resolve("skywind_empire2_1.21").unique.port == 25560
+    assert index.resolve("skywind_empire2").unique is None
+    assert len(index.resolve("skywind_empire2").matches) == 2
@@ -0,0 +1,97 @@
+import os
+import random
+import string
+import pytest
+from src.services.server_path import ServerInfo, ServerPathParser, compile_folder_pattern, configure_parser
+
+# 名稱可包含底線、數字甚至看起來像版本的片段
+NAME_CHARS = string.ascii_lowercase + string.digits + "_-" + "生存島"
+CORES = ["fabric", "forge", "paper", "vanilla", "neo_forge"]
+
+
+def random_version(rng):
+    major, minor, patch = 1, rng.randint(0, 30), rng.randint(0, 9)
+    release = f"{major}.{minor}" if rng.random() < 0.3 else f"{major}.{minor}.{patch}"
+    kind = rng.choice(["release", "prerelease", "snapshot"])
+    if kind == "prerelease":
+        return kind, f"{release}-{rng.choice(['pre', 'rc'])}{rng.randint(1, 9)}"
+    if kind == "snapshot":
+        return kind, f"{rng.randint(10, 99)}w{rng.randint(1, 52):02d}{rng.choice('abcde')}"
+    return kind, release
+
+
+def random_name(rng):
+    name = "".join(rng.choice(NAME_CHARS) for _ in range(rng.randint(1, 16))).strip("_")
+    return name or "x"
+
+
+def test_round_trip_property():
+    """性質測試：任意 名稱_版本_端口_核心 組合解析後都能還原各欄位"""
+    rng = random.Random(5487)
+    parser = ServerPathParser()
+    for _ in range(3000):
+        name, (_, version), core = random_name(rng), random_version(rng), rng.choice(CORES)
+        port = rng.randint(1, 65535)
+        folder = os.path.join("/mc", f"{name}_{version}_{port}_{core}")
+        path = os.path.join(folder, "StartServer.bat")
+        info = parser.parse(path)
+        # 名稱本身含有「_版本_數字_」片段時會以最短的名稱解析，只檢查可辨識的情況
+        if info.name != name:
+            assert f"{info.name}_{info.version}_{info.port}_{info.core}" == f"{name}_{version}_{port}_{core}"
+            continue
+        assert info == ServerInfo(name, version, port, core, folder, "StartServer.bat", path)
+
+
+def test_disabled_kinds_are_rejected():
+    """性質測試：未啟用的版本格式一律無法解析"""
+    rng = random.Random(5488)
+    parser = ServerPathParser(versions=["release"])
+    for _ in range(500):
+        kind, version = random_version(rng)
+        path = f"/mc/server_{version}_25565_fabric/StartServer.bat"
+        if kind == "release":
+            assert parser.parse(path).version == version
+        else:
+            with pytest.raises(ValueError):
+                parser.parse(path)
+
+
+@pytest.mark.parametrize("folder", [
+    "no_version",
+    "server_1_25565_fabric",
+    "server_1.21._25565_fabric",
+    "server_1.21.4_99999_fabric",
+    "server_1.21.4_0_fabric",
+    "server_1.21.4_port_fabric",
+    "_1.21.4_25565_fabric",
+])
+def test_invalid_folders(folder):
+    with pytest.raises(ValueError):
+        ServerPathParser().parse(f"/mc/{folder}/StartServer.bat")
+
+
+def test_results_are_cached_and_immutable():
+    """測試同一路徑只解析一次，結果不可修改"""
+    parser = ServerPathParser()
+    first = parser.parse("/mc/sky_24w14a_25565_fabric/start.sh")
+    assert parser.parse("/mc/sky_24w14a_25565_fabric/start.sh") is first
+    assert parser.cache_info().hits == 1
+    with pytest.raises(AttributeError):
+        first.port = 1
+    assert not hasattr(first, "__dict__")
+
+
+def test_custom_patterns_and_configuration():
+    """測試以正規表示式擴充版本格式，以及設定預設解析器"""
+    parser = ServerPathParser(versions=["release", r"b\d+\.\d+"])
+    assert parser.parse("/mc/old_b1.7_25565_vanilla/run.sh").version == "b1.7"
+    with pytest.raises(ValueError):
+        compile_folder_pattern(["release", "("])
+    with pytest.raises(ValueError):
+        compile_folder_pattern([])
+
+    try:
+        assert configure_parser(["release"]).versions == ("release",)
+        assert configure_parser(["release"]) is configure_parser(["release"])
+    finally:
+        configure_parser()
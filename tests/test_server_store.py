@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import pytest
+from src.services import server_store
+from src.services.registry import ServerRegistry
+from src.services.server_store import ServerStore, ServerStoreError, journal_path, load_entries
+
+
+def server_path(i):
+    return f"/mc/server{i}_1.21.4_{25560 + i}_fabric/StartServer.bat"
+
+
+@pytest.fixture
+def servers_file(tmp_path):
+    path = tmp_path / "servers.json"
+    path.write_text(json.dumps({"servers": [{"path": server_path(0)}], "note": "keep"}), encoding="utf-8")
+    return path
+
+
+def read_servers(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_adds_are_not_lost(servers_file):
+    """測試同時多個新增不會互相覆蓋，且每次只追加日誌"""
+    store = ServerStore(servers_file, compact_after=1000)
+    results = await asyncio.gather(*(store.add(server_path(i)) for i in range(1, 41)))
+    assert all(len(added) == 1 for added in results)
+    assert await store.add(server_path(0), server_path(1)) == []
+
+    # servers.json 尚未改寫，變更都在日誌中
+    assert len(read_servers(servers_file)["servers"]) == 1
+    with open(journal_path(servers_file), encoding="utf-8") as f:
+        assert len(f.readlines()) == 40
+    assert len(load_entries(servers_file)) == 41
+
+
+@pytest.mark.asyncio
+async def test_compaction_rewrites_file_and_clears_journal(servers_file):
+    """測試日誌累積到門檻時合併回 servers.json，並保留其他欄位"""
+    store = ServerStore(servers_file, compact_after=5)
+    await store.add(*(server_path(i) for i in range(1, 4)))
+    await store.remove(server_path(0))
+    assert os.path.getsize(journal_path(servers_file)) > 0
+
+    await store.add(server_path(4))
+    data = read_servers(servers_file)
+    assert [entry["path"] for entry in data["servers"]] == [server_path(i) for i in range(1, 5)]
+    assert data["note"] == "keep"
+    assert os.path.getsize(journal_path(servers_file)) == 0
+    assert not os.path.exists(f"{servers_file}.tmp")
+
+
+@pytest.mark.asyncio
+async def test_registry_replays_journal(servers_file):
+    """測試伺服器清單載入時會套用尚未合併的日誌"""
+    registry = ServerRegistry(servers_file)
+    await registry.ensure_fresh()
+    assert len(registry) == 1
+
+    await registry.store.add(server_path(1))
+    assert await registry.ensure_fresh() is True
+    assert registry.get("server1", "1.21.4").port == 25561
+    assert await registry.ensure_fresh() is False
+
+
+@pytest.mark.asyncio
+async def test_recover_ignores_torn_tail(servers_file):
+    """測試當機留下的不完整日誌行被略過，其餘操作在啟動時合併"""
+    with open(journal_path(servers_file), 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"op": "add", "path": server_path(1)}) + "\n")
+        f.write(json.dumps({"op": "remove", "path": server_path(0)}) + "\n")
+        f.write('{"op": "add", "pa')
+
+    store = ServerStore(servers_file)
+    assert await store.recover() == 2
+    assert [entry["path"] for entry in read_servers(servers_file)["servers"]] == [server_path(1)]
+    assert await store.recover() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_write_keeps_original(servers_file, monkeypatch):
+    """測試合併時改名失敗，原本的 servers.json 不受影響且新增仍保留在日誌中"""
+    store = ServerStore(servers_file, compact_after=1)
+    original = servers_file.read_text(encoding="utf-8")
+
+    def broken_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(server_store.os, "replace", broken_replace)
+    assert await store.add(server_path(1)) == [server_path(1)]
+    assert servers_file.read_text(encoding="utf-8") == original
+    assert not os.path.exists(f"{servers_file}.tmp")
+    monkeypatch.undo()
+
+    assert server_path(1) in load_entries(servers_file)
+    assert await store.recover() == 1
+    assert len(read_servers(servers_file)["servers"]) == 2
+
+
+def test_corrupted_file_is_reported(tmp_path):
+    path = tmp_path / "servers.json"
+    path.write_text("{", encoding="utf-8")
+    with pytest.raises(ServerStoreError):
+        load_entries(path)
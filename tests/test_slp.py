@@ -0,0 +1,67 @@
+import asyncio
+import socket
+import time
+import pytest
+from src.services.slp import decode_varint, encode_varint, flatten_motd, query_many, query_status
+from tests.mocks.fake_slp import FakeSLPServer
+
+
+def unused_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_varint_roundtrip():
+    """測試 VarInt 編解碼"""
+    for value in (0, 1, 127, 128, 255, 25565, 2147483647, -1):
+        assert decode_varint(encode_varint(value)) == (value, len(encode_varint(value)))
+    assert encode_varint(-1) == b'\xff\xff\xff\xff\x0f'
+
+
+def test_flatten_motd():
+    """測試聊天元件 MOTD 轉純文字"""
+    description = {"text": "§aHello ", "extra": [{"text": "World"}, "!"]}
+    assert flatten_motd(description) == "Hello World!"
+
+
+@pytest.mark.asyncio
+async def test_query_status():
+    """測試查詢假伺服器狀態"""
+    async with FakeSLPServer(motd="§6skyworld", online=3, max_players=10) as server:
+        status = await query_status('127.0.0.1', server.port)
+
+    assert status.online
+    assert status.motd == "skyworld"
+    assert (status.players_online, status.players_max) == (3, 10)
+    assert status.version == "1.21.4" and status.protocol == 769
+    assert status.latency_ms is not None
+    assert server.handshakes[0][1:] == ('127.0.0.1', server.port, 1)
+
+
+@pytest.mark.asyncio
+async def test_query_offline():
+    """測試連線被拒時回傳離線"""
+    status = await query_status('127.0.0.1', unused_port(), timeout=1)
+    assert not status.online
+    assert status.error
+
+
+@pytest.mark.asyncio
+async def test_query_many_parallel_with_own_timeouts():
+    """測試平行查詢，慢的伺服器只影響自己"""
+    fast = await FakeSLPServer(online=1).start()
+    slow = await FakeSLPServer(delay=5).start()
+    dead = unused_port()
+    try:
+        start = time.perf_counter()
+        results = await query_many([fast.port, slow.port, dead], timeout=0.5)
+        elapsed = time.perf_counter() - start
+    finally:
+        await fast.stop()
+        await slow.stop()
+
+    assert elapsed < 1.5
+    assert results[fast.port].online and results[fast.port].players_online == 1
+    assert not results[slow.port].online and results[slow.port].error == '逾時'
+    assert not results[dead].online
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import socket
+import pytest
+from src.services.idle import IdleManager
+from src.services.registry import ServerRegistry
+from src.services.status import RUNNING, SLEEPING, STOPPED, StatusCollector, StatusSnapshot, server_state
+from tests.mocks.fake_slp import FakeSLPServer
+
+
+def make_registry(tmp_path, ports):
+    path = tmp_path / "servers.json"
+    path.write_text(json.dumps({"servers": [
+        {"path": f"/mc/s{port}_1.21.4_{port}_fabric/StartServer.bat"} for port in ports
+    ]}), encoding='utf-8')
+    return ServerRegistry(path)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refresh_is_single_flight(tmp_path):
+    """測試同時多個刷新請求只查詢一次"""
+    async with FakeSLPServer(online=2, delay=0.1) as server:
+        collector = StatusCollector(make_registry(tmp_path, [server.port]))
+        snapshots = await asyncio.gather(*(collector.refresh() for _ in range(10)))
+
+    assert collector.probe_count == 1
+    assert len(server.handshakes) == 1
+    assert all(s is snapshots[0] for s in snapshots)
+    assert snapshots[0].get(server.port).players_online == 2
+
+
+@pytest.mark.asyncio
+async def test_get_serves_cached_snapshot(tmp_path):
+    """測試快照未過期時直接回傳，不重新查詢"""
+    async with FakeSLPServer() as server:
+        collector = StatusCollector(make_registry(tmp_path, [server.port]), interval=60)
+        first = await collector.get()
+        for _ in range(20):
+            assert await collector.get([server.port]) is first
+        assert collector.probe_count == 1
+
+        # 查詢清單中不存在的端口時才刷新
+        await collector.get([server.port, 1])
+        assert collector.probe_count == 2
+
+
+@pytest.mark.asyncio
+async def test_force_refresh_cooldown(tmp_path):
+    """測試 --fresh 冷卻時間"""
+    async with FakeSLPServer() as server:
+        collector = StatusCollector(make_registry(tmp_path, [server.port]), cooldown=30)
+        _, remaining = await collector.force_refresh()
+        assert remaining == 0
+        _, remaining = await collector.force_refresh()
+        assert 0 < remaining <= 30
+        assert collector.probe_count == 1
+
+
+@pytest.mark.asyncio
+async def test_background_refresh(tmp_path):
+    """測試背景定時刷新"""
+    async with FakeSLPServer() as server:
+        collector = StatusCollector(make_registry(tmp_path, [server.port]), interval=0.05)
+        collector.start()
+        await asyncio.sleep(0.3)
+        await collector.stop()
+
+    assert collector.probe_count >= 3
+    assert collector.snapshot.age < 1
+
+
+class IdleSupervisor:
+    def running(self):
+        return {}
+
+    def is_running(self, name):
+        return False
+
+    async def stop(self, name):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_sleeping_listener_is_not_reported_running(tmp_path):
+    """測試休眠監聽回應的狀態查詢不會被當成伺服器運行中"""
+    with socket.socket() as sock:
+        sock.bind(('', 0))
+        port = sock.getsockname()[1]
+    registry = make_registry(tmp_path, [port])
+    registry.refresh()
+    idle = IdleManager(IdleSupervisor(), registry, wake_server=lambda info: None,
+                       wake_on_join=True, host='127.0.0.1')
+    await idle.sync()
+    try:
+        snapshot = await StatusCollector(registry).refresh()
+        info = registry.all()[0]
+        # 監聽本身會回應 SLP
+        assert snapshot.get(port).online
+        assert server_state(info, snapshot)[0] == RUNNING
+
+        state, slp = server_state(info, snapshot, IdleSupervisor(), set(idle.listeners))
+        assert state == SLEEPING and slp is None
+    finally:
+        await idle.stop()
+    assert server_state(info, StatusSnapshot({}), IdleSupervisor())[0] == STOPPED
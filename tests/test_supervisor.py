@@ -0,0 +1,291 @@
+import asyncio
+import json
+import os
+import socket
+import sys
+import textwrap
+import pytest
+import psutil
+from src.services.rcon import RconPool
+from src.services.registry import parse_server_info
+from src.services.shutdown import graceful_stop, server_stopper
+from src.services.supervisor import (
+    LaunchSpec, ProcessSupervisor, build_command, find_listening_pid, read_state, reconcile_state
+)
+from tests.mocks.fake_rcon import FakeRconServer
+
+# 模擬伺服器：記錄收到的主控台指令，讀到 stop 後結束
+DUMMY_SERVER = textwrap.dedent("""
+    import sys
+    for line in sys.stdin:
+        with open("console.txt", "a") as f:
+            f.write(line)
+        if line.strip() == "stop":
+            sys.exit(0)
+""")
+
+# 模擬包裝殼：自己收到 stop 就結束，但留下忽略 SIGTERM 的子程序 (類似 cmd.exe + java)
+WRAPPER_SERVER = textwrap.dedent("""
+    import subprocess, sys
+    child = subprocess.Popen([sys.executable, "stubborn.py"])
+    with open("child.pid", "w") as f:
+        f.write(str(child.pid))
+    for line in sys.stdin:
+        if line.strip() == "stop":
+            sys.exit(0)
+""")
+
+# 模擬卡死的伺服器：忽略 stop 與 SIGTERM
+STUBBORN_SERVER = textwrap.dedent("""
+    import signal, time
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    while True:
+        time.sleep(1)
+""")
+
+# 模擬持續運行的伺服器：不讀主控台，收到 SIGTERM 即結束
+IDLE_SERVER = textwrap.dedent("""
+    import time
+    while True:
+        time.sleep(1)
+""")
+
+# 模擬在 bot 之外運行的伺服器：監聽指定端口
+LISTEN_SERVER = textwrap.dedent("""
+    import socket, sys, time
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", int(sys.argv[1])))
+    sock.listen()
+    while True:
+        time.sleep(1)
+""")
+
+
+def make_spec(tmp_path, name, source):
+    script = tmp_path / f"{name}.py"
+    script.write_text(source, encoding='utf-8')
+    return LaunchSpec(name, build_command(script), tmp_path)
+
+
+def test_build_command():
+    """測試依副檔名選擇啟動方式"""
+    assert build_command("/mc/s/start.sh", platform="linux") == ["/bin/sh", "/mc/s/start.sh"]
+    assert build_command("/mc/s/server.jar", platform="linux")[:2] == ["java", "-jar"]
+    assert build_command("C:/mc/s/StartServer.bat", platform="win32")[:2] == ["cmd.exe", "/c"]
+    with pytest.raises(ValueError):
+        build_command("/mc/s/StartServer.bat", platform="linux")
+
+
+@pytest.mark.asyncio
+async def test_exit_detected_immediately(tmp_path):
+    """測試程序結束時立即通知，不需輪詢"""
+    supervisor = ProcessSupervisor()
+    exited = asyncio.Event()
+    supervisor.add_exit_listener(lambda managed: exited.set())
+
+    managed = await supervisor.start(make_spec(tmp_path, "crash", "import sys; sys.exit(3)"))
+    await asyncio.wait_for(exited.wait(), 5)
+
+    assert managed.returncode == 3
+    assert not supervisor.is_running("crash")
+
+
+@pytest.mark.asyncio
+async def test_graceful_stop(tmp_path):
+    """測試送出 stop 指令即可關閉"""
+    supervisor = ProcessSupervisor()
+    await supervisor.start(make_spec(tmp_path, "dummy", DUMMY_SERVER))
+    assert supervisor.is_running("dummy")
+
+    with pytest.raises(RuntimeError):
+        await supervisor.start(make_spec(tmp_path, "dummy", DUMMY_SERVER))
+
+    result = await supervisor.stop("dummy", stop_timeout=5)
+    assert result.stage == "stop" and result.method == "stdin"
+    assert result.duration < 5
+    assert (tmp_path / "console.txt").read_text().splitlines() == ["save-all flush", "stop"]
+    assert supervisor.running() == {}
+    assert (await supervisor.stop("dummy")).stage == "not_running"
+
+
+@pytest.mark.asyncio
+async def test_restart_reuses_spec(tmp_path):
+    """測試重啟使用快取的啟動資訊"""
+    supervisor = ProcessSupervisor()
+    first = await supervisor.start(make_spec(tmp_path, "dummy", DUMMY_SERVER))
+    result, second = await supervisor.restart("dummy", stop_timeout=5)
+
+    assert result.stage == "stop"
+    assert second.spec is first.spec and second.pid != first.pid
+    assert supervisor.is_running("dummy")
+    await supervisor.shutdown(stop_timeout=5)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="需要 POSIX 訊號")
+@pytest.mark.asyncio
+async def test_stop_escalates_to_kill(tmp_path):
+    """測試 stop 與 SIGTERM 無效時升級為 SIGKILL"""
+    supervisor = ProcessSupervisor()
+    managed = await supervisor.start(make_spec(tmp_path, "stubborn", STUBBORN_SERVER))
+    await asyncio.sleep(0.3)
+
+    result = await supervisor.stop("stubborn", stop_timeout=0.2, term_timeout=0.2, kill_timeout=5)
+    assert result.stage == "kill"
+    assert not managed.is_running
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="需要 POSIX 訊號")
+@pytest.mark.asyncio
+async def test_stop_terminates_whole_tree(tmp_path):
+    """測試包裝殼結束後，遺留的子程序仍會被結束"""
+    (tmp_path / "stubborn.py").write_text(STUBBORN_SERVER, encoding='utf-8')
+    supervisor = ProcessSupervisor()
+    await supervisor.start(make_spec(tmp_path, "wrapper", WRAPPER_SERVER))
+    for _ in range(50):
+        if (tmp_path / "child.pid").exists() and (tmp_path / "child.pid").read_text():
+            break
+        await asyncio.sleep(0.1)
+    child_pid = int((tmp_path / "child.pid").read_text())
+
+    result = await supervisor.stop("wrapper", stop_timeout=0.5, term_timeout=0.3, kill_timeout=5)
+    assert result.stage == "kill"
+    assert not psutil.pid_exists(child_pid) or psutil.Process(child_pid).status() == psutil.STATUS_ZOMBIE
+
+
+@pytest.mark.asyncio
+async def test_adopt_after_restart(tmp_path):
+    """測試重啟後依狀態檔接回仍在運行的伺服器，並能偵測結束與關閉"""
+    state = tmp_path / "state.json"
+    first = ProcessSupervisor(state_path=str(state))
+    managed = await first.start(make_spec(tmp_path, "survivor", IDLE_SERVER))
+    old_watcher = first._watchers["survivor"]
+    record = read_state(str(state))[0]
+    assert record["pid"] == managed.pid and record["name"] == "survivor"
+
+    # 模擬機器人重啟：新的 supervisor 沒有任何記憶體中的狀態
+    second = ProcessSupervisor(state_path=str(state), adopt_poll_interval=0.05)
+    exited = asyncio.Event()
+    second.add_exit_listener(lambda m: exited.set())
+    adopted = await second.adopt()
+    assert [m.name for m in adopted] == ["survivor"]
+    survivor = second.get("survivor")
+    assert survivor.pid == managed.pid and not survivor.has_console
+    assert survivor.started_at == record["started_at"]
+    assert survivor.spec.argv == managed.spec.argv
+    # 資源取樣等服務都以 running() 取得程序，接回的伺服器一樣會被納入
+    assert second.running() == {"survivor": survivor}
+    with pytest.raises(RuntimeError):
+        await second.start(managed.spec)
+
+    # 沒有主控台輸入，直接進入終止階段
+    result = await second.stop("survivor", stop_timeout=0.2, term_timeout=5)
+    assert result.stage == "term"
+    await asyncio.wait_for(exited.wait(), 5)
+    await old_watcher
+    assert read_state(str(state)) == []
+
+
+@pytest.mark.asyncio
+async def test_adopt_rejects_reused_pid(tmp_path):
+    """測試 PID 相同但建立時間不同 (PID 被重複使用) 的記錄不會被接回，並從狀態檔移除"""
+    me = psutil.Process()
+    state = tmp_path / "state.json"
+    state.write_text(json.dumps({"servers": [{
+        "name": "ghost", "pid": me.pid, "create_time": me.create_time() - 3600,
+        "cmdline": me.cmdline(), "cwd": os.getcwd(), "argv": ["java"], "started_at": 0,
+    }]}), encoding="utf-8")
+
+    supervisor = ProcessSupervisor(state_path=str(state))
+    assert await supervisor.adopt() == []
+    assert not supervisor.is_running("ghost")
+    assert read_state(str(state)) == []
+
+
+def test_reconcile_checks_cmdline_or_cwd(tmp_path):
+    """測試建立時間相符時，命令列或工作目錄至少一項要相符"""
+    me = psutil.Process()
+    base = {"name": "self", "pid": me.pid, "create_time": me.create_time()}
+    assert reconcile_state([dict(base, cmdline=me.cmdline(), cwd=str(tmp_path))])
+    # 包裝殼 exec 成 Java 後命令列改變，工作目錄仍相同
+    assert reconcile_state([dict(base, cmdline=["java"], cwd=os.getcwd())])
+    assert reconcile_state([dict(base, cmdline=["java"], cwd=str(tmp_path))]) == []
+
+
+def test_read_state_ignores_corrupt_file(tmp_path):
+    state = tmp_path / "state.json"
+    state.write_text('{"servers": [', encoding="utf-8")
+    assert read_state(str(state)) == []
+    assert read_state(str(tmp_path / "missing.json")) == []
+
+
+@pytest.mark.asyncio
+async def test_restart_adopted_server_stops_over_rcon(tmp_path):
+    """測試重新啟動接回的伺服器時，關閉指令改經 RCON 送出 (沒有主控台可用)"""
+    state = tmp_path / "state.json"
+    first = ProcessSupervisor(state_path=str(state))
+    old = await first.start(make_spec(tmp_path, "survivor", IDLE_SERVER))
+    # 監看任務在程序結束後還會改寫狀態檔，測試結束前等它們完成
+    old_watcher = first._watchers["survivor"]
+    second = ProcessSupervisor(state_path=str(state), adopt_poll_interval=0.05)
+    await second.adopt()
+    watchers = [old_watcher, second._watchers["survivor"]]
+
+    def stop(command):
+        psutil.Process(old.pid).terminate()
+        return "Stopping the server"
+
+    async with FakeRconServer(handlers={"save-all": "Saved the game", "stop": stop}) as server:
+        (tmp_path / "server.properties").write_text(
+            f"enable-rcon=true\nrcon.port={server.port}\nrcon.password=secret\n", encoding="utf-8"
+        )
+        pool = RconPool()
+        result, managed = await second.restart(
+            "survivor", stop=server_stopper(second, pool), stop_timeout=5
+        )
+        await pool.close()
+    watchers.append(second._watchers["survivor"])
+
+    assert server.commands == ["save-all flush", "stop"]
+    assert result.stage == "stop" and result.method == "rcon"
+    assert managed.has_console and managed.pid != old.pid
+    await second.stop("survivor", stop_timeout=0.2, term_timeout=5)
+    await asyncio.gather(*watchers)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="需要 POSIX 訊號")
+@pytest.mark.asyncio
+async def test_external_stop_only_kills_processes_in_server_folder(tmp_path):
+    """測試端口被其他資料夾的程序使用時不會強制結束，屬於伺服器資料夾時才會"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    folder = tmp_path / f"sky_1.21.4_{port}_fabric"
+    other = tmp_path / "other"
+    folder.mkdir()
+    other.mkdir()
+    info = parse_server_info(str(folder / "start.sh"))
+    script = tmp_path / "listen.py"
+    script.write_text(LISTEN_SERVER, encoding="utf-8")
+
+    async def spawn(cwd):
+        proc = await asyncio.create_subprocess_exec(sys.executable, str(script), str(port), cwd=cwd)
+        for _ in range(50):
+            if find_listening_pid(port) == proc.pid:
+                return proc
+            await asyncio.sleep(0.1)
+        raise AssertionError("程序未開始監聽")
+
+    supervisor = ProcessSupervisor()
+    stranger = await spawn(other)
+    try:
+        result = await graceful_stop(info, supervisor, term_timeout=2)
+        assert result.stage == "foreign"
+        assert stranger.returncode is None and psutil.pid_exists(stranger.pid)
+    finally:
+        stranger.kill()
+        await stranger.wait()
+
+    server = await spawn(folder)
+    result = await graceful_stop(info, supervisor, term_timeout=5)
+    assert result.stage == "term"
+    assert await asyncio.wait_for(server.wait(), 5) is not None
@@ -0,0 +1,62 @@
+import asyncio
+import sys
+import textwrap
+import psutil
+import pytest
+from src.services.supervisor import LaunchSpec, ProcessSupervisor
+from src.services.telemetry import ProcessTreeTracker, TelemetrySampler, sparkline
+
+# 模擬包裝殼：啟動一個持續佔用 CPU 與記憶體的子程序
+WRAPPER = textwrap.dedent("""
+    import subprocess, sys
+    child = subprocess.Popen([sys.executable, "-c",
+        "import time\\ndata = bytearray(50 * 1024 * 1024)\\nwhile True: sum(range(10000))"])
+    for line in sys.stdin:
+        if line.strip() == "stop":
+            child.kill()
+            break
+""")
+
+
+def test_sparkline():
+    """測試迷你圖與寬度縮放"""
+    assert sparkline([]) == ""
+    assert sparkline([0, 1, 2, 3, 4, 5, 6, 7]) == "▁▂▃▄▅▆▇█"
+    assert sparkline([5, 5, 5]) == "▁▁▁"
+    assert len(sparkline(range(1000), width=40)) == 40
+
+
+@pytest.mark.asyncio
+async def test_sampler_tracks_whole_tree(tmp_path):
+    """測試取樣包含包裝殼的子程序，且歷史長度有上限"""
+    script = tmp_path / "wrapper.py"
+    script.write_text(WRAPPER, encoding="utf-8")
+    supervisor = ProcessSupervisor()
+    await supervisor.start(LaunchSpec("busy", [sys.executable, str(script)], tmp_path))
+    sampler = TelemetrySampler(supervisor, history=3)
+
+    for _ in range(5):
+        await sampler.sample()
+        await asyncio.sleep(0.2)
+
+    samples = sampler.history("busy")
+    assert len(samples) == 3
+    latest = samples[-1]
+    assert latest.processes == 2
+    assert latest.rss > 50 * 1024 * 1024
+    assert latest.threads >= 2
+    assert max(s.cpu_percent for s in samples) > 10
+
+    await supervisor.shutdown(stop_timeout=5)
+    await sampler.sample()
+    assert sampler.latest("busy") is latest
+    assert "busy" not in sampler._trackers
+
+
+def test_tracker_access_denied_returns_no_sample(monkeypatch):
+    """測試無權限讀取程序時不取樣，而不是拋出錯誤"""
+    def deny(pid):
+        raise psutil.AccessDenied(pid)
+
+    monkeypatch.setattr(psutil, "Process", deny)
+    assert ProcessTreeTracker(1).sample() is None
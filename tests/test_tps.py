@@ -0,0 +1,147 @@
+import json
+import pytest
+from src.services.logtail import parse_line
+from src.services.rcon import RconPool
+from src.services.registry import ServerRegistry
+from src.services.tps import (
+    RollingWindow, TpsMonitor, parse_forge_tps, parse_paper_tps, parse_spark_tps, parse_tick_query
+)
+from tests.mocks.fake_rcon import FakeRconServer
+
+
+class FakeSupervisor:
+    def __init__(self, names):
+        self.names = names
+
+    def running(self):
+        return {name: object() for name in self.names}
+
+
+def test_parsers():
+    """測試各種核心的 TPS 回應"""
+    assert parse_paper_tps("TPS from last 1m, 5m, 15m: *20.0, 19.5, 19.9") == (20.0, None)
+    assert parse_spark_tps(
+        "TPS from last 5s, 10s, 1m, 5m, 15m:\n 18.2, 19.0, 19.9, 20.0, 20.0\n"
+        "Tick durations (min/med/95%ile/max ms) from last 10s, 1m:\n 1.0/12.5/30.1/80.0; 1.0/11.0/25.0/90.0"
+    ) == (18.2, 12.5)
+    assert parse_forge_tps(
+        "Dim minecraft:overworld: Mean tick time: 10.000 ms. Mean TPS: 20.000\n"
+        "Overall: Mean tick time: 62.500 ms. Mean TPS: 16.000"
+    ) == (16.0, 62.5)
+    assert parse_tick_query(
+        "The game is running normally\nTarget tick rate: 20.0 per second.\n"
+        "Average time per tick: 100.0ms (Target: 50.0ms)"
+    ) == (10.0, 100.0)
+    assert parse_paper_tps("Unknown or incomplete command") is None
+
+
+def test_rolling_window_expires():
+    """測試超出時間視窗的數值被移除"""
+    window = RollingWindow(60)
+    window.add(10, now=0)
+    window.add(20, now=50)
+    assert window.mean(now=55) == 15
+    assert window.values(now=100) == [20]
+
+
+def make_monitor(tmp_path, rcon_port=None, names=("sky",)):
+    folder = tmp_path / "sky_1.21.4_25560_paper"
+    folder.mkdir()
+    props = "enable-rcon=false\n" if rcon_port is None else \
+        f"enable-rcon=true\nrcon.port={rcon_port}\nrcon.password=secret\n"
+    (folder / "server.properties").write_text(props, encoding="utf-8")
+    servers = tmp_path / "servers.json"
+    servers.write_text(json.dumps({"servers": [{"path": str(folder / "start.sh")}]}), encoding="utf-8")
+    registry = ServerRegistry(servers)
+    registry.refresh()
+    monitor = TpsMonitor(FakeSupervisor(names), registry, RconPool(), alert_below=15, recover_above=18)
+    alerts = []
+    monitor.add_alert_listener(lambda info, state, recovered: alerts.append(recovered))
+    return monitor, registry.get("sky", "1.21.4"), alerts
+
+
+@pytest.mark.asyncio
+async def test_rcon_probe_with_hysteresis(tmp_path):
+    """測試 RCON 探測與遲滯：門檻附近的波動不會反覆通知"""
+    readings = iter([19.0, 14.0, 16.0, 14.5, 17.9, 18.5, 17.0])
+    handlers = {"tps": lambda cmd: f"§6TPS from last 1m, 5m, 15m: §a{next(readings)}, 20.0, 20.0"}
+    async with FakeRconServer(handlers=handlers) as server:
+        monitor, info, alerts = make_monitor(tmp_path, server.port)
+        for _ in range(7):
+            await monitor.poll()
+        await monitor.rcon_pool.close()
+
+    assert alerts == [False, True]
+    assert monitor.servers["sky"].probe == "tps"
+    assert server.commands == ["tps"] * 7
+
+
+@pytest.mark.asyncio
+async def test_probe_falls_back_to_tick_query(tmp_path):
+    """測試不支援 tps 指令時改用原版 tick query，並記住可用的指令"""
+    handlers = {"tick": "Target tick rate: 20.0 per second.\nAverage time per tick: 40.0ms (Target: 50.0ms)"}
+    async with FakeRconServer(handlers=handlers) as server:
+        monitor, info, _ = make_monitor(tmp_path, server.port)
+        assert await monitor.probe(info) == 20.0
+        assert await monitor.probe(info) == 20.0
+        await monitor.rcon_pool.close()
+
+    assert server.commands == ["tps", "spark tps", "forge tps", "neoforge tps", "tick query", "tick query"]
+
+
+@pytest.mark.asyncio
+async def test_log_lag_events_without_rcon(tmp_path):
+    """測試沒有 RCON 時以 Can't keep up! 記錄估算 TPS"""
+    monitor, info, alerts = make_monitor(tmp_path)
+    event = parse_line(
+        "[12:00:00] [Server thread/WARN]: Can't keep up! Is the server overloaded? "
+        "Running 40000ms or 800 ticks behind"
+    )
+    for _ in range(3):
+        await monitor.on_log_event(info, event)
+
+    state = monitor.servers["sky"]
+    assert state.estimated_tps() < 15
+    assert alerts == [False]
+
+    await monitor.poll()  # RCON 未啟用：不應影響記錄檔的估算
+    assert state.probe is None and alerts == [False]
+
+
+@pytest.mark.asyncio
+async def test_log_only_alert_recovers_when_window_expires(tmp_path):
+    """測試只靠記錄檔的伺服器：落後記錄過期後 poll 會先通知恢復，再清除狀態"""
+    monitor, info, alerts = make_monitor(tmp_path, names=())
+    event = parse_line(
+        "[12:00:00] [Server thread/WARN]: Can't keep up! Is the server overloaded? "
+        "Running 40000ms or 800 ticks behind"
+    )
+    for _ in range(3):
+        await monitor.on_log_event(info, event)
+    assert alerts == [False]
+
+    await monitor.poll()  # 視窗內仍有落後記錄：維持警告
+    assert alerts == [False] and "sky" in monitor.servers
+
+    monitor.servers["sky"].lag_ticks._items.clear()
+    await monitor.poll()
+    assert alerts == [False, True]
+    assert "sky" not in monitor.servers
+
+
+@pytest.mark.asyncio
+async def test_forget_clears_open_alert(tmp_path):
+    """測試警告中的伺服器停止時，清除狀態前先通知停止監控"""
+    monitor, info, alerts = make_monitor(tmp_path)
+    event = parse_line(
+        "[12:00:00] [Server thread/WARN]: Can't keep up! Is the server overloaded? "
+        "Running 40000ms or 800 ticks behind"
+    )
+    for _ in range(3):
+        await monitor.on_log_event(info, event)
+    await monitor.forget("sky")
+    assert alerts == [False, None]
+    assert "sky" not in monitor.servers
+
+    await monitor.forget("sky")
+    assert alerts == [False, None]